@@ -1,11 +1,12 @@
 from typing import Literal
 
-from . import rules, sample_logs, queries
+from . import rules, sample_logs, queries, replay
 from ._shared import *
 
 
 def use_all_with_defaults(
-    datalake: Literal["athena", "snowflake"] = "snowflake"
+    datalake: Literal["athena", "snowflake"] = "snowflake",
+    combined_queries: bool = False,
 ) -> None:
     rules.admin_disabled_mfa()
     rules.admin_role_assigned()
@@ -15,9 +16,17 @@ def use_all_with_defaults(
     rules.account_support_access()
     rules.support_reset()
     rules.geo_improbable_access()
+    rules.password_spray()
+    rules.admin_activity_spike()
+    rules.session_hijack()
 
     queries.activity_audit(datalake=datalake)
     queries.session_id_audit(datalake=datalake)
-    queries.admin_access_granted(datalake=datalake)
-    queries.mfa_password_reset_audit(datalake=datalake)
-    queries.support_access(datalake=datalake)
+
+    if combined_queries:
+        # one scheduled scan tagged by category instead of one scan per audit query
+        queries.combined_audit(datalake=datalake)
+    else:
+        queries.admin_access_granted(datalake=datalake)
+        queries.mfa_password_reset_audit(datalake=datalake)
+        queries.support_access(datalake=datalake)
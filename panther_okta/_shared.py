@@ -7,6 +7,8 @@ __all__ = [
     "SYSTEM_LOG_TYPE",
     "SUPPORT_ACCESS_EVENTS",
     "SUPPORT_RESET_EVENTS",
+    "PRIVILEGED_EVENTS",
+    "SESSION_EVENTS",
     "SHARED_TAGS",
     "SHARED_SUMMARY_ATTRS",
     "create_alert_context",
@@ -28,6 +30,24 @@ SUPPORT_RESET_EVENTS = [
 ]
 
 
+PRIVILEGED_EVENTS = [
+    "user.account.privilege.grant",
+    "system.api_token.create",
+    *SUPPORT_RESET_EVENTS,
+    *SUPPORT_ACCESS_EVENTS,
+]
+
+
+SESSION_EVENTS = [
+    "user.session.start",
+    "user.session.context.change",
+    "user.session.access_admin_app",
+    "user.authentication.sso",
+    "user.authentication.auth_via_mfa",
+    "policy.evaluate_sign_on",
+]
+
+
 SHARED_TAGS = [
     "Okta",
     standard_tags.IDENTITY_AND_ACCESS_MGMT,
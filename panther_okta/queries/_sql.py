@@ -0,0 +1,102 @@
+import re
+import typing
+
+# Lightweight helpers for inspecting the SQL in this query pack. These are not a full parser,
+# they only understand the flat SELECT ... FROM ... WHERE ... statements the factories produce.
+
+STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", flags=re.DOTALL)
+
+OCCURS_SINCE = re.compile(r"p_occurs_since\(\s*'([^']*)'\s*\)", flags=re.IGNORECASE)
+OCCURS_BETWEEN = re.compile(
+    r"p_occurs_between\(\s*'([^']*)'\s*,\s*'([^']*)'\s*\)", flags=re.IGNORECASE
+)
+
+# root column followed by at least one path segment, e.g. client:userAgent:browser or target[0]:alternateId
+SNOWFLAKE_PATH = re.compile(
+    r"\b([A-Za-z_]\w*)((?:\[\d+\])?(?::[A-Za-z_]\w*(?:\[\d+\])?)+|\[\d+\])"
+)
+ATHENA_PATH = re.compile(
+    r"\b([A-Za-z_]\w*)((?:\[\d+\])?(?:\.[A-Za-z_]\w*(?:\[\d+\])?)+|\[\d+\])"
+)
+
+
+def mask(sql: str) -> str:
+    """Drop comments and blank out string literals so keywords inside them are ignored"""
+
+    parts = STRING_LITERAL.split(sql)
+    for i, part in enumerate(parts):
+        parts[i] = "''" if i % 2 else COMMENT.sub(" ", part)
+    return "".join(parts)
+
+
+def split_top_level(text: str, separator: str) -> typing.List[str]:
+    """Split text on a regex separator, ignoring matches nested inside parentheses"""
+
+    pieces = []
+    depth = 0
+    start = 0
+    pattern = re.compile(separator, flags=re.IGNORECASE)
+    pos = 0
+
+    while pos < len(text):
+        char = text[pos]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0:
+            match = pattern.match(text, pos)
+            if match and match.end() > pos:
+                pieces.append(text[start:pos])
+                start = pos = match.end()
+                continue
+        pos += 1
+
+    pieces.append(text[start:])
+    return [piece.strip() for piece in pieces]
+
+
+def clause(masked: str, keyword: str, terminators: typing.Sequence[str]) -> str:
+    """Return the top-level clause following keyword, up to the first top-level terminator"""
+
+    pieces = split_top_level(masked, rf"\b{keyword}\b")
+    if len(pieces) < 2:
+        return ""
+
+    body = pieces[1]
+    end = split_top_level(body, r"\b(?:" + "|".join(terminators) + r")\b")
+    return end[0]
+
+
+def select_list(masked: str) -> typing.List[str]:
+    return split_top_level(clause(masked, "SELECT", ["FROM"]), ",")
+
+
+def where_clause(masked: str) -> str:
+    return clause(
+        masked,
+        "WHERE",
+        [r"GROUP\s+BY", r"ORDER\s+BY", "HAVING", "LIMIT", "QUALIFY", "UNION"],
+    )
+
+
+def unwrap(expr: str) -> str:
+    """Remove parentheses wrapping a whole expression"""
+
+    expr = expr.strip()
+    while expr.startswith("(") and expr.endswith(")") and _balanced(expr[1:-1]):
+        expr = expr[1:-1].strip()
+    return expr
+
+
+def _balanced(text: str) -> bool:
+    depth = 0
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
@@ -1,9 +1,13 @@
-from typing import Literal
+from typing import Dict, List, Literal, Optional
 from panther_sdk import query
 
+from .._shared import SUPPORT_ACCESS_EVENTS
+
 __all__ = [
     "activity_audit",
     "admin_access_granted",
+    "combined_audit",
+    "COMBINED_AUDIT_CATEGORIES",
     "mfa_password_reset_audit",
     "session_id_audit",
     "support_access",
@@ -15,33 +19,97 @@ default_query_schedule = query.IntervalSchedule(
 )
 
 
+ADMIN_GRANT_EVENTS = [
+    "user.account.privilege.grant",
+    "group.privilege.grant",
+]
+
+MFA_PASSWORD_RESET_EVENTS = [
+    "user.mfa.factor.reset_all",
+    "user.mfa.factor.deactivate",
+    "user.mfa.factor.suspend",
+    "user.account.reset_password",
+    "user.account.update_password",
+    "user.mfa.factor.update",
+]
+
+# eventTypes scanned by combined_audit, keyed by the category each row is tagged with
+COMBINED_AUDIT_CATEGORIES: Dict[str, List[str]] = {
+    "admin_access_granted": ADMIN_GRANT_EVENTS,
+    "mfa_password_reset": MFA_PASSWORD_RESET_EVENTS,
+    "support_access": SUPPORT_ACCESS_EVENTS,
+}
+
+# the time range each category's standalone query scans, which combined_audit keeps
+_COMBINED_AUDIT_WINDOWS: Dict[str, str] = {
+    "admin_access_granted": "p_occurs_between('2022-01-14','2022-03-22')",
+    "mfa_password_reset": "p_occurs_since('7 days')",
+    "support_access": "p_occurs_between('2022-01-14','2022-03-22')",
+}
+
+
+def _sql_string(value: str) -> str:
+    """Render a value as an escaped SQL string literal"""
+
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _investigation_filters(
+    datalake: Literal["athena", "snowflake"],
+    session_id: Optional[str] = None,
+    actor_email: Optional[str] = None,
+    event_types: Optional[List[str]] = None,
+) -> str:
+    """Render typed investigation filters as a canonical block of AND predicates.
+
+    Predicates are always emitted in the same order with escaped literals and a
+    sorted, de-duplicated eventType list, so repeating an investigation produces
+    byte-identical SQL that the warehouse can serve from its plan and result caches.
+    """
+
+    sep = "." if datalake == "athena" else ":"
+    predicates = []
+
+    if session_id is not None:
+        predicates.append(
+            f"authenticationContext{sep}externalSessionId = {_sql_string(session_id)}"
+        )
+    if actor_email is not None:
+        predicates.append(f"actor{sep}alternateId = {_sql_string(actor_email)}")
+    if event_types:
+        values = ", ".join(_sql_string(e) for e in sorted(set(event_types)))
+        predicates.append(f"eventType IN ({values})")
+
+    return "".join(f"\n      AND {predicate}" for predicate in predicates)
+
+
 def activity_audit(
     datalake: Literal["athena", "snowflake"],
     overrides: query.QueryOptions = query.QueryOptions(),
+    actor_email: Optional[str] = None,
+    event_types: Optional[List[str]] = None,
 ) -> query.Query:
     """Audit user activity across your environment. Customize to filter on specfic users, time ranges, etc"""
 
-    sql = """
+    filters = _investigation_filters(
+        datalake, actor_email=actor_email, event_types=event_types
+    )
+
+    sql = f"""
       SELECT actor:displayName AS actor_name, actor:alternateId AS actor_email, eventType, COUNT(*) AS activity_count
       FROM panther_logs.public.okta_systemlog
       WHERE p_occurs_since('7 days')
-      AND actor:type = 'User'
-      -- Uncomment lines below to filter by user email and/or eventType
-      -- and actor_email = 'email'
-      -- and eventType = 'eventType'
+      AND actor:type = 'User'{filters}
       GROUP BY actor:displayName, actor:alternateId, eventType
       ORDER BY  actor_name, activity_count DESC
     """
 
     if datalake == "athena":
-        sql = """
+        sql = f"""
           SELECT actor.displayName AS actor_name, actor.alternateId AS actor_email, eventType, COUNT(*) AS activity_count
           FROM panther_logs.okta_systemlog
           WHERE p_occurs_since('7 days')
-          AND actor.type = 'User'
-          -- Uncomment lines below to filter by user email and/or eventType
-          -- and actor_email = '<EMAIL_GOES_HERE>'
-          -- and eventType = '<EVENTTYPE_GOES_HERE>'
+          AND actor.type = 'User'{filters}
           GROUP BY actor.displayName, actor.alternateId, eventType
           ORDER BY  actor_name, activity_count DESC
         """
@@ -80,14 +148,14 @@ def admin_access_granted(
       FROM 
         panther_logs.public.okta_systemlog
       WHERE 
+        p_occurs_between('2022-01-14','2022-03-22')
+        AND
       ( eventType = 'user.account.privilege.grant' 
        OR 
         eventType = 'group.privilege.grant'
        AND
          debugContext:debugData:privilegeGranted like '%Admin%'
       )
-        AND  
-        p_occurs_between('2022-01-14','2022-03-22')
       ORDER BY
       event_time desc
     """
@@ -108,12 +176,12 @@ def admin_access_granted(
           client.useragent.rawUserAgent as user_agent
           FROM panther_logs.okta_systemlog
           WHERE 
+          p_occurs_between('2022-01-14','2022-03-22') AND
           (
           eventType = 'user.account.privilege.grant' OR 
           eventType = 'group.privilege.grant' AND
           cast(json_extract(debugcontext.debugdata, '$.privilegeGranted') as varchar) LIKE '%Admin%'
-          ) AND
-          p_occurs_between('2022-01-14','2022-03-22')
+          )
           ORDER BY
           event_time desc
         """
@@ -133,27 +201,26 @@ def admin_access_granted(
 def mfa_password_reset_audit(
     datalake: Literal["athena", "snowflake"],
     overrides: query.QueryOptions = query.QueryOptions(),
+    actor_email: Optional[str] = None,
 ) -> query.Query:
     """Investigate Password and MFA resets for the last 7 days"""
 
-    sql = """
+    filters = _investigation_filters(datalake, actor_email=actor_email)
+
+    sql = f"""
       SELECT p_event_time,actor:alternateId as actor_user,target[0]:alternateId as target_user, eventType,client:ipAddress as ip_address
       FROM panther_logs.public.okta_systemlog
       WHERE eventType IN ('user.mfa.factor.reset_all', 'user.mfa.factor.deactivate', 'user.mfa.factor.suspend', 'user.account.reset_password', 'user.account.update_password','user.mfa.factor.update')
-      and p_occurs_since('7 days')
-      -- If you wish to investigate an indvidual user , uncomment this line and add their email here  
-      -- and actor:alternateId = '<EMAIL_GOES_HERE>'
+      and p_occurs_since('7 days'){filters}
       ORDER by p_event_time DESC
     """
 
     if datalake == "athena":
-        sql = """
+        sql = f"""
           SELECT p_event_time,actor.alternateId as actor_user,target[1].alternateId as target_user, eventType,client.ipAddress as ip_address
           FROM panther_logs.okta_systemlog
           WHERE eventType IN ('user.mfa.factor.reset_all', 'user.mfa.factor.deactivate', 'user.mfa.factor.suspend', 'user.account.reset_password', 'user.account.update_password')
-          and p_occurs_since('7 days')
-          -- If you wish to investigate an indvidual user , uncomment this line and add their email here  
-          -- and actor:alternateId = '<EMAIL_GOES_HERE>'
+          and p_occurs_since('7 days'){filters}
           ORDER by p_event_time DESC
         """
 
@@ -172,10 +239,20 @@ def mfa_password_reset_audit(
 def session_id_audit(
     datalake: Literal["athena", "snowflake"],
     overrides: query.QueryOptions = query.QueryOptions(),
+    session_id: Optional[str] = None,
+    actor_email: Optional[str] = None,
+    event_types: Optional[List[str]] = None,
 ) -> query.Query:
     """Search for activity releated to a specific SessionID in Okta panther_logs.okta_systemlog"""
 
-    sql = """
+    filters = _investigation_filters(
+        datalake,
+        session_id=session_id,
+        actor_email=actor_email,
+        event_types=event_types,
+    )
+
+    sql = f"""
         SELECT  
           p_event_time as event_time,
           actor:alternateId as actor_email,
@@ -188,14 +265,12 @@ def session_id_audit(
           client:geographicalContext:country as country,
           client:userAgent:rawUserAgent as user_agent
         FROM panther_logs.public.okta_systemlog
-        WHERE p_occurs_since('7 days')
-        -- Uncomment the line below and replace 'sessionId' with the sessionId you are investigating
-        -- and authenticationContext:externalSessionId = '<SESSIONID_GOES_HERE>'
+        WHERE p_occurs_since('7 days'){filters}
         ORDER BY event_time DESC
     """
 
     if datalake == "athena":
-        sql = """
+        sql = f"""
           SELECT  
             p_event_time as event_time,
             actor.alternateId as actor_email,
@@ -208,9 +283,7 @@ def session_id_audit(
             client.geographicalContext.country as country,
             client.userAgent.rawUserAgent as user_agent
           FROM panther_logs.okta_systemlog
-          WHERE p_occurs_since('7 days')
-          -- Uncomment the line below and replace 'sessionId' with the sessionId you are investigating
-          -- and authenticationContext:externalSessionId = '<SESSIONID_GOES_HERE>'
+          WHERE p_occurs_since('7 days'){filters}
             ORDER BY event_time DESC
 
         """
@@ -247,11 +320,12 @@ def support_access(
       FROM
       panther_logs.public.okta_systemlog
       WHERE 
-        eventType = 'user.session.impersonation.grant' 
-        OR 
-        eventType = 'user.session.impersonation.initiate'
-       AND  
-          p_occurs_between('2022-01-14','2022-03-22')
+        p_occurs_between('2022-01-14','2022-03-22')
+        AND
+        ( eventType = 'user.session.impersonation.grant' 
+         OR 
+          eventType = 'user.session.impersonation.initiate'
+        )
       ORDER BY
         event_time desc
     """
@@ -289,3 +363,82 @@ def support_access(
         ),
         schedule=(overrides.schedule or default_query_schedule),
     )
+
+
+def combined_audit(
+    datalake: Literal["athena", "snowflake"],
+    overrides: query.QueryOptions = query.QueryOptions(),
+    categories: Optional[List[str]] = None,
+) -> query.Query:
+    """Audit admin access grants, MFA and password resets and Okta support access with a single scan.
+
+    Each category keeps the time range of its standalone query: admin_access_granted and
+    support_access scan 2022-01-14 to 2022-03-22, mfa_password_reset the last 7 days.
+    """
+
+    categories = sorted(categories or COMBINED_AUDIT_CATEGORIES)
+    unknown = set(categories) - set(COMBINED_AUDIT_CATEGORIES)
+    if unknown:
+        raise ValueError(f"unknown combined_audit categories: {sorted(unknown)}")
+
+    if datalake == "athena":
+        table = "panther_logs.okta_systemlog"
+        priv_granted = "cast(json_extract(debugcontext.debugdata, '$.privilegeGranted') as varchar)"
+        target_user = "target[1].alternateId"
+        sep = "."
+    else:
+        table = "panther_logs.public.okta_systemlog"
+        priv_granted = "debugContext:debugData:privilegeGranted"
+        target_user = "target[0]:alternateId"
+        sep = ":"
+
+    # Every category is pruned on eventType and its own time range, so the whole pack reads
+    # the table once
+    event_lists = {
+        category: ", ".join(_sql_string(e) for e in COMBINED_AUDIT_CATEGORIES[category])
+        for category in categories
+    }
+    tags = "\n".join(
+        f"            WHEN eventType IN ({event_lists[category]}) THEN {_sql_string(category)}"
+        for category in categories
+    )
+
+    predicates = []
+    for category in categories:
+        predicate = f"eventType IN ({event_lists[category]}) AND {_COMBINED_AUDIT_WINDOWS[category]}"
+        if category == "admin_access_granted":
+            predicate += f" AND (eventType <> 'group.privilege.grant' OR {priv_granted} LIKE '%Admin%')"
+        predicates.append(f"({predicate})")
+    where = "\n          OR ".join(predicates)
+
+    sql = f"""
+        SELECT
+          p_event_time as event_time,
+          CASE
+{tags}
+          END as category,
+          actor{sep}alternateId as actor_email,
+          actor{sep}displayName as actor_name,
+          {target_user} as target_user,
+          displayMessage,
+          eventType,
+          {priv_granted} as priv_granted,
+          client{sep}ipAddress as src_ip,
+          client{sep}geographicalContext{sep}city as city,
+          client{sep}geographicalContext{sep}country as country,
+          client{sep}userAgent{sep}rawUserAgent as user_agent
+        FROM {table}
+        WHERE {where}
+        ORDER BY category, event_time DESC
+    """
+
+    return query.Query(
+        name=(overrides.name or "Okta Combined Audit"),
+        enabled=(overrides.enabled or True),
+        sql=(overrides.sql or sql),
+        description=(
+            overrides.description
+            or "Audit admin access grants, MFA and password resets and Okta support access with a single scan"
+        ),
+        schedule=(overrides.schedule or default_query_schedule),
+    )
@@ -0,0 +1,212 @@
+import re
+import typing
+import dataclasses
+
+from panther_sdk import query
+
+from . import _sql
+from .all_queries import (
+    activity_audit,
+    admin_access_granted,
+    combined_audit,
+    mfa_password_reset_audit,
+    session_id_audit,
+    support_access,
+)
+
+__all__ = [
+    "FieldUsage",
+    "athena_layout",
+    "field_usage",
+    "pack_queries",
+    "snowflake_layout",
+]
+
+_JSON_EXTRACT = re.compile(
+    r"json_extract\w*\(\s*([\w.:\[\]]+)\s*,\s*'\$\.([^']*)'\s*\)", flags=re.I
+)
+_CAST = re.compile(r"\bcast\(\s*([\w.:\[\]]+)\s+as\s+\w+\s*\)", flags=re.I)
+_PREDICATE = re.compile(
+    r"(?<![\w.:\]])([A-Za-z_]\w*(?:\[\d+\])?(?:[:.][A-Za-z_]\w*(?:\[\d+\])?)*)\s*"
+    r"(=|<>|!=|>=|<=|>|<|\bNOT\s+IN\b|\bIN\b|\bNOT\s+LIKE\b|\bLIKE\b|\bBETWEEN\b)",
+    flags=re.I,
+)
+_INDEX = re.compile(r"\[\d+\]")
+_RANGE_OPERATORS = {">=", "<=", ">", "<", "BETWEEN"}
+
+
+@dataclasses.dataclass(frozen=True)
+class FieldUsage:
+    """How the query pack filters on one okta_systemlog field
+
+    - path -- Dotted field path, e.g. actor.alternateId
+    - queries -- Number of queries with a WHERE predicate on the field
+    - equality -- Used with =, <> or IN
+    - substring -- Used with LIKE
+    - range -- Used with range comparisons or the p_occurs_* macros
+    """
+
+    path: str
+    queries: int
+    equality: bool
+    substring: bool
+    range: bool
+
+
+def pack_queries(
+    datalake: typing.Literal["athena", "snowflake"]
+) -> typing.List[query.Query]:
+    """Every query in the pack, with investigation filters set so their predicates are counted"""
+
+    return [
+        activity_audit(
+            datalake=datalake,
+            actor_email="<actor_email>",
+            event_types=["<event_type>"],
+        ),
+        admin_access_granted(datalake=datalake),
+        combined_audit(datalake=datalake),
+        mfa_password_reset_audit(datalake=datalake, actor_email="<actor_email>"),
+        session_id_audit(
+            datalake=datalake,
+            session_id="<session_id>",
+            actor_email="<actor_email>",
+            event_types=["<event_type>"],
+        ),
+        support_access(datalake=datalake),
+    ]
+
+
+def field_usage(queries: typing.Sequence[query.Query]) -> typing.List[FieldUsage]:
+    """Collect the fields referenced by WHERE predicates, most widely used first"""
+
+    spellings: typing.Dict[str, str] = {}
+    counts: typing.Dict[str, int] = {}
+    operators: typing.Dict[str, typing.Set[str]] = {}
+
+    for q in queries:
+        seen = set()
+        for path, operator in _predicates(q.sql):
+            key = path.lower()
+            # prefer the camelCase spelling over athena's case-folded one
+            if key not in spellings or spellings[key].islower():
+                spellings[key] = path
+            operators.setdefault(key, set()).add(operator)
+            if key not in seen:
+                seen.add(key)
+                counts[key] = counts.get(key, 0) + 1
+
+    usage = [
+        FieldUsage(
+            path=spellings[key],
+            queries=counts[key],
+            equality=bool(operators[key] & {"=", "<>", "!=", "IN", "NOT IN"}),
+            substring=bool(operators[key] & {"LIKE", "NOT LIKE"}),
+            range=bool(operators[key] & _RANGE_OPERATORS),
+        )
+        for key in counts
+    ]
+    return sorted(usage, key=lambda u: (-u.queries, u.path.lower()))
+
+
+def snowflake_layout(
+    queries: typing.Optional[typing.Sequence[query.Query]] = None,
+    table: str = "panther_logs.public.okta_systemlog",
+    max_cluster_keys: int = 3,
+) -> typing.List[str]:
+    """Clustering key and search optimization statements for the fields the pack filters on"""
+
+    pack = queries or pack_queries("snowflake")
+    usage = field_usage(pack)
+
+    # Cluster on event day first, then top-level columns that most queries filter by equality.
+    # Nested paths are high cardinality (emails, session ids) and are served by search optimization.
+    cluster_keys = ["TO_DATE(p_event_time)"]
+    for u in usage:
+        if len(cluster_keys) >= max_cluster_keys:
+            break
+        if u.equality and "." not in u.path and u.queries * 2 >= len(pack):
+            cluster_keys.append(u.path)
+
+    statements = [f"ALTER TABLE {table} CLUSTER BY ({', '.join(cluster_keys)});"]
+
+    methods = []
+    for u in usage:
+        if u.path == "p_event_time":
+            continue
+        column = _snowflake_path(u.path)
+        if u.equality:
+            methods.append(f"EQUALITY({column})")
+        if u.substring:
+            methods.append(f"SUBSTRING({column})")
+
+    if methods:
+        statements.append(
+            f"ALTER TABLE {table} ADD SEARCH OPTIMIZATION ON {', '.join(methods)};"
+        )
+
+    return statements
+
+
+def athena_layout(
+    queries: typing.Optional[typing.Sequence[query.Query]] = None,
+    table: str = "panther_logs.okta_systemlog",
+    location: str = "s3://<PANTHER_PROCESSED_DATA_BUCKET>/logs/okta_systemlog",
+    start_year: int = 2020,
+) -> typing.List[str]:
+    """Partition projection table properties for the fields the pack filters on.
+
+    Panther writes Athena data under year/month/day/hour prefixes, so only those keys can be
+    projected; eventType pruning on Athena comes from Parquet row-group statistics instead.
+    """
+
+    pack = queries or pack_queries("athena")
+    usage = field_usage(pack)
+
+    properties = [("projection.enabled", "true")]
+    template = location.rstrip("/")
+
+    if any(u.path == "p_event_time" and u.range for u in usage):
+        properties += [
+            ("projection.year.type", "integer"),
+            ("projection.year.range", f"{start_year},NOW"),
+            ("projection.month.type", "integer"),
+            ("projection.month.range", "1,12"),
+            ("projection.month.digits", "2"),
+            ("projection.day.type", "integer"),
+            ("projection.day.range", "1,31"),
+            ("projection.day.digits", "2"),
+            ("projection.hour.type", "integer"),
+            ("projection.hour.range", "0,23"),
+            ("projection.hour.digits", "2"),
+        ]
+        template += "/year=${year}/month=${month}/day=${day}/hour=${hour}"
+
+    properties.append(("storage.location.template", template))
+
+    rendered = ",\n".join(f"  '{k}' = '{v}'" for k, v in properties)
+    return [f"ALTER TABLE {table} SET TBLPROPERTIES (\n{rendered}\n);"]
+
+
+def _predicates(sql: str) -> typing.List[typing.Tuple[str, str]]:
+    sql = _sql.COMMENT.sub(" ", sql)
+    sql = _JSON_EXTRACT.sub(lambda m: f"{m.group(1)}.{m.group(2)}", sql)
+    sql = _CAST.sub(lambda m: m.group(1), sql)
+    where = _sql.where_clause(_sql.mask(sql))
+
+    found = []
+    if re.search(r"\bp_occurs_\w+\s*\(", where, flags=re.I):
+        found.append(("p_event_time", ">="))
+
+    for match in _PREDICATE.finditer(where):
+        path = _INDEX.sub("", match.group(1)).replace(":", ".")
+        operator = " ".join(match.group(2).upper().split())
+        if path.upper() in {"AND", "OR", "NOT", "WHERE"}:
+            continue
+        found.append((path, operator))
+
+    return found
+
+
+def _snowflake_path(path: str) -> str:
+    return path.replace(".", ":")
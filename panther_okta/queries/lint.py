@@ -0,0 +1,156 @@
+import re
+import typing
+import dataclasses
+
+from panther_sdk import query
+
+from . import _sql
+
+__all__ = ["LintFinding", "lint_sql", "lint_query", "SeverityError", "SeverityWarning"]
+
+SeverityError = "error"
+SeverityWarning = "warning"
+
+# top-level System Log fields that hold whole nested objects
+OBJECT_COLUMNS = {
+    "actor",
+    "authenticationcontext",
+    "client",
+    "debugcontext",
+    "outcome",
+    "request",
+    "securitycontext",
+    "target",
+    "transaction",
+}
+
+_TIME_PREDICATE = re.compile(r"\bp_occurs_\w+\s*\(|\bp_event_time\b", flags=re.I)
+_JSON_EXTRACTION = re.compile(
+    r"\bjson_extract\w*\s*\(|\bget_path\s*\(|\bparse_json\s*\(|\b[A-Za-z_]\w*(?:\[\d+\])?[:.][A-Za-z_]",
+    flags=re.I,
+)
+_OBJECT_PROJECTION = re.compile(r"^([A-Za-z_]\w*)(?:\s+(?:AS\s+)?\w+)?$", flags=re.I)
+
+
+@dataclasses.dataclass(frozen=True)
+class LintFinding:
+    """A scan-cost problem found in query SQL
+
+    - code -- Stable identifier for the check
+    - severity -- "error" for full-table scans, "warning" for avoidable cost
+    - message -- Human readable explanation
+    """
+
+    code: str
+    severity: str
+    message: str
+
+
+def lint_query(q: query.Query) -> typing.List[LintFinding]:
+    """Lint the SQL of a query, including SQL supplied through QueryOptions overrides"""
+
+    return lint_sql(q.sql)
+
+
+def lint_sql(sql: str) -> typing.List[LintFinding]:
+    """Statically check query SQL for patterns that inflate warehouse scan volume"""
+
+    masked = _sql.mask(sql)
+    findings: typing.List[LintFinding] = []
+
+    findings.extend(_check_time_predicate(masked))
+    findings.extend(_check_projection(masked))
+    findings.extend(_check_predicate_order(masked))
+    findings.extend(_check_order_by(masked))
+
+    return findings
+
+
+def _check_time_predicate(masked: str) -> typing.List[LintFinding]:
+    where = _sql.where_clause(masked)
+
+    if not _TIME_PREDICATE.search(where):
+        return [
+            LintFinding(
+                code="missing-time-predicate",
+                severity=SeverityError,
+                message="WHERE clause has no p_occurs_* or p_event_time predicate, the full table is scanned",
+            )
+        ]
+
+    # AND binds tighter than OR, so every top-level OR branch needs its own time bound
+    branches = _sql.split_top_level(where, r"\bOR\b")
+    if any(not _TIME_PREDICATE.search(branch) for branch in branches):
+        return [
+            LintFinding(
+                code="partial-time-predicate",
+                severity=SeverityError,
+                message="time predicate only applies to some OR branches, parenthesize the OR so it bounds the whole scan",
+            )
+        ]
+
+    return []
+
+
+def _check_projection(masked: str) -> typing.List[LintFinding]:
+    findings = []
+
+    for item in _sql.select_list(masked):
+        if item == "*" or item.endswith(".*"):
+            findings.append(
+                LintFinding(
+                    code="select-star",
+                    severity=SeverityError,
+                    message="SELECT * reads every column of a wide table, project the fields you need",
+                )
+            )
+            continue
+
+        match = _OBJECT_PROJECTION.match(item)
+        if match and match.group(1).lower() in OBJECT_COLUMNS:
+            findings.append(
+                LintFinding(
+                    code="whole-object-projection",
+                    severity=SeverityWarning,
+                    message=f"'{item}' projects the whole {match.group(1)} object, extract the needed paths instead",
+                )
+            )
+
+    return findings
+
+
+def _check_predicate_order(masked: str) -> typing.List[LintFinding]:
+    findings = []
+
+    for branch in _sql.split_top_level(_sql.where_clause(masked), r"\bOR\b"):
+        terms = _sql.split_top_level(_sql.unwrap(branch), r"\bAND\b")
+        expensive = False
+
+        for term in terms:
+            if _JSON_EXTRACTION.search(term):
+                expensive = True
+            elif expensive:
+                findings.append(
+                    LintFinding(
+                        code="json-before-cheap-predicate",
+                        severity=SeverityWarning,
+                        message="a cheap predicate follows a JSON extraction predicate, move it first",
+                    )
+                )
+                break
+
+    return findings
+
+
+def _check_order_by(masked: str) -> typing.List[LintFinding]:
+    pieces = _sql.split_top_level(masked, r"\bORDER\s+BY\b")
+    if len(pieces) < 2 or re.search(r"\bLIMIT\b", pieces[-1], flags=re.I):
+        return []
+
+    return [
+        LintFinding(
+            code="unbounded-order-by",
+            severity=SeverityWarning,
+            message="ORDER BY without LIMIT sorts the full result set",
+        )
+    ]
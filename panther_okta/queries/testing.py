@@ -0,0 +1,230 @@
+import json
+import re
+import sqlite3
+import time
+import typing
+import dataclasses
+from datetime import datetime, timedelta
+
+from panther_sdk import query
+
+from ._sql import (
+    ATHENA_PATH,
+    OCCURS_BETWEEN,
+    OCCURS_SINCE,
+    SNOWFLAKE_PATH,
+    STRING_LITERAL,
+)
+
+__all__ = ["QueryHarness", "QueryRun", "generate_event"]
+
+PANTHER_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+_TABLE_NAMES = re.compile(
+    r"panther_logs\.(?:public\.)?okta_systemlog\b", flags=re.IGNORECASE
+)
+_INTERVAL = re.compile(r"^\s*(\d+)\s*(second|minute|hour|day|week)s?\s*$")
+_INDEX = re.compile(r"\[(\d+)\]")
+
+
+def generate_event(
+    event_type: str,
+    actor_email: str = "homer@springfield.gov",
+    p_event_time: str = "2022-03-22 14:21:53.225000",
+    **fields: typing.Any,
+) -> typing.Dict[str, typing.Any]:
+    """Build a minimal Okta System Log event, with top-level fields overridden by keyword"""
+
+    event: typing.Dict[str, typing.Any] = {
+        "eventType": event_type,
+        "version": "0",
+        "severity": "INFO",
+        "displayMessage": event_type,
+        "actor": {
+            "alternateId": actor_email,
+            "displayName": actor_email.split("@")[0],
+            "id": actor_email,
+            "type": "User",
+        },
+        "client": {
+            "ipAddress": "1.1.1.1",
+            "geographicalContext": {"city": "Springfield", "country": "United States"},
+            "userAgent": {"rawUserAgent": "Mozilla/5.0"},
+        },
+        "outcome": {"result": "SUCCESS"},
+        "p_event_time": p_event_time,
+        "p_log_type": "Okta.SystemLog",
+    }
+    event.update(fields)
+    return event
+
+
+@dataclasses.dataclass(frozen=True)
+class QueryRun:
+    """Outcome of running a query through the harness
+
+    - name -- Query name, or "sql" for raw statements
+    - sql -- The SQLite statement that was executed
+    - rows -- Result rows keyed by output column name
+    - elapsed_seconds -- Wall time spent executing the statement
+    - rows_scanned -- Rows inside the p_occurs_* time range, i.e. what a time-partitioned warehouse would read
+    """
+
+    name: str
+    sql: str
+    rows: typing.List[typing.Dict[str, typing.Any]]
+    elapsed_seconds: float
+    rows_scanned: int
+
+    def project(self, *columns: str) -> typing.List[typing.Tuple[typing.Any, ...]]:
+        return [tuple(row[c] for c in columns) for row in self.rows]
+
+
+class QueryHarness:
+    """Runs the SQL produced by the query factories against an in-memory SQLite table of Okta events.
+
+    Panther macros are expanded relative to ``now`` and semi-structured paths are rewritten to
+    SQLite JSON functions for the selected datalake dialect, so query logic can be checked
+    without a warehouse.
+    """
+
+    def __init__(
+        self,
+        events: typing.Iterable[typing.Mapping[str, typing.Any]],
+        datalake: typing.Literal["athena", "snowflake"] = "snowflake",
+        now: typing.Optional[datetime] = None,
+    ) -> None:
+        self.datalake = datalake
+        self.now = now or datetime.utcnow()
+        self.history: typing.List[QueryRun] = []
+        self._conn = sqlite3.connect(":memory:")
+        self._conn.row_factory = sqlite3.Row
+        self._load(list(events))
+
+    def _load(self, events: typing.List[typing.Mapping[str, typing.Any]]) -> None:
+        # Athena resolves struct fields case-insensitively, so fold keys to match its paths
+        if self.datalake == "athena":
+            events = [_lower_keys(e) for e in events]
+
+        columns: typing.Dict[str, None] = {"p_event_time": None}
+        for event in events:
+            columns.update(dict.fromkeys(event))
+
+        self._conn.execute(
+            f"CREATE TABLE okta_systemlog ({', '.join(_quote(c) for c in columns)})"
+        )
+        self._conn.executemany(
+            f"INSERT INTO okta_systemlog VALUES ({', '.join('?' for _ in columns)})",
+            [[_to_column(event.get(c)) for c in columns] for event in events],
+        )
+
+    def translate(self, sql: str) -> str:
+        """Rewrite a datalake query into an equivalent SQLite statement"""
+
+        sql = OCCURS_SINCE.sub(
+            lambda m: f"p_event_time >= '{self._since(m.group(1))}'", sql
+        )
+        sql = OCCURS_BETWEEN.sub(
+            lambda m: f"p_event_time BETWEEN '{m.group(1)}' AND '{m.group(2)}'", sql
+        )
+
+        parts = STRING_LITERAL.split(sql)
+        for i, part in enumerate(parts):
+            if i % 2:
+                # string literal; athena json paths follow the folded key case
+                if self.datalake == "athena" and part.startswith("'$"):
+                    parts[i] = part.lower()
+                continue
+            part = _TABLE_NAMES.sub("okta_systemlog", part)
+            if self.datalake == "athena":
+                part = ATHENA_PATH.sub(_athena_path, part)
+            else:
+                part = SNOWFLAKE_PATH.sub(_snowflake_path, part)
+            parts[i] = part
+
+        return "".join(parts)
+
+    def run(self, q: typing.Union[query.Query, str]) -> QueryRun:
+        name, sql = ("sql", q) if isinstance(q, str) else (q.name, q.sql)
+        translated = self.translate(sql)
+
+        start = time.perf_counter()
+        rows = [dict(row) for row in self._conn.execute(translated).fetchall()]
+        elapsed = time.perf_counter() - start
+
+        result = QueryRun(
+            name=name,
+            sql=translated,
+            rows=rows,
+            elapsed_seconds=elapsed,
+            rows_scanned=self._rows_scanned(sql),
+        )
+        self.history.append(result)
+        return result
+
+    def _since(self, interval: str) -> str:
+        match = _INTERVAL.match(interval.lower())
+        if not match:
+            raise ValueError(f"unsupported p_occurs_since interval: {interval!r}")
+
+        amount, unit = int(match.group(1)), match.group(2)
+        start = self.now - timedelta(**{f"{unit}s": amount})
+        return start.strftime(PANTHER_TIME_FORMAT)
+
+    def _rows_scanned(self, sql: str) -> int:
+        ranges: typing.List[typing.Tuple[str, typing.Optional[str]]] = [
+            (self._since(m.group(1)), None) for m in OCCURS_SINCE.finditer(sql)
+        ]
+        ranges += [(m.group(1), m.group(2)) for m in OCCURS_BETWEEN.finditer(sql)]
+
+        # without a time predicate every partition of the table is read
+        if not ranges:
+            return int(
+                self._conn.execute("SELECT COUNT(*) FROM okta_systemlog").fetchone()[0]
+            )
+
+        clauses = []
+        params: typing.List[str] = []
+        for lower, upper in ranges:
+            if upper is None:
+                clauses.append("p_event_time >= ?")
+                params.append(lower)
+            else:
+                clauses.append("p_event_time BETWEEN ? AND ?")
+                params.extend([lower, upper])
+
+        return int(
+            self._conn.execute(
+                f"SELECT COUNT(*) FROM okta_systemlog WHERE {' OR '.join(clauses)}",
+                params,
+            ).fetchone()[0]
+        )
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _to_column(value: typing.Any) -> typing.Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _lower_keys(value: typing.Any) -> typing.Any:
+    if isinstance(value, typing.Mapping):
+        return {k.lower(): _lower_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_lower_keys(v) for v in value]
+    return value
+
+
+def _snowflake_path(match: typing.Match[str]) -> str:
+    path = match.group(2).replace(":", ".")
+    return f"json_extract({match.group(1)}, '${path}')"
+
+
+def _athena_path(match: typing.Match[str]) -> str:
+    # athena arrays are 1-indexed
+    path = _INDEX.sub(lambda m: f"[{int(m.group(1)) - 1}]", match.group(2)).lower()
+    return f"json_extract({match.group(1).lower()}, '${path}')"
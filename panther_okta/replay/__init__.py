@@ -0,0 +1,19 @@
+from .bootstrap import *
+from .clock import *
+from .compressed import *
+from .dedup import *
+from .evaluate import *
+from .follow import *
+from .grouping import *
+from .interning import *
+from .prefilter import *
+from .projection import *
+from .reader import *
+from .reorder import *
+from .sharding import *
+from .sink import *
+from .snapshot import *
+from .state import *
+from .parallel import *
+from .pipeline import *
+from .poller import *
@@ -0,0 +1,200 @@
+import io
+import csv
+import json
+import typing
+import datetime
+import dataclasses
+
+from .clock import PANTHER_TIME_FORMAT
+from .compressed import PathLike, open_compressed
+from .snapshot import StateSnapshot
+from .state import MemoryKV
+
+__all__ = [
+    "GEO_LOGIN_KEY_PREFIX",
+    "GeoLogin",
+    "bootstrap_geo_state",
+    "geo_login_key",
+    "latest_logins",
+    "read_logins",
+    "to_geo_login",
+]
+
+# the key geo_improbable_access keeps each user's last login under
+GEO_LOGIN_KEY_PREFIX = "Okta.Login.GeographicallyImprobable"
+
+# accepted column names, matched case-insensitively (Snowflake upper-cases CSV headers), with
+# dotted names for flattened System Log exports
+_ACTOR = ("actor", "actor_email", "alternateId", "actor.alternateId")
+_CITY = ("city", "client.geographicalContext.city")
+_LAT = ("lat", "latitude", "client.geographicalContext.geolocation.lat")
+_LON = ("lon", "longitude", "client.geographicalContext.geolocation.lon")
+_TIME = ("p_event_time", "event_time", "published")
+
+
+@dataclasses.dataclass
+class GeoLogin:
+    """A user's login location, as geo_improbable_access stores it
+
+    - actor -- actor.alternateId
+    - time -- p_event_time, in Panther's format
+    """
+
+    actor: str
+    city: str
+    lat: float
+    lon: float
+    time: str
+
+    def value(self) -> str:
+        """The string geo_improbable_access keeps in the user's string set.
+
+        It carries no packed login ring or known locations; the rule starts both from this
+        login the next time the user logs in.
+        """
+
+        return json.dumps(
+            {
+                "city": self.city,
+                "lon": self.lon,
+                "lat": self.lat,
+                "time": self.time,
+                "old_city": "",
+            }
+        )
+
+
+def geo_login_key(actor: str) -> str:
+    return f"{GEO_LOGIN_KEY_PREFIX}{actor}"
+
+
+def _get(record: typing.Any, name: str) -> typing.Any:
+    if not isinstance(record, typing.Mapping):
+        return None
+    if name in record:
+        return record[name]
+    folded = name.casefold()
+    for key, value in record.items():
+        if isinstance(key, str) and key.casefold() == folded:
+            return value
+    return None
+
+
+def _field(
+    record: typing.Mapping[str, typing.Any], names: typing.Sequence[str]
+) -> typing.Any:
+    for name in names:
+        value = _get(record, name)
+        if value is None and "." in name:
+            value = record
+            for part in name.split("."):
+                value = _get(value, part)
+        if value not in (None, "") and not isinstance(value, typing.Mapping):
+            return value
+    return None
+
+
+def _panther_time(value: typing.Any) -> typing.Optional[str]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.datetime.strptime(value[:26], PANTHER_TIME_FORMAT)
+    except ValueError:
+        try:
+            parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed.strftime(PANTHER_TIME_FORMAT)
+
+
+def to_geo_login(record: typing.Mapping[str, typing.Any]) -> typing.Optional[GeoLogin]:
+    """A GeoLogin from a flat export row or a System Log event, or None if a field is missing"""
+
+    actor = _field(record, _ACTOR)
+    city = _field(record, _CITY)
+    time = _panther_time(_field(record, _TIME))
+    try:
+        lat = float(_field(record, _LAT))
+        lon = float(_field(record, _LON))
+    except (TypeError, ValueError):
+        return None
+
+    if not actor or not city or time is None:
+        return None
+    return GeoLogin(str(actor), str(city), lat, lon, time)
+
+
+def read_logins(path: PathLike) -> typing.Iterator[GeoLogin]:
+    """Stream logins from a CSV (with a header row) or JSONL export, optionally compressed"""
+
+    with open_compressed(path) as stream:
+        name = str(path).lower()
+        if ".csv" in name:
+            for row in csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8")):
+                login = to_geo_login(row)
+                if login is not None:
+                    yield login
+            return
+
+        for line in stream:
+            if line.strip():
+                login = to_geo_login(json.loads(line))
+                if login is not None:
+                    yield login
+
+
+def latest_logins(logins: typing.Iterable[GeoLogin]) -> typing.Dict[str, GeoLogin]:
+    """The latest login of each actor, keeping one login per actor in memory"""
+
+    latest: typing.Dict[str, GeoLogin] = {}
+    for login in logins:
+        current = latest.get(login.actor)
+        if current is None or login.time > current.time:
+            latest[login.actor] = login
+    return latest
+
+
+def bootstrap_geo_state(
+    logins: typing.Iterable[GeoLogin],
+    store: MemoryKV,
+    snapshot: typing.Optional[StateSnapshot] = None,
+    batch_size: int = 10_000,
+    expire_days: float = 7.0,
+) -> int:
+    """Seed geo_improbable_access state with each actor's latest login, returning how many
+    actors were written.
+
+    Logins are grouped to the latest per actor before anything is written, and an actor whose
+    stored login is at least as recent is left alone. Like the rule, entries expire
+    expire_days after the login. With a snapshot (already restored into store), every
+    batch_size actors are saved in one append.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    written = pending = 0
+    for actor, login in latest_logins(logins).items():
+        key = geo_login_key(actor)
+        stored = store.get_string_set(key)
+        if stored and json.loads(next(iter(stored))).get("time", "") >= login.time:
+            continue
+
+        login_time = datetime.datetime.strptime(login.time, PANTHER_TIME_FORMAT)
+        expires = login_time.replace(tzinfo=datetime.timezone.utc) + datetime.timedelta(
+            days=expire_days
+        )
+        store.put_string_set(key, [login.value()])
+        store.set_key_expiration(key, expires.timestamp())
+        written += 1
+        pending += 1
+
+        if snapshot is not None and pending >= batch_size:
+            snapshot.save(store)
+            pending = 0
+
+    if snapshot is not None and pending:
+        snapshot.save(store)
+    return written
@@ -0,0 +1,63 @@
+import abc
+import time
+import typing
+import datetime
+
+__all__ = ["Clock", "EventClock", "WallClock", "event_time"]
+
+# Panther's p_event_time layout, which stateful rules parse back with strptime
+PANTHER_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def event_time(event: typing.Mapping[str, typing.Any]) -> typing.Optional[float]:
+    """An event's p_event_time in epoch seconds, or None when it is missing or malformed"""
+
+    value = event.get("p_event_time")
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.datetime.strptime(value[:26], PANTHER_TIME_FORMAT)
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class Clock(abc.ABC):
+    """The current time in epoch seconds, as state expiry sees it.
+
+    observe() is called with every event before the rules run, so a clock can follow the
+    event stream rather than the wall.
+    """
+
+    @abc.abstractmethod
+    def __call__(self) -> float:
+        """The current time in epoch seconds"""
+
+    def observe(self, event: typing.Mapping[str, typing.Any]) -> None:
+        pass
+
+
+class WallClock(Clock):
+    """Wall-clock time, for state fed by a live stream"""
+
+    def __call__(self) -> float:
+        return time.time()
+
+
+class EventClock(Clock):
+    """The latest p_event_time observed.
+
+    Replaying history against it expires state exactly as it expired when the events were live,
+    however fast the replay runs. Late events don't move it back.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.time = start
+
+    def __call__(self) -> float:
+        return self.time
+
+    def observe(self, event: typing.Mapping[str, typing.Any]) -> None:
+        observed = event_time(event)
+        if observed is not None and observed > self.time:
+            self.time = observed
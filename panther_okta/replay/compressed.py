@@ -0,0 +1,185 @@
+import os
+import gzip
+import queue
+import typing
+import threading
+
+from panther_sdk import detection
+
+from .dedup import DuplicateFilter
+from .evaluate import Match, RuleError
+from .interning import StringInterner
+from .prefilter import replay_lines
+from .reorder import ReorderBuffer
+
+__all__ = ["ReadAhead", "compressed_lines", "open_compressed", "replay_compressed"]
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+PathLike = typing.Union[str, "os.PathLike[str]"]
+
+
+def open_compressed(path: PathLike) -> typing.BinaryIO:
+    """Open a gzip, zstd or uncompressed file for streaming reads, detected by its magic bytes"""
+
+    with open(path, "rb") as f:
+        magic = f.read(4)
+
+    if magic.startswith(GZIP_MAGIC):
+        return typing.cast(typing.BinaryIO, gzip.open(path, "rb"))
+
+    if magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard  # type: ignore
+        except ImportError as err:
+            raise RuntimeError(
+                f"{os.fspath(path)} is zstd-compressed; install zstandard to read it"
+            ) from err
+        return typing.cast(
+            typing.BinaryIO,
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+        )
+
+    return open(path, "rb")
+
+
+class ReadAhead:
+    """Reads a stream on a background thread into a bounded queue of blocks.
+
+    zlib and zstandard release the GIL while decompressing, so the next blocks are inflated while
+    the caller evaluates rules on the current one. At most depth blocks are buffered, which bounds
+    memory when evaluation is the slower side. Errors from the reader are re-raised on the
+    consuming side; the stream is closed by the reader thread.
+    """
+
+    def __init__(
+        self,
+        stream: typing.BinaryIO,
+        block_size: int = 1 << 20,
+        depth: int = 4,
+    ) -> None:
+        if block_size < 1 or depth < 1:
+            raise ValueError("block_size and depth must be at least 1")
+
+        self._stream = stream
+        self._block_size = block_size
+        self._blocks: "queue.Queue[typing.Union[bytes, BaseException, None]]" = (
+            queue.Queue(maxsize=depth)
+        )
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def __iter__(self) -> typing.Iterator[bytes]:
+        try:
+            while True:
+                block = self._blocks.get()
+                if block is None:
+                    return
+                if isinstance(block, BaseException):
+                    raise block
+                yield block
+        finally:
+            self.close()
+
+    def lines(self) -> typing.Iterator[bytes]:
+        """Yield the stream's non-empty lines, without their line endings"""
+
+        rest = b""
+        for block in self:
+            lines = (rest + block).split(b"\n")
+            rest = lines.pop()
+            for line in lines:
+                line = line.rstrip(b"\r")
+                if line:
+                    yield line
+
+        rest = rest.rstrip(b"\r")
+        if rest:
+            yield rest
+
+    def close(self) -> None:
+        """Stop the reader early; safe to call more than once"""
+
+        self._stop.set()
+        self._thread.join()
+
+    def _read(self) -> None:
+        try:
+            with self._stream:
+                while not self._stop.is_set():
+                    block = self._stream.read(self._block_size)
+                    if not block:
+                        break
+                    self._put(block)
+            self._put(None)
+        except BaseException as err:
+            self._put(err)
+
+    def _put(self, item: typing.Union[bytes, BaseException, None]) -> None:
+        # wake up periodically so close() isn't blocked behind a full queue
+        while not self._stop.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+def compressed_lines(
+    paths: typing.Iterable[PathLike],
+    block_size: int = 1 << 20,
+    depth: int = 4,
+) -> typing.Iterator[bytes]:
+    """Stream the lines of (possibly compressed) JSONL files in order.
+
+    The next file is opened and starts decompressing while the current one is still being
+    consumed, so each file boundary doesn't stall the pipeline.
+    """
+
+    upcoming: typing.Optional[ReadAhead] = None
+    try:
+        pending = iter(paths)
+        path = next(pending, None)
+        if path is not None:
+            upcoming = ReadAhead(open_compressed(path), block_size, depth)
+
+        while upcoming is not None:
+            current = upcoming
+            path = next(pending, None)
+            upcoming = (
+                ReadAhead(open_compressed(path), block_size, depth)
+                if path is not None
+                else None
+            )
+            yield from current.lines()
+    finally:
+        if upcoming is not None:
+            upcoming.close()
+
+
+def replay_compressed(
+    paths: typing.Iterable[PathLike],
+    rule_set: typing.Sequence[detection.Rule],
+    prefilter: bool = True,
+    errors: typing.Optional[typing.List[RuleError]] = None,
+    project: bool = False,
+    interner: typing.Optional[StringInterner] = None,
+    block_size: int = 1 << 20,
+    depth: int = 4,
+    duplicates: typing.Optional[DuplicateFilter] = None,
+    reorder: typing.Optional[ReorderBuffer] = None,
+) -> typing.Iterator[Match]:
+    """Evaluate gzip, zstd or plain JSONL exports against a rule set, decompressing ahead"""
+
+    return replay_lines(
+        compressed_lines(paths, block_size, depth),
+        rule_set,
+        prefilter=prefilter,
+        errors=errors,
+        project=project,
+        interner=interner,
+        duplicates=duplicates,
+        reorder=reorder,
+    )
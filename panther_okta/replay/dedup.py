@@ -0,0 +1,149 @@
+import math
+import typing
+import hashlib
+import threading
+
+from .clock import event_time
+
+__all__ = ["BloomFilter", "DuplicateFilter", "RotatingBloomFilter"]
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over strings.
+
+    Sized for capacity items at error_rate false positives, unless that would take more than
+    max_bytes, in which case it is capped and expected_error_rate reports the rate it will
+    actually reach at capacity.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float = 0.001,
+        max_bytes: typing.Optional[int] = None,
+    ) -> None:
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate within (0, 1)")
+
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        if max_bytes is not None:
+            bits = min(bits, max_bytes * 8)
+        self.bits = max(8, bits)
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    @property
+    def expected_error_rate(self) -> float:
+        """False positive rate once capacity items are added"""
+
+        return float(
+            (1 - math.exp(-self.hashes * self.capacity / self.bits)) ** self.hashes
+        )
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, str):
+            return False
+        return all(
+            self._array[bit >> 3] & (1 << (bit & 7)) for bit in self._positions(item)
+        )
+
+    def add(self, item: str) -> None:
+        for bit in self._positions(item):
+            self._array[bit >> 3] |= 1 << (bit & 7)
+        self.count += 1
+
+    def _positions(self, item: str) -> typing.Iterator[int]:
+        # double hashing: k positions from two independent 64-bit hashes
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+
+class RotatingBloomFilter:
+    """Remembers strings for a sliding window using a current and a previous Bloom filter.
+
+    Lookups check both filters and additions go to the current one. The filters rotate when the
+    current one has covered window_seconds or reached its capacity, so an item is remembered for
+    at least one full window and memory never exceeds two filters.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 3600.0,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+        max_bytes: typing.Optional[int] = None,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # the cap covers both generations
+        self.max_bytes = max_bytes // 2 if max_bytes is not None else None
+        self.rotations = 0
+        self.current = self._new()
+        self.previous: typing.Optional[BloomFilter] = None
+        self._started: typing.Optional[float] = None
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.current or (
+            self.previous is not None and item in self.previous
+        )
+
+    def add(self, item: str, timestamp: typing.Optional[float] = None) -> None:
+        if timestamp is not None:
+            if self._started is None:
+                self._started = timestamp
+            elif timestamp - self._started >= self.window_seconds:
+                self._rotate(timestamp)
+
+        if self.current.count >= self.capacity:
+            self._rotate(timestamp)
+        self.current.add(item)
+
+    def _new(self) -> BloomFilter:
+        return BloomFilter(self.capacity, self.error_rate, self.max_bytes)
+
+    def _rotate(self, timestamp: typing.Optional[float]) -> None:
+        self.previous, self.current = self.current, self._new()
+        self._started = timestamp
+        self.rotations += 1
+
+
+class DuplicateFilter:
+    """Drops redelivered System Log events by their uuid before any rule sees them.
+
+    Call it with a decoded event: it returns False for a uuid seen within the window and True
+    otherwise. Events without a uuid are always kept. A Bloom filter false positive drops a new
+    event, at the configured error_rate. It is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 3600.0,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+        max_bytes: typing.Optional[int] = None,
+    ) -> None:
+        self.seen = RotatingBloomFilter(window_seconds, capacity, error_rate, max_bytes)
+        self.kept = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, event: typing.Mapping[str, typing.Any]) -> bool:
+        uuid = event.get("uuid")
+        if not isinstance(uuid, str) or not uuid:
+            self.kept += 1
+            return True
+
+        with self._lock:
+            if uuid in self.seen:
+                self.dropped += 1
+                return False
+
+            self.seen.add(uuid, event_time(event))
+            self.kept += 1
+            return True
@@ -0,0 +1,158 @@
+import typing
+import dataclasses
+
+from panther_core import PantherEvent
+from panther_core.data_model import DataModel
+from panther_sdk import detection
+
+from .. import rules
+from .state import observe
+
+__all__ = [
+    "Match",
+    "RuleError",
+    "OKTA_DATA_MODEL",
+    "default_rules",
+    "evaluate",
+    "render_match",
+    "rule_filters",
+    "rule_matches",
+    "to_event",
+]
+
+# Mirrors the Standard data model Panther attaches to Okta.SystemLog, so event.udm() works offline
+OKTA_DATA_MODEL = DataModel(
+    {
+        "id": "Standard.Okta.SystemLog",
+        "versionId": "offline",
+        "mappings": [
+            {"name": "actor_user", "path": "$.actor.alternateId"},
+            {"name": "event_type", "path": "$.eventType"},
+            {"name": "source_ip", "path": "$.client.ipAddress"},
+            {"name": "user_agent", "path": "$.client.userAgent.rawUserAgent"},
+        ],
+    }
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Match:
+    """A rule match rendered the way Panther would turn it into an alert
+
+    - rule_id -- ID of the matching rule
+    - title -- Rendered alert title
+    - severity -- Rendered severity
+    - dedup -- Alert grouping key, the group_by value or else the title
+    - alert_context -- Rendered alert context
+    - event -- The matching event
+    """
+
+    rule_id: str
+    title: str
+    severity: str
+    dedup: str
+    alert_context: typing.Dict[str, typing.Any]
+    event: PantherEvent
+
+
+@dataclasses.dataclass(frozen=True)
+class RuleError:
+    """A rule raised while evaluating an event; Panther reports these as rule errors, not matches"""
+
+    rule_id: str
+    error: Exception
+    event: PantherEvent
+
+
+def default_rules() -> typing.List[detection.Rule]:
+    """The rules registered by use_all_with_defaults"""
+
+    return [
+        rules.admin_disabled_mfa(),
+        rules.admin_role_assigned(),
+        rules.api_key_created(),
+        rules.api_key_revoked(),
+        rules.brute_force_logins(),
+        rules.account_support_access(),
+        rules.support_reset(),
+        rules.geo_improbable_access(),
+        rules.password_spray(),
+        rules.admin_activity_spike(),
+        rules.session_hijack(),
+    ]
+
+
+def to_event(data: typing.Mapping[str, typing.Any]) -> PantherEvent:
+    return PantherEvent(data, data_model=OKTA_DATA_MODEL)
+
+
+def rule_filters(rule: detection.Rule) -> typing.List[detection.PythonFilter]:
+    if isinstance(rule.filters, list):
+        return rule.filters
+    return [rule.filters]
+
+
+def rule_matches(rule: detection.Rule, event: PantherEvent) -> bool:
+    """Filters are AND-ed together, like Panther does for SDK rules"""
+
+    return all(f.func(event) for f in rule_filters(rule))
+
+
+def render_match(rule: detection.Rule, event: PantherEvent) -> Match:
+    title = _render(rule.alert_title, event, None) or rule.name or rule.rule_id
+
+    if isinstance(rule.severity, detection.DynamicStringField):
+        severity = _render(rule.severity.func, event, None) or rule.severity.fallback
+    else:
+        severity = rule.severity
+
+    group_by = rule.alert_grouping.group_by if rule.alert_grouping else None
+
+    return Match(
+        rule_id=rule.rule_id,
+        title=title,
+        severity=severity,
+        dedup=_render(group_by, event, None) or title,
+        alert_context=_render(rule.alert_context, event, {}),
+        event=event,
+    )
+
+
+def evaluate(
+    rule_set: typing.Sequence[detection.Rule],
+    events: typing.Iterable[PantherEvent],
+    errors: typing.Optional[typing.List[RuleError]] = None,
+) -> typing.Iterator[Match]:
+    """Run every rule against every event, yielding matches in event order.
+
+    When an errors list is given, rule exceptions are collected there instead of raised. The
+    installed store's clock is advanced to each event before the rules see it.
+    """
+
+    for event in events:
+        observe(event)
+        for rule in rule_set:
+            try:
+                matched = rule_matches(rule, event)
+            except Exception as err:
+                if errors is None:
+                    raise
+                errors.append(RuleError(rule_id=rule.rule_id, error=err, event=event))
+                continue
+
+            if matched:
+                yield render_match(rule, event)
+
+
+def _render(
+    func: typing.Optional[typing.Callable[[PantherEvent], typing.Any]],
+    event: PantherEvent,
+    default: typing.Any,
+) -> typing.Any:
+    # like Panther, a failing dynamic field falls back to its default rather than dropping the alert
+    if func is None:
+        return default
+    try:
+        return func(event)
+    except Exception:
+        return default
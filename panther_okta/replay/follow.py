@@ -0,0 +1,277 @@
+import os
+import json
+import zlib
+import fnmatch
+import threading
+import typing
+import dataclasses
+
+from panther_sdk import detection
+
+from .compressed import GZIP_MAGIC, ZSTD_MAGIC
+from .dedup import DuplicateFilter
+from .evaluate import Match, RuleError, to_event
+from .interning import StringInterner
+from .prefilter import replay_lines
+from .sink import _plain
+from .snapshot import StateSnapshot
+from .state import MemoryKV, installed
+
+__all__ = ["Follower", "follow"]
+
+CHECKPOINT_VERSION = 3
+
+# bytes at the start of a file used to tell a rotated-in file from one that reused an inode
+FINGERPRINT_BYTES = 256
+
+
+@dataclasses.dataclass
+class _Position:
+    path: str
+    offset: int = 0
+    fingerprint: int = 0
+    fingerprint_length: int = 0
+
+
+class Follower:
+    """Tails a directory of JSONL files and evaluates new complete lines in batches.
+
+    Files are tracked by device and inode rather than by name, so a renamed (rotated) file keeps
+    its read offset, and a file that shrank below its offset is re-read from the start. A
+    fingerprint of each file's first bytes catches inode reuse. Compressed files are skipped.
+
+    poll() evaluates the next batch and commit() atomically checkpoints the byte offsets together
+    with the KV state of stateful rules and the batch's matches. The checkpoint is a
+    StateSnapshot, so a commit appends only the keys changed since the last one. A Follower
+    built on an existing checkpoint resumes from its last commit, with the matches committed
+    there in pending and the commit's number in sequence; a batch that was polled but not
+    committed is evaluated again.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        rule_set: typing.Sequence[detection.Rule],
+        checkpoint_path: str,
+        pattern: str = "*.jsonl*",
+        max_batch_bytes: int = 1 << 20,
+        store: typing.Optional[MemoryKV] = None,
+        prefilter: bool = True,
+        errors: typing.Optional[typing.List[RuleError]] = None,
+        project: bool = False,
+        interner: typing.Optional[StringInterner] = None,
+        duplicates: typing.Optional[DuplicateFilter] = None,
+    ) -> None:
+        self.directory = directory
+        self.rule_set = rule_set
+        self.checkpoint_path = checkpoint_path
+        self.pattern = pattern
+        self.max_batch_bytes = max_batch_bytes
+        self.store = store or MemoryKV()
+        self.prefilter = prefilter
+        self.errors = errors
+        self.project = project
+        self.interner = interner
+        self.duplicates = duplicates
+        self.positions: typing.Dict[str, _Position] = {}
+        # matches of the last commit, and how many commits there have been
+        self.pending: typing.List[Match] = []
+        self.sequence = 0
+        self._snapshot = StateSnapshot(checkpoint_path)
+
+        if os.path.exists(checkpoint_path):
+            self._restore()
+
+    def poll(self) -> typing.List[Match]:
+        """Evaluate complete lines appended since the last poll, up to max_batch_bytes"""
+
+        lines: typing.List[bytes] = []
+        budget = self.max_batch_bytes
+        current = {}
+
+        for file_id, path in self._scan():
+            position = self.positions.get(file_id) or _Position(path)
+            position.path = path
+            current[file_id] = position
+
+            if budget > 0:
+                read = self._read_lines(file_id, position, budget)
+                budget -= sum(len(line) + 1 for line in read)
+                lines += read
+
+        # forget files that were deleted or compressed away
+        self.positions = current
+
+        with installed(self.store):
+            return list(
+                replay_lines(
+                    lines,
+                    self.rule_set,
+                    prefilter=self.prefilter,
+                    errors=self.errors,
+                    project=self.project,
+                    interner=self.interner,
+                    duplicates=self.duplicates,
+                )
+            )
+
+    def offsets(self) -> typing.Dict[str, int]:
+        """Byte offset reached in each tracked file, by device:inode"""
+
+        return {file_id: p.offset for file_id, p in self.positions.items()}
+
+    def commit(self, matches: typing.Sequence[Match] = ()) -> None:
+        """Checkpoint the offsets and rule state reached by the last poll, and its matches"""
+
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "files": {
+                file_id: dataclasses.asdict(position)
+                for file_id, position in self.positions.items()
+            },
+            "sequence": self.sequence + 1,
+            "pending": [_match_record(match) for match in matches],
+        }
+        # the offsets and matches ride along with the changed keys in one commit
+        self._snapshot.save(
+            self.store, json.dumps(checkpoint, default=_plain).encode("utf-8")
+        )
+        self.sequence += 1
+        self.pending = list(matches)
+
+    def _restore(self) -> None:
+        self._snapshot.restore(self.store)
+        checkpoint = json.loads(self._snapshot.meta or b"{}")
+
+        # version 2 checkpoints predate pending matches
+        if checkpoint.get("version") not in (2, CHECKPOINT_VERSION):
+            raise RuntimeError(
+                f"unsupported checkpoint version in {self.checkpoint_path}"
+            )
+
+        self.positions = {
+            file_id: _Position(**position)
+            for file_id, position in checkpoint["files"].items()
+        }
+        self.sequence = checkpoint.get("sequence", 0)
+        self.pending = [
+            Match(**{**record, "event": to_event(record["event"])})
+            for record in checkpoint.get("pending", [])
+        ]
+
+    def _scan(self) -> typing.List[typing.Tuple[str, str]]:
+        """(file id, path) of the files to read, oldest first so rotated files drain first"""
+
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not fnmatch.fnmatch(name, self.pattern) or os.path.abspath(
+                path
+            ) == os.path.abspath(self.checkpoint_path):
+                continue
+            try:
+                stat = os.stat(path)
+                if not os.path.isfile(path):
+                    continue
+                with open(path, "rb") as f:
+                    magic = f.read(len(ZSTD_MAGIC))
+            except FileNotFoundError:
+                continue
+            if magic.startswith((GZIP_MAGIC, ZSTD_MAGIC)):
+                continue
+            found.append((stat.st_mtime_ns, name, f"{stat.st_dev}:{stat.st_ino}", path))
+
+        found.sort()
+        return [(file_id, path) for _, _, file_id, path in found]
+
+    def _read_lines(
+        self, file_id: str, position: _Position, budget: int
+    ) -> typing.List[bytes]:
+        try:
+            f = open(position.path, "rb")
+        except FileNotFoundError:
+            return []
+
+        with f:
+            stat = os.fstat(f.fileno())
+            # rotated between the scan and the open; the next poll picks up both files
+            if f"{stat.st_dev}:{stat.st_ino}" != file_id:
+                return []
+
+            size = stat.st_size
+            head = f.read(FINGERPRINT_BYTES)
+
+            # truncated in place, or a new file that reused the inode
+            if size < position.offset or (
+                position.fingerprint_length
+                and zlib.crc32(head[: position.fingerprint_length])
+                != position.fingerprint
+            ):
+                position.offset = 0
+
+            position.fingerprint = zlib.crc32(head)
+            position.fingerprint_length = len(head)
+
+            f.seek(position.offset)
+            data = f.read(budget)
+            # only complete lines are taken; a line longer than the budget is read whole
+            if b"\n" not in data:
+                while True:
+                    more = f.read(budget)
+                    data += more
+                    if not more or b"\n" in more:
+                        break
+
+        end = data.rfind(b"\n") + 1
+        position.offset += end
+        return [line.rstrip(b"\r") for line in data[:end].split(b"\n") if line.strip()]
+
+
+def _match_record(match: Match) -> typing.Dict[str, typing.Any]:
+    return {
+        "rule_id": match.rule_id,
+        "title": match.title,
+        "severity": match.severity,
+        "dedup": match.dedup,
+        "alert_context": match.alert_context,
+        "event": match.event.to_dict(),
+    }
+
+
+def follow(
+    follower: Follower,
+    interval: float = 1.0,
+    stop: typing.Optional[threading.Event] = None,
+) -> typing.Iterator[typing.List[Match]]:
+    """Poll a Follower until stop is set, yielding each non-empty batch of matches.
+
+    Each batch is committed, with the offsets and rule state it was evaluated from, before it
+    is yielded, so a restart never reads or evaluates its lines again. Asking for the next batch
+    acknowledges the previous one. A batch still pending when the process stopped is yielded
+    again first, under the same follower.sequence; a consumer that records the last sequence
+    it finished handling alongside its own output can skip it and see every match exactly once.
+    """
+
+    stop = stop or threading.Event()
+
+    if follower.pending:
+        # handed out before a restart, but never acknowledged
+        yield follower.pending
+
+    while not stop.is_set():
+        offsets = follower.offsets()
+        matches = follower.poll()
+
+        if follower.offsets() != offsets or follower.pending:
+            # also acknowledges the previous batch
+            follower.commit(matches)
+        else:
+            # nothing new was read, wait for the sidecar to write more
+            stop.wait(interval)
+
+        if matches:
+            yield matches
+
+    if follower.pending:
+        # the consumer came back for more, so it is done with the last batch
+        follower.commit()
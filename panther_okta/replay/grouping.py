@@ -0,0 +1,180 @@
+import heapq
+import typing
+import dataclasses
+
+from panther_sdk import detection
+
+from .clock import event_time
+from .evaluate import Match
+
+__all__ = [
+    "DEFAULT_DEDUP_PERIOD_MINUTES",
+    "AlertGrouper",
+    "GroupedAlert",
+    "event_timestamp",
+    "group_alerts",
+]
+
+# Panther groups matches of a rule without alert_grouping for an hour
+DEFAULT_DEDUP_PERIOD_MINUTES = 60
+
+
+@dataclasses.dataclass
+class GroupedAlert:
+    """One alert as Panther would raise it, with the matches grouped into it
+
+    - rule_id -- ID of the rule
+    - dedup -- Grouping key within the rule
+    - first_seen -- Event time of the first grouped match, in epoch seconds
+    - last_seen -- Event time of the last grouped match, in epoch seconds
+    - matches -- Number of grouped matches
+    - first_match -- The match that opened the alert; its title and context are the alert's
+    """
+
+    rule_id: str
+    dedup: str
+    first_seen: float
+    last_seen: float
+    matches: int
+    first_match: Match
+
+
+def event_timestamp(match: Match) -> typing.Optional[float]:
+    """A match's p_event_time in epoch seconds, or None when it is missing or malformed"""
+
+    return event_time(match.event)
+
+
+class AlertGrouper:
+    """Groups matches into alerts using each rule's alert_grouping, like Panther does.
+
+    A match opens an alert for its (rule, dedup) key unless one is open, and the alert stays
+    open for period_minutes of event time from its first match. Rules without alert_grouping
+    use DEFAULT_DEDUP_PERIOD_MINUTES, and rules without group_by dedup on the alert title. Open
+    alerts are indexed in time buckets by expiry; as event time advances, whole buckets are
+    evicted and their alerts returned as closed. Memory is bounded by the number of alerts open
+    at once, not by the number of matches. Matches without a usable p_event_time take the
+    latest time seen.
+    """
+
+    def __init__(
+        self,
+        rule_set: typing.Sequence[detection.Rule],
+        default_period_minutes: int = DEFAULT_DEDUP_PERIOD_MINUTES,
+        bucket_seconds: int = 60,
+    ) -> None:
+        if bucket_seconds < 1:
+            raise ValueError("bucket_seconds must be at least 1")
+
+        self.periods: typing.Dict[str, float] = {}
+        for rule in rule_set:
+            grouping = rule.alert_grouping
+            minutes = (
+                grouping.period_minutes if grouping else None
+            ) or default_period_minutes
+            self.periods[rule.rule_id] = minutes * 60.0
+
+        self.default_period = default_period_minutes * 60.0
+        self.bucket_seconds = bucket_seconds
+        self.watermark = float("-inf")
+        self.alert_counts: typing.Dict[str, int] = {}
+        self.match_counts: typing.Dict[str, int] = {}
+        self._open: typing.Dict[typing.Tuple[str, str], GroupedAlert] = {}
+        self._expiries: typing.Dict[typing.Tuple[str, str], float] = {}
+        self._buckets: typing.Dict[int, typing.List[typing.Tuple[str, str]]] = {}
+        self._bucket_heap: typing.List[int] = []
+
+    @property
+    def open_alerts(self) -> int:
+        return len(self._open)
+
+    def dedup_key(self, match: Match) -> str:
+        """Panther's dedup string: the group_by value, or else the alert title"""
+
+        return match.dedup
+
+    def add(self, match: Match) -> typing.List[GroupedAlert]:
+        """Group a match, returning the alerts that closed before its event time"""
+
+        timestamp = event_timestamp(match)
+        if timestamp is None:
+            timestamp = self.watermark if self.watermark > float("-inf") else 0.0
+        self.watermark = max(self.watermark, timestamp)
+
+        closed = self._evict(self.watermark)
+        key = (match.rule_id, self.dedup_key(match))
+        self.match_counts[match.rule_id] = self.match_counts.get(match.rule_id, 0) + 1
+
+        alert = self._open.get(key)
+        if alert is not None and timestamp >= self._expiries[key]:
+            # expired within the current bucket, which eviction hasn't reached yet
+            closed.append(self._close(key))
+            alert = None
+
+        if alert is None:
+            self._open[key] = GroupedAlert(
+                rule_id=match.rule_id,
+                dedup=key[1],
+                first_seen=timestamp,
+                last_seen=timestamp,
+                matches=1,
+                first_match=match,
+            )
+            expiry = timestamp + self.periods.get(match.rule_id, self.default_period)
+            self._expiries[key] = expiry
+            self._index(key, expiry)
+            self.alert_counts[match.rule_id] = (
+                self.alert_counts.get(match.rule_id, 0) + 1
+            )
+        else:
+            alert.matches += 1
+            alert.first_seen = min(alert.first_seen, timestamp)
+            alert.last_seen = max(alert.last_seen, timestamp)
+
+        return closed
+
+    def flush(self) -> typing.List[GroupedAlert]:
+        """Close every open alert, oldest first"""
+
+        closed = [self._close(key) for key in list(self._open)]
+        self._buckets.clear()
+        self._bucket_heap.clear()
+        return sorted(closed, key=lambda alert: alert.first_seen)
+
+    def _index(self, key: typing.Tuple[str, str], expiry: float) -> None:
+        bucket = int(expiry // self.bucket_seconds)
+        if bucket not in self._buckets:
+            self._buckets[bucket] = []
+            heapq.heappush(self._bucket_heap, bucket)
+        self._buckets[bucket].append(key)
+
+    def _evict(self, now: float) -> typing.List[GroupedAlert]:
+        closed = []
+        current = int(now // self.bucket_seconds)
+
+        while self._bucket_heap and self._bucket_heap[0] < current:
+            bucket = heapq.heappop(self._bucket_heap)
+            for key in self._buckets.pop(bucket):
+                # the key may have been closed and reopened with a later expiry since
+                expiry = self._expiries.get(key)
+                if expiry is not None and int(expiry // self.bucket_seconds) == bucket:
+                    closed.append(self._close(key))
+
+        return sorted(closed, key=lambda alert: alert.first_seen)
+
+    def _close(self, key: typing.Tuple[str, str]) -> GroupedAlert:
+        del self._expiries[key]
+        return self._open.pop(key)
+
+
+def group_alerts(
+    matches: typing.Iterable[Match],
+    rule_set: typing.Sequence[detection.Rule],
+    default_period_minutes: int = DEFAULT_DEDUP_PERIOD_MINUTES,
+) -> typing.Iterator[GroupedAlert]:
+    """Group a stream of matches into alerts, yielding each alert once it closes"""
+
+    grouper = AlertGrouper(rule_set, default_period_minutes)
+    for match in matches:
+        yield from grouper.add(match)
+    yield from grouper.flush()
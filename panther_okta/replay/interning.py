@@ -0,0 +1,98 @@
+import typing
+
+__all__ = ["DEFAULT_INTERN_PATHS", "StringInterner"]
+
+# Low-cardinality System Log fields the rules read or group on
+DEFAULT_INTERN_PATHS: typing.Tuple[str, ...] = (
+    "eventType",
+    "legacyEventType",
+    "displayMessage",
+    "severity",
+    "outcome.result",
+    "outcome.reason",
+    "actor.type",
+    "target.type",
+    "client.device",
+    "client.zone",
+    "client.userAgent.browser",
+    "client.userAgent.os",
+    "client.geographicalContext.city",
+    "client.geographicalContext.state",
+    "client.geographicalContext.country",
+    "transaction.type",
+    "p_log_type",
+    "p_source_label",
+)
+
+
+class StringInterner:
+    """Replaces repeated strings at the given dotted paths with one shared copy.
+
+    Decoding allocates a fresh string for every value of every event; over a multi-day replay the
+    same few hundred eventTypes, outcomes and cities are held millions of times. The table is
+    bounded: once max_size distinct strings are stored, new ones pass through unchanged, so a
+    path that turns out to be high-cardinality can't grow it without limit. Lists along a path
+    are walked element by element.
+    """
+
+    def __init__(
+        self,
+        paths: typing.Iterable[str] = DEFAULT_INTERN_PATHS,
+        max_size: int = 65536,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.paths = tuple(tuple(path.split(".")) for path in paths)
+        self.max_size = max_size
+        self.table: typing.Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.overflows = 0
+
+    def __call__(
+        self, data: typing.MutableMapping[str, typing.Any]
+    ) -> typing.MutableMapping[str, typing.Any]:
+        """Intern the configured paths of a decoded event in place and return it"""
+
+        for path in self.paths:
+            self._intern_path(data, path)
+        return data
+
+    def intern(self, value: str) -> str:
+        shared = self.table.get(value)
+        if shared is not None:
+            self.hits += 1
+            return shared
+
+        self.misses += 1
+        if len(self.table) < self.max_size:
+            self.table[value] = value
+        else:
+            self.overflows += 1
+        return value
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _intern_path(self, node: typing.Any, path: typing.Tuple[str, ...]) -> None:
+        if isinstance(node, list):
+            for item in node:
+                self._intern_path(item, path)
+            return
+
+        if not isinstance(node, dict) or path[0] not in node:
+            return
+
+        key = path[0]
+        if len(path) > 1:
+            self._intern_path(node[key], path[1:])
+        elif isinstance(node[key], str):
+            node[key] = self.intern(node[key])
+        elif isinstance(node[key], list):
+            node[key] = [
+                self.intern(item) if isinstance(item, str) else item
+                for item in node[key]
+            ]
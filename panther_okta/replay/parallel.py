@@ -0,0 +1,118 @@
+import os
+import typing
+import concurrent.futures
+
+from panther_sdk import detection
+
+from .evaluate import Match, RuleError, default_rules, evaluate, to_event
+from .sharding import StateKey, actor_key, shard_of, state_key
+from .state import MemoryKV, installed
+
+__all__ = ["actor_shard", "parallel_replay"]
+
+RuleFactory = typing.Callable[[], typing.Sequence[detection.Rule]]
+
+# (input position, event) pairs so the merge can restore a total order
+_Shard = typing.List[typing.Tuple[int, typing.Mapping[str, typing.Any]]]
+
+
+def actor_shard(event: typing.Mapping[str, typing.Any], shards: int) -> int:
+    """Stable shard for an event's actor; every event of one actor lands on the same shard"""
+
+    return shard_of(actor_key(event), shards)
+
+
+def parallel_replay(
+    events: typing.Iterable[typing.Mapping[str, typing.Any]],
+    rule_factory: RuleFactory = default_rules,
+    workers: typing.Optional[int] = None,
+    errors: typing.Optional[typing.List[RuleError]] = None,
+) -> typing.List[Match]:
+    """Evaluate a rule set over decoded events using one process per shard.
+
+    Rules are grouped by what their state is keyed by (see state_key), and each group's events
+    are sharded by that key: per-user rules by actor, password_spray by source IP, and rules
+    with state shared by every event onto a single shard. Stateless rules go with the per-user
+    rules. Each shard gets its own MemoryKV and processes its events in p_event_time order.
+    Matches are merged by (p_event_time, input position, rule position), which makes the output
+    identical for any worker count. rule_factory must be a module-level callable so it can be
+    sent to the worker processes. When an errors list is given, rule exceptions are collected
+    there instead of raised.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    groups: typing.Dict[StateKey, typing.List[int]] = {}
+    for position, rule in enumerate(rule_factory()):
+        groups.setdefault(state_key(rule) or actor_key, []).append(position)
+
+    tasks: typing.List[typing.Tuple[typing.List[int], _Shard]] = [
+        (positions, []) for positions in groups.values() for _ in range(workers)
+    ]
+    for position, event in enumerate(events):
+        for group, key in enumerate(groups):
+            tasks[group * workers + shard_of(key(event), workers)][1].append(
+                (position, event)
+            )
+    tasks = [(positions, shard) for positions, shard in tasks if shard]
+
+    collect = errors is not None
+    if workers == 1:
+        results = [
+            _replay_shard(rule_factory, positions, shard, collect)
+            for positions, shard in tasks
+        ]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(
+                pool.map(
+                    _replay_shard,
+                    [rule_factory] * len(tasks),
+                    [positions for positions, _ in tasks],
+                    [shard for _, shard in tasks],
+                    [collect] * len(tasks),
+                )
+            )
+
+    merged = [item for matches, _ in results for item in matches]
+    merged.sort(key=lambda item: item[0])
+
+    if errors is not None:
+        failed = [item for _, shard_errors in results for item in shard_errors]
+        failed.sort(key=lambda item: item[0])
+        errors.extend(error for _, error in failed)
+
+    return [match for _, match in merged]
+
+
+def _event_time(event: typing.Mapping[str, typing.Any]) -> str:
+    return str(event.get("p_event_time") or "")
+
+
+_OrderKey = typing.Tuple[str, int, int]
+
+
+def _replay_shard(
+    rule_factory: RuleFactory, positions: typing.List[int], shard: _Shard, collect: bool
+) -> typing.Tuple[
+    typing.List[typing.Tuple[_OrderKey, Match]],
+    typing.List[typing.Tuple[_OrderKey, RuleError]],
+]:
+    rules = list(rule_factory())
+    rule_set = [rules[i] for i in positions]
+    rule_positions = {rule.rule_id: i for i, rule in enumerate(rules)}
+    # sort is stable, so events with equal timestamps keep their input order
+    ordered = sorted(shard, key=lambda item: _event_time(item[1]))
+
+    matches = []
+    failed = []
+    with installed(MemoryKV()):
+        for position, data in ordered:
+            errors: typing.Optional[typing.List[RuleError]] = [] if collect else None
+            for match in evaluate(rule_set, [to_event(data)], errors=errors):
+                key = (_event_time(data), position, rule_positions[match.rule_id])
+                matches.append((key, match))
+            for error in errors or []:
+                key = (_event_time(data), position, rule_positions[error.rule_id])
+                failed.append((key, error))
+
+    return matches, failed
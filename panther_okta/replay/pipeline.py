@@ -0,0 +1,527 @@
+import time
+import zlib
+import queue
+import contextlib
+import typing
+import threading
+import dataclasses
+import concurrent.futures
+
+from panther_sdk import detection
+
+from .dedup import DuplicateFilter
+from .evaluate import Match, RuleError, render_match, rule_matches, to_event
+from .interning import StringInterner
+from .prefilter import EventTypePrefilter, event_type_literals, line_decoder
+from .sharding import StateKey, actor_key, state_key, stateful
+from .state import MemoryKV, installed, observe
+
+__all__ = [
+    "Pipeline",
+    "Stage",
+    "StageMetrics",
+    "rule_pipeline",
+    "run_rules",
+]
+
+# polling interval for blocked workers to notice that the pipeline is stopping
+_TICK = 0.1
+
+
+class _Done:
+    pass
+
+
+_DONE = _Done()
+
+
+@dataclasses.dataclass
+class Stage:
+    """One step of a Pipeline
+
+    - name -- Label used in metrics
+    - func -- Maps one input item to any number of output items
+    - workers -- Number of worker threads, or processes when processes is set
+    - processes -- Run func in a process pool; func and items must be picklable
+    - key -- Routes items with equal keys to the same worker, preserving their order
+    - ordered -- Passes outputs on in the order the stage took its items, across all workers
+    - batch_size -- Items handed to the process pool per round trip, when processes is set
+    """
+
+    name: str
+    func: typing.Callable[[typing.Any], typing.Iterable[typing.Any]]
+    workers: int = 1
+    processes: bool = False
+    key: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None
+    ordered: bool = False
+    batch_size: int = 1
+
+
+@dataclasses.dataclass
+class StageMetrics:
+    """Counters for one stage; blocked time means a slower stage downstream throttled this one
+
+    - processed -- Items taken from the input queue
+    - depth -- Items waiting in the input queue
+    - max_depth -- Most items ever waiting in the input queue
+    - blocked_seconds -- Worker time spent waiting for room downstream
+    - idle_seconds -- Worker time spent waiting for input
+    """
+
+    name: str
+    workers: int
+    processed: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    blocked_seconds: float = 0.0
+    idle_seconds: float = 0.0
+
+
+class _StageRun:
+    def __init__(self, stage: Stage, queue_size: int) -> None:
+        self.stage = stage
+        count = stage.workers if stage.key is not None else 1
+        self.queues: typing.List["queue.Queue[typing.Any]"] = [
+            queue.Queue(maxsize=queue_size) for _ in range(count)
+        ]
+        self.metrics = StageMetrics(stage.name, stage.workers)
+        self.lock = threading.Lock()
+        self.finished = 0
+        # ordered stages number items as they are taken, and hold finished outputs in pending
+        # until every earlier item's outputs have been passed on
+        self.taking = threading.Lock()
+        self.taken = 0
+        self.released = 0
+        self.pending: typing.Dict[int, typing.List[typing.Any]] = {}
+        self.order = threading.Condition()
+
+    def input_for(self, worker: int) -> "queue.Queue[typing.Any]":
+        return self.queues[worker if self.stage.key is not None else 0]
+
+    def route(self, item: typing.Any) -> "queue.Queue[typing.Any]":
+        if self.stage.key is None:
+            return self.queues[0]
+        key = str(self.stage.key(item)).encode("utf-8")
+        return self.queues[zlib.crc32(key) % len(self.queues)]
+
+    def record_depth(self) -> None:
+        depth = sum(q.qsize() for q in self.queues)
+        with self.lock:
+            self.metrics.depth = depth
+            self.metrics.max_depth = max(self.metrics.max_depth, depth)
+
+
+class Pipeline:
+    """Runs items through stages connected by bounded queues.
+
+    Every queue holds at most queue_size items, so when a stage falls behind (a slow KV lookup or
+    sink), the stages before it block and reading slows down instead of buffering without limit.
+    Stages run on threads; a stage with processes set hands batches of items to a process pool
+    from its threads, which suits CPU-bound work like JSON decoding. An ordered stage holds the
+    outputs of items that finish early, at most queue_size of them, so the next stage sees them
+    in input order. The first error stops the pipeline and is re-raised by run().
+    """
+
+    def __init__(self, stages: typing.Sequence[Stage], queue_size: int = 1024) -> None:
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        if queue_size < 1 or any(
+            stage.workers < 1 or stage.batch_size < 1 for stage in stages
+        ):
+            raise ValueError(
+                "queue_size, stage workers and batch sizes must be at least 1"
+            )
+        if any(stage.ordered and stage.key is not None for stage in stages):
+            raise ValueError(
+                "a keyed stage keeps each key's order and can't be ordered"
+            )
+
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self._runs: typing.List[_StageRun] = []
+        self._read = StageMetrics("read", 1)
+        self._stop = threading.Event()
+        self._error: typing.Optional[BaseException] = None
+
+    def metrics(self) -> typing.List[StageMetrics]:
+        """A snapshot of the read stage and every other stage, in pipeline order"""
+
+        snapshot = [dataclasses.replace(self._read)]
+        for run in self._runs:
+            run.record_depth()
+            with run.lock:
+                snapshot.append(dataclasses.replace(run.metrics))
+        return snapshot
+
+    def run(self, source: typing.Iterable[typing.Any]) -> typing.List[StageMetrics]:
+        """Feed source through the stages until it is exhausted, returning the final metrics"""
+
+        self._runs = [_StageRun(stage, self.queue_size) for stage in self.stages]
+        self._read = StageMetrics("read", 1)
+        self._stop.clear()
+        self._error = None
+
+        pools = [
+            concurrent.futures.ProcessPoolExecutor(max_workers=run.stage.workers)
+            if run.stage.processes
+            else None
+            for run in self._runs
+        ]
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(index, worker, pools[index]),
+                name=f"{run.stage.name}-{worker}",
+                daemon=True,
+            )
+            for index, run in enumerate(self._runs)
+            for worker in range(run.stage.workers)
+        ]
+
+        try:
+            for thread in threads:
+                thread.start()
+            self._feed(source)
+            for thread in threads:
+                thread.join()
+        finally:
+            self._stop.set()
+            for pool in pools:
+                if pool is not None:
+                    pool.shutdown()
+
+        if self._error is not None:
+            raise self._error
+        return self.metrics()
+
+    def _feed(self, source: typing.Iterable[typing.Any]) -> None:
+        try:
+            for item in source:
+                self._read.processed += 1
+                self._read.blocked_seconds += self._put(self._runs[0], item)
+        except _Stopped:
+            return
+        except BaseException as err:
+            self._fail(err)
+            return
+
+        self._close(self._runs[0])
+
+    def _work(
+        self,
+        index: int,
+        worker: int,
+        pool: typing.Optional[concurrent.futures.ProcessPoolExecutor],
+    ) -> None:
+        run = self._runs[index]
+        downstream = self._runs[index + 1] if index + 1 < len(self._runs) else None
+        source = run.input_for(worker)
+        blocked = idle = 0.0
+
+        try:
+            while True:
+                waited = time.monotonic()
+                first, items, done = self._take(run, source, pool)
+                idle += time.monotonic() - waited
+
+                if items:
+                    run.record_depth()
+                    results: typing.Sequence[typing.Iterable[typing.Any]]
+                    if pool is not None:
+                        # one round trip to the pool per batch
+                        results = pool.submit(_apply, run.stage.func, items).result()
+                    else:
+                        results = [run.stage.func(item) for item in items]
+
+                    for offset, outputs in enumerate(results):
+                        if run.stage.ordered:
+                            blocked += self._release(
+                                run, downstream, first + offset, list(outputs)
+                            )
+                            continue
+                        for output in outputs:
+                            if downstream is not None:
+                                blocked += self._put(downstream, output)
+
+                    with run.lock:
+                        run.metrics.processed += len(items)
+                        run.metrics.blocked_seconds += blocked
+                        run.metrics.idle_seconds += idle
+                    blocked = idle = 0.0
+
+                if done:
+                    break
+        except _Stopped:
+            return
+        except BaseException as err:
+            self._fail(err)
+            return
+
+        with run.lock:
+            run.metrics.idle_seconds += idle
+            run.finished += 1
+            last = run.finished == run.stage.workers
+        if last and downstream is not None:
+            self._close(downstream)
+
+    def _take(
+        self,
+        run: _StageRun,
+        source: "queue.Queue[typing.Any]",
+        pool: typing.Optional[concurrent.futures.ProcessPoolExecutor],
+    ) -> typing.Tuple[int, typing.List[typing.Any], bool]:
+        """A worker's next items, the sequence number of the first, and whether input ended"""
+
+        if run.stage.ordered:
+            # don't run further ahead of the oldest unfinished item than a queue holds
+            with run.order:
+                while len(run.pending) >= self.queue_size:
+                    run.order.wait(_TICK)
+                    if self._stop.is_set():
+                        raise _Stopped()
+
+        size = run.stage.batch_size if pool is not None else 1
+        # items of an ordered stage are numbered as they are taken, so workers take in turn
+        taking: typing.ContextManager[typing.Any] = contextlib.nullcontext()
+        if run.stage.ordered:
+            taking = run.taking
+        with taking:
+            items = [self._get(source)]
+            while len(items) < size and items[-1] is not _DONE:
+                try:
+                    items.append(source.get_nowait())
+                except queue.Empty:
+                    break
+            done = items[-1] is _DONE
+            if done:
+                items.pop()
+            first = run.taken
+            run.taken += len(items)
+        return first, items, done
+
+    def _release(
+        self,
+        run: _StageRun,
+        downstream: typing.Optional[_StageRun],
+        sequence: int,
+        outputs: typing.List[typing.Any],
+    ) -> float:
+        """Pass on outputs after those of every earlier item, returning the time blocked"""
+
+        blocked = 0.0
+        with run.order:
+            run.pending[sequence] = outputs
+            while run.released in run.pending:
+                for output in run.pending.pop(run.released):
+                    if downstream is not None:
+                        blocked += self._put(downstream, output)
+                run.released += 1
+            run.order.notify_all()
+        return blocked
+
+    def _get(self, source: "queue.Queue[typing.Any]") -> typing.Any:
+        while True:
+            try:
+                return source.get(timeout=_TICK)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise _Stopped()
+
+    def _put(self, run: _StageRun, item: typing.Any) -> float:
+        """Queue an item for a stage, returning how long the caller was blocked"""
+
+        waited = self._enqueue(run.route(item), item)
+        run.record_depth()
+        return waited
+
+    def _enqueue(self, target: "queue.Queue[typing.Any]", item: typing.Any) -> float:
+        started = time.monotonic()
+        while True:
+            try:
+                target.put(item, timeout=_TICK)
+                return time.monotonic() - started
+            except queue.Full:
+                if self._stop.is_set():
+                    raise _Stopped()
+
+    def _close(self, run: _StageRun) -> None:
+        """Tell every worker of a stage that no more input is coming"""
+
+        targets = (
+            run.queues if run.stage.key is not None else run.queues * run.stage.workers
+        )
+        try:
+            for target in targets:
+                self._enqueue(target, _DONE)
+        except _Stopped:
+            pass
+
+    def _fail(self, err: BaseException) -> None:
+        if self._error is None:
+            self._error = err
+        self._stop.set()
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _apply(
+    func: typing.Callable[[typing.Any], typing.Iterable[typing.Any]],
+    items: typing.List[typing.Any],
+) -> typing.List[typing.List[typing.Any]]:
+    # generators can't be sent back from a worker process
+    return [list(func(item)) for item in items]
+
+
+class _Decode:
+    """Picklable decode stage: prefilter raw lines, then decode them"""
+
+    def __init__(
+        self,
+        prefilter: typing.Optional[EventTypePrefilter],
+        decoder: typing.Callable[[typing.Any], typing.Any],
+    ) -> None:
+        self.prefilter = prefilter
+        self.decoder = decoder
+
+    def __call__(
+        self, line: typing.Union[bytes, memoryview]
+    ) -> typing.List[typing.Any]:
+        if isinstance(line, memoryview):
+            line = line.tobytes()
+        if not line.strip() or (
+            self.prefilter is not None and not self.prefilter(line)
+        ):
+            return []
+        return [self.decoder(line)]
+
+
+def rule_pipeline(
+    rule_set: typing.Sequence[detection.Rule],
+    sink: typing.Callable[[Match], None],
+    decode_workers: int = 2,
+    decode_processes: bool = False,
+    decode_batch_size: int = 256,
+    filter_workers: int = 1,
+    alert_workers: int = 1,
+    sink_workers: int = 1,
+    queue_size: int = 1024,
+    prefilter: bool = True,
+    project: bool = False,
+    interner: typing.Optional[StringInterner] = None,
+    errors: typing.Optional[typing.List[RuleError]] = None,
+    duplicates: typing.Optional[DuplicateFilter] = None,
+) -> Pipeline:
+    """A decode, route, filter, alert and sink Pipeline over raw System Log JSONL lines.
+
+    Decoding is ordered, so events reach the route stage in input order whatever the number of
+    decode workers. With several filter workers, rules are grouped by what their state is keyed
+    by (see state_key), the route stage hands each event to every group, and filter workers are
+    sharded by that key, so the events sharing a key reach a rule in order, on one thread.
+    The installed store is shared by every filter worker, so stateful rules take turns on it
+    while stateless ones run in parallel.
+    Stateful rules render their title and context in the filter stage, because those read state
+    that later events would change; other matches are rendered in the alert stage. Run it inside
+    installed() (or use run_rules) when the rule set is stateful. duplicates drops redelivered
+    events in the route stage, before any rule runs.
+    """
+
+    rules = list(rule_set)
+    deferred = [not stateful(rule) for rule in rules]
+
+    groups: typing.Dict[StateKey, typing.List[int]] = {}
+    for index, rule in enumerate(rules):
+        key = state_key(rule) if filter_workers > 1 else None
+        groups.setdefault(key or actor_key, []).append(index)
+    keys = list(groups)
+    members = list(groups.values())
+
+    matcher = None
+    event_types = event_type_literals(rules) if prefilter else None
+    if event_types is not None:
+        matcher = EventTypePrefilter(event_types)
+    # interning in a worker process would be undone when results are pickled back
+    decoder = line_decoder(rules, project, None if decode_processes else interner)
+
+    def _route(data: typing.Any) -> typing.List[typing.Tuple[int, typing.Any]]:
+        if duplicates is not None and not duplicates(data):
+            return []
+        if decode_processes and interner is not None:
+            data = interner(data)
+        return [(group, data) for group in range(len(members))]
+
+    def _shard(item: typing.Tuple[int, typing.Any]) -> str:
+        group, data = item
+        return f"{group}:{keys[group](data)}"
+
+    # every filter worker shares the installed MemoryKV and its clock, neither of which is
+    # thread-safe, so stateful rules run and render under one lock
+    state_lock = threading.Lock()
+    unlocked: typing.ContextManager[typing.Any] = contextlib.nullcontext()
+
+    def _filter(item: typing.Tuple[int, typing.Any]) -> typing.List[typing.Any]:
+        group, data = item
+        with state_lock:
+            observe(data)
+        event = to_event(data)
+        outputs: typing.List[typing.Any] = []
+        for index in members[group]:
+            rule = rules[index]
+            with unlocked if deferred[index] else state_lock:
+                try:
+                    matched = rule_matches(rule, event)
+                except Exception as err:
+                    if errors is None:
+                        raise
+                    errors.append(
+                        RuleError(rule_id=rule.rule_id, error=err, event=event)
+                    )
+                    continue
+                if matched:
+                    outputs.append(
+                        (index, event) if deferred[index] else render_match(rule, event)
+                    )
+        return outputs
+
+    def _alert(item: typing.Any) -> typing.List[Match]:
+        if isinstance(item, Match):
+            return [item]
+        index, event = item
+        return [render_match(rules[index], event)]
+
+    def _sink(match: Match) -> typing.List[typing.Any]:
+        sink(match)
+        return []
+
+    return Pipeline(
+        [
+            Stage(
+                "decode",
+                _Decode(matcher, decoder),
+                decode_workers,
+                decode_processes,
+                ordered=True,
+                batch_size=decode_batch_size,
+            ),
+            Stage("route", _route),
+            Stage("filter", _filter, filter_workers, key=_shard),
+            Stage("alert", _alert, alert_workers),
+            Stage("sink", _sink, sink_workers),
+        ],
+        queue_size=queue_size,
+    )
+
+
+def run_rules(
+    lines: typing.Iterable[typing.Union[bytes, memoryview]],
+    rule_set: typing.Sequence[detection.Rule],
+    sink: typing.Callable[[Match], None],
+    store: typing.Optional[MemoryKV] = None,
+    **options: typing.Any,
+) -> typing.List[StageMetrics]:
+    """Run lines through a rule_pipeline with store installed for stateful rules"""
+
+    pipeline = rule_pipeline(rule_set, sink, **options)
+    with installed(store or MemoryKV()):
+        return pipeline.run(lines)
@@ -0,0 +1,325 @@
+import re
+import json
+import time
+import typing
+import asyncio
+import datetime
+import functools
+import dataclasses
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from panther_sdk import detection
+
+from .._shared import SYSTEM_LOG_TYPE
+from .clock import PANTHER_TIME_FORMAT
+from .evaluate import Match, RuleError, evaluate, to_event
+from .state import MemoryKV, installed
+
+__all__ = [
+    "AdaptiveLimit",
+    "Org",
+    "SystemLogPoller",
+    "next_link",
+    "to_panther_event",
+]
+
+_NEXT_LINK = re.compile(r'<([^>]+)>\s*;\s*rel="?next"?')
+
+
+@dataclasses.dataclass
+class Org:
+    """An Okta org to poll
+
+    - name -- Label for the org; matches and state are kept apart per org
+    - base_url -- e.g. https://example.okta.com
+    - token -- API token, sent as SSWS
+    - since -- ISO 8601 start of the first poll, when there is no after cursor
+    - after -- Opaque cursor from a previous run
+    - limit -- Events per page
+    """
+
+    name: str
+    base_url: str
+    token: str
+    since: typing.Optional[str] = None
+    after: typing.Optional[str] = None
+    limit: int = 1000
+    next_url: typing.Optional[str] = None
+
+    def url(self) -> str:
+        """The URL of the next page to fetch"""
+
+        if self.next_url:
+            return self.next_url
+
+        params = {"limit": str(self.limit)}
+        if self.after:
+            params["after"] = self.after
+        elif self.since:
+            params["since"] = self.since
+        return (
+            f"{self.base_url.rstrip('/')}/api/v1/logs?{urllib.parse.urlencode(params)}"
+        )
+
+
+def next_link(header: typing.Optional[str]) -> typing.Optional[str]:
+    """The rel="next" URL of a Link header, if any"""
+
+    match = _NEXT_LINK.search(header or "")
+    return match.group(1) if match else None
+
+
+def to_panther_event(
+    event: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    """Add the p_ fields Panther sets when it ingests a System Log event"""
+
+    event.setdefault("p_log_type", SYSTEM_LOG_TYPE)
+    if "uuid" in event:
+        event.setdefault("p_row_id", event["uuid"])
+
+    published = event.get("published")
+    if isinstance(published, str) and "p_event_time" not in event:
+        try:
+            parsed = datetime.datetime.fromisoformat(published.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+        else:
+            utc = parsed.astimezone(datetime.timezone.utc)
+            event["p_event_time"] = utc.strftime(PANTHER_TIME_FORMAT)
+
+    return event
+
+
+class AdaptiveLimit:
+    """A concurrency limit that halves when a server rate-limits and creeps back up otherwise"""
+
+    def __init__(self, maximum: int) -> None:
+        if maximum < 1:
+            raise ValueError("maximum must be at least 1")
+
+        self.maximum = maximum
+        self.limit = maximum
+        self.active = 0
+        self._changed = asyncio.Condition()
+
+    async def __aenter__(self) -> "AdaptiveLimit":
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, *args: typing.Any) -> None:
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify_all()
+
+    async def decrease(self) -> None:
+        async with self._changed:
+            self.limit = max(1, self.limit // 2)
+
+    async def increase(self) -> None:
+        async with self._changed:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._changed.notify_all()
+
+
+@dataclasses.dataclass
+class _Response:
+    status: int
+    # lower-cased names
+    headers: typing.Mapping[str, str]
+    body: bytes
+
+
+@dataclasses.dataclass
+class _RateLimit:
+    remaining: typing.Optional[int] = None
+    reset: float = 0.0
+
+
+class SystemLogPoller:
+    """Polls /api/v1/logs for several orgs and evaluates new events as they arrive.
+
+    Each org's pages are fetched in order by following the Link rel="next" cursor, so an org
+    has one request in flight at a time; orgs are polled concurrently under one AdaptiveLimit
+    of at most max_concurrency requests. The rate limit headers resize that limit: a 429, or a
+    response leaving an org only reserve requests, halves it, and any other response grows it
+    back by one. Each org also tracks its own X-Rate-Limit-Remaining and X-Rate-Limit-Reset,
+    and once only reserve requests remain it waits for the reset. An org that fails keeps the
+    matches of the pages it evaluated, its cursor moves past only those pages, and its error
+    is kept in failures until a later poll succeeds. HTTP runs on urllib in the default
+    executor, so no extra dependencies are needed.
+    """
+
+    def __init__(
+        self,
+        orgs: typing.Sequence[Org],
+        rule_set: typing.Sequence[detection.Rule],
+        max_concurrency: int = 4,
+        reserve: int = 1,
+        max_pages: int = 10,
+        retries: int = 3,
+        timeout: float = 30.0,
+        errors: typing.Optional[typing.List[RuleError]] = None,
+        clock: typing.Callable[[], float] = time.time,
+    ) -> None:
+        self.orgs = list(orgs)
+        self.rule_set = [
+            rule for rule in rule_set if SYSTEM_LOG_TYPE in (rule.log_types or [])
+        ]
+        self.max_concurrency = max_concurrency
+        self.reserve = reserve
+        self.max_pages = max_pages
+        self.retries = retries
+        self.timeout = timeout
+        self.errors = errors
+        self.clock = clock
+        self.stores = {org.name: MemoryKV(now=clock) for org in self.orgs}
+        self.concurrency = max_concurrency
+        self.failures: typing.Dict[str, Exception] = {}
+        self._rate_limits = {org.name: _RateLimit() for org in self.orgs}
+
+    async def poll_once(self) -> typing.List[Match]:
+        """Fetch every org up to the present (or max_pages) and return the matches"""
+
+        # asyncio primitives belong to one loop, so only the current limit outlives a poll
+        limit = AdaptiveLimit(self.max_concurrency)
+        limit.limit = self.concurrency
+        try:
+            results = await asyncio.gather(
+                *(self._poll_org(org, limit) for org in self.orgs)
+            )
+        finally:
+            self.concurrency = limit.limit
+
+        matches: typing.List[Match] = []
+        for org, (org_matches, next_url, error) in zip(self.orgs, results):
+            # only now that its matches are handed over does the org move past them
+            org.next_url = next_url
+            matches += org_matches
+            if error is None:
+                self.failures.pop(org.name, None)
+            else:
+                self.failures[org.name] = error
+        return matches
+
+    async def run(
+        self, interval: float = 10.0, stop: typing.Optional[asyncio.Event] = None
+    ) -> typing.AsyncIterator[typing.List[Match]]:
+        """Poll every interval seconds until stop is set, yielding non-empty batches of matches"""
+
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            matches = await self.poll_once()
+            if matches:
+                yield matches
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll_org(
+        self, org: Org, limit: AdaptiveLimit
+    ) -> typing.Tuple[
+        typing.List[Match], typing.Optional[str], typing.Optional[Exception]
+    ]:
+        matches: typing.List[Match] = []
+        next_url = org.next_url
+
+        try:
+            for _ in range(self.max_pages):
+                response = await self._fetch(org, next_url or org.url(), limit)
+                events = json.loads(response.body or b"[]")
+
+                with installed(self.stores[org.name]):
+                    matches += evaluate(
+                        self.rule_set,
+                        (to_event(to_panther_event(event)) for event in events),
+                        errors=self.errors,
+                    )
+
+                link = next_link(response.headers.get("link"))
+                # Okta always links the next page of a /logs poll, even when it is empty for now
+                if link:
+                    next_url = link
+                if not link or len(events) < org.limit:
+                    break
+        except Exception as err:
+            return matches, next_url, err
+
+        return matches, next_url, None
+
+    async def _fetch(self, org: Org, url: str, limit: AdaptiveLimit) -> _Response:
+        rate_limit = self._rate_limits[org.name]
+
+        for attempt in range(self.retries + 1):
+            await self._wait_for_budget(rate_limit)
+
+            async with limit:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(self._request, url, org.token)
+                )
+
+            self._track(rate_limit, response.headers)
+
+            if response.status == 429:
+                rate_limit.remaining = 0
+                if "x-rate-limit-reset" not in response.headers:
+                    # Okta's rate limit windows are one minute
+                    rate_limit.reset = self.clock() + 60
+                await limit.decrease()
+                continue
+            if response.status >= 500 and attempt < self.retries:
+                await asyncio.sleep(2**attempt)
+                continue
+            if response.status >= 400:
+                raise RuntimeError(
+                    f"{org.name}: GET /api/v1/logs failed with HTTP {response.status}"
+                )
+
+            if rate_limit.remaining is None or rate_limit.remaining > self.reserve:
+                await limit.increase()
+            else:
+                await limit.decrease()
+            return response
+
+        raise RuntimeError(
+            f"{org.name}: still rate limited after {self.retries} retries"
+        )
+
+    async def _wait_for_budget(self, rate_limit: _RateLimit) -> None:
+        if rate_limit.remaining is None or rate_limit.remaining > self.reserve:
+            return
+
+        delay = rate_limit.reset - self.clock()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        rate_limit.remaining = None
+
+    def _track(self, rate_limit: _RateLimit, headers: typing.Mapping[str, str]) -> None:
+        remaining = headers.get("x-rate-limit-remaining", "")
+        reset = headers.get("x-rate-limit-reset", "")
+        if remaining.isdigit():
+            rate_limit.remaining = int(remaining)
+        if reset.isdigit():
+            rate_limit.reset = float(reset)
+
+    def _request(self, url: str, token: str) -> _Response:
+        request = urllib.request.Request(
+            url,
+            headers={"Accept": "application/json", "Authorization": f"SSWS {token}"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return _Response(
+                    response.status, _lower(response.headers.items()), response.read()
+                )
+        except urllib.error.HTTPError as err:
+            return _Response(err.code, _lower(err.headers.items()), err.read())
+
+
+def _lower(headers: typing.Iterable[typing.Tuple[str, str]]) -> typing.Dict[str, str]:
+    return {name.lower(): value for name, value in headers}
@@ -0,0 +1,169 @@
+import re
+import json
+import inspect
+import typing
+
+from panther_sdk import detection
+
+from .dedup import DuplicateFilter
+from .evaluate import Match, RuleError, evaluate, rule_filters, to_event
+from .interning import StringInterner
+from .projection import ProjectedDecoder, rule_paths
+from .reorder import ReorderBuffer, reordered
+
+__all__ = [
+    "EventTypePrefilter",
+    "decode_lines",
+    "event_type_literals",
+    "line_decoder",
+    "projected_decoder",
+    "replay_lines",
+]
+
+
+def event_type_literals(
+    rule_set: typing.Sequence[detection.Rule],
+) -> typing.Optional[typing.FrozenSet[str]]:
+    """The eventTypes any rule in the set can match, or None when a rule accepts every eventType.
+
+    Literals are read from the deep_equal/deep_in("eventType", ...) filters each rule is built
+    from. Filters are AND-ed, so one such filter is enough to bound a rule.
+    """
+
+    literals: typing.Set[str] = set()
+
+    for rule in rule_set:
+        bound = _rule_event_types(rule)
+        if bound is None:
+            return None
+        literals.update(bound)
+
+    return frozenset(literals)
+
+
+class EventTypePrefilter:
+    """Byte-level matcher for raw JSON lines that could carry one of the given eventTypes.
+
+    Lines that fail the check can be discarded without decoding them. The matcher only needs to
+    avoid false negatives; false positives are decoded and dropped by the rule filters as usual.
+    """
+
+    def __init__(self, event_types: typing.Iterable[str]) -> None:
+        # longest first so a literal never shadows a longer one sharing its prefix
+        literals = sorted(
+            {e.encode("utf-8") for e in event_types}, key=len, reverse=True
+        )
+        alternatives = b"|".join(re.escape(e) for e in literals)
+        self._pattern = re.compile(rb'"eventType"\s*:\s*"(?:' + alternatives + rb')"')
+        self.seen = 0
+        self.passed = 0
+
+    def __call__(self, line: typing.Union[bytes, memoryview]) -> bool:
+        self.seen += 1
+        if self._pattern.search(line):
+            self.passed += 1
+            return True
+        return False
+
+
+def decode_lines(
+    lines: typing.Iterable[typing.Union[bytes, memoryview]],
+    prefilter: typing.Optional[typing.Callable[[typing.Any], bool]] = None,
+    decoder: typing.Callable[[bytes], typing.Any] = json.loads,
+    duplicates: typing.Optional[DuplicateFilter] = None,
+) -> typing.Iterator[typing.Any]:
+    """Decode JSONL lines into events, skipping blank lines, lines the prefilter rejects and
+    events duplicates has already seen"""
+
+    for line in lines:
+        if prefilter is not None and not prefilter(line):
+            continue
+        if isinstance(line, memoryview):
+            line = line.tobytes()
+        if not line.strip():
+            continue
+        data = decoder(line)
+        if duplicates is not None and not duplicates(data):
+            continue
+        yield to_event(data)
+
+
+def replay_lines(
+    lines: typing.Iterable[typing.Union[bytes, memoryview]],
+    rule_set: typing.Sequence[detection.Rule],
+    prefilter: bool = True,
+    errors: typing.Optional[typing.List[RuleError]] = None,
+    project: bool = False,
+    interner: typing.Optional[StringInterner] = None,
+    duplicates: typing.Optional[DuplicateFilter] = None,
+    reorder: typing.Optional[ReorderBuffer] = None,
+) -> typing.Iterator[Match]:
+    """Evaluate raw System Log JSONL against a rule set, prefiltering on eventType when possible.
+
+    With project set, events only keep the fields the rule set reads (see rule_paths), so the
+    events attached to matches are partial. An interner shares repeated strings across events.
+    Redelivered events that duplicates has already seen are dropped before any rule runs. With
+    a reorder buffer, events reach the rules in p_event_time order within its window.
+    """
+
+    matcher = None
+    if prefilter:
+        event_types = event_type_literals(rule_set)
+        if event_types is not None:
+            matcher = EventTypePrefilter(event_types)
+
+    decoder = line_decoder(rule_set, project, interner)
+    events = decode_lines(lines, matcher, decoder, duplicates)
+    if reorder is not None:
+        events = reordered(events, reorder)
+    return evaluate(rule_set, events, errors=errors)
+
+
+def line_decoder(
+    rule_set: typing.Sequence[detection.Rule],
+    project: bool = False,
+    interner: typing.Optional[StringInterner] = None,
+) -> typing.Callable[[typing.Any], typing.Any]:
+    """The JSON line decoder replay_lines and replay_file use for the given options"""
+
+    decoder: typing.Callable[[typing.Any], typing.Any] = json.loads
+    if project:
+        decoder = projected_decoder(rule_set)
+    if interner is None:
+        return decoder
+    intern: StringInterner = interner
+
+    def _decode(line: typing.Any) -> typing.Any:
+        return intern(decoder(line))
+
+    return _decode
+
+
+def projected_decoder(
+    rule_set: typing.Sequence[detection.Rule],
+) -> typing.Callable[[typing.Any], typing.Any]:
+    """A ProjectedDecoder for the rule set, or plain json.loads when it needs whole events"""
+
+    paths = rule_paths(rule_set)
+    if paths is None:
+        return json.loads
+    return ProjectedDecoder(paths)
+
+
+def _rule_event_types(rule: detection.Rule) -> typing.Optional[typing.Set[str]]:
+    for f in rule_filters(rule):
+        name = getattr(f.func, "__name__", "")
+        if name not in ("_deep_equal", "_deep_in"):
+            continue
+
+        bound = inspect.getclosurevars(f.func).nonlocals
+        if bound.get("path") != "eventType":
+            continue
+
+        value = bound.get("value")
+        if name == "_deep_equal" and isinstance(value, str):
+            return {value}
+        if name == "_deep_in" and isinstance(value, list):
+            return {v for v in value if isinstance(v, str)}
+
+    return None
@@ -0,0 +1,292 @@
+import ast
+import json
+import typing
+import inspect
+import textwrap
+
+from jsonpath_ng import Child, Fields, Root  # type: ignore
+from panther_core.data_model import DataModel
+from panther_sdk import detection
+
+from .evaluate import OKTA_DATA_MODEL, rule_filters
+
+__all__ = [
+    "REPLAY_PATHS",
+    "ProjectedDecoder",
+    "callable_paths",
+    "rule_callables",
+    "rule_paths",
+]
+
+FieldPath = typing.Tuple[str, ...]
+
+# Fields the replay tooling itself reads, whatever the rules need
+REPLAY_PATHS: typing.FrozenSet[FieldPath] = frozenset(
+    {
+        ("p_event_time",),
+        ("p_row_id",),
+        ("uuid",),
+        ("eventType",),
+        ("actor", "alternateId"),
+    }
+)
+
+_MATCH_FILTERS_MODULE = "panther_utils.match_filters"
+
+
+def rule_paths(
+    rule_set: typing.Sequence[detection.Rule],
+    data_model: DataModel = OKTA_DATA_MODEL,
+) -> typing.Optional[typing.FrozenSet[FieldPath]]:
+    """Field paths read by the filters and dynamic alert fields of a rule set.
+
+    Returns None when any of them reads the event in a way that can't be resolved statically,
+    e.g. by passing it to a helper or looking up a computed key; such a rule needs the whole
+    event. A path covers everything below it.
+    """
+
+    paths: typing.Set[FieldPath] = set(REPLAY_PATHS)
+
+    for rule in rule_set:
+        for func in rule_callables(rule):
+            found = callable_paths(func, data_model)
+            if found is None:
+                return None
+            paths.update(found)
+
+    return frozenset(paths)
+
+
+def callable_paths(
+    func: typing.Callable[..., typing.Any],
+    data_model: DataModel = OKTA_DATA_MODEL,
+) -> typing.Optional[typing.Set[FieldPath]]:
+    """Field paths a filter or dynamic field reads from its event argument, or None if unknown.
+
+    match_filters closures report the path they were built with. Anything else is resolved from
+    its source: event.get/deep_get/udm calls and subscripts with constant keys, including .get
+    chained onto their results.
+    """
+
+    if getattr(func, "__module__", None) == _MATCH_FILTERS_MODULE:
+        path = inspect.getclosurevars(func).nonlocals.get("path")
+        return {tuple(path.split("."))} if isinstance(path, str) else None
+
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+        tree = ast.parse(source)
+    except (OSError, TypeError, SyntaxError):
+        return None
+
+    definition = next(
+        (
+            node
+            for node in ast.walk(tree)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and node.name == func.__name__
+        ),
+        None,
+    )
+    if definition is None or not definition.args.args:
+        return None
+
+    return _FieldReader(definition.args.args[0].arg, data_model).read(definition)
+
+
+class ProjectedDecoder:
+    """Decodes System Log JSON lines into compact dicts holding only the given field paths.
+
+    Okta events are wide, while rules read a few dozen fields. Each line is still parsed whole
+    by the C JSON parser and then pruned, so projection saves memory rather than parse time: the
+    rest of the document is released before the next line instead of living on in every
+    retained event. Keys are matched case-insensitively, like PantherEvent lookups.
+    """
+
+    def __init__(self, paths: typing.Iterable[FieldPath]) -> None:
+        self.paths = frozenset(paths)
+        self._trie = _build_trie(self.paths)
+
+    def __call__(
+        self, line: typing.Union[str, bytes, memoryview]
+    ) -> typing.Dict[str, typing.Any]:
+        if isinstance(line, memoryview):
+            line = line.tobytes()
+        return self.project(json.loads(line))
+
+    def project(
+        self, data: typing.Mapping[str, typing.Any]
+    ) -> typing.Dict[str, typing.Any]:
+        return _project(data, self._trie)
+
+
+# a trie node maps a lower-cased key to its child node, or to None to keep the whole value
+_Trie = typing.Dict[str, typing.Any]
+
+
+def _build_trie(paths: typing.Iterable[FieldPath]) -> _Trie:
+    trie: _Trie = {}
+
+    # shortest first, so a path that covers a whole subtree is never narrowed again
+    for path in sorted(paths, key=len):
+        node = trie
+        for key in path[:-1]:
+            node = node.setdefault(key.lower(), {})
+            if node is None:
+                break
+        else:
+            node[path[-1].lower()] = None
+
+    return trie
+
+
+def _project(
+    data: typing.Mapping[str, typing.Any], trie: _Trie
+) -> typing.Dict[str, typing.Any]:
+    projected = {}
+
+    for key, value in data.items():
+        lowered = key.lower()
+        if lowered not in trie:
+            continue
+        node = trie[lowered]
+        if node is not None and isinstance(value, dict):
+            value = _project(value, node)
+        projected[key] = value
+
+    return projected
+
+
+def rule_callables(
+    rule: detection.Rule,
+) -> typing.Iterator[typing.Callable[..., typing.Any]]:
+    """The filter functions and dynamic alert field functions of a rule"""
+
+    for f in rule_filters(rule):
+        yield f.func
+
+    for value in (
+        rule.alert_title,
+        rule.alert_context,
+        rule.alert_grouping.group_by if rule.alert_grouping else None,
+        rule.severity,
+        rule.description,
+        rule.reference,
+        rule.runbook,
+        rule.destinations,
+    ):
+        func = getattr(value, "func", value)
+        if callable(func):
+            yield func
+
+
+def _jsonpath_keys(expr: typing.Any) -> typing.Optional[FieldPath]:
+    if isinstance(expr, Root):
+        return ()
+    if isinstance(expr, Fields) and len(expr.fields) == 1:
+        return (expr.fields[0],)
+    if isinstance(expr, Child):
+        left, right = _jsonpath_keys(expr.left), _jsonpath_keys(expr.right)
+        if left is not None and right is not None:
+            return left + right
+    return None
+
+
+class _FieldReader(ast.NodeVisitor):
+    def __init__(self, event_name: str, data_model: DataModel) -> None:
+        self.event_name = event_name
+        self.data_model = data_model
+        self.paths: typing.Set[FieldPath] = set()
+        self.resolved = True
+        self._parents: typing.Dict[ast.AST, ast.AST] = {}
+
+    def read(self, definition: ast.AST) -> typing.Optional[typing.Set[FieldPath]]:
+        for parent in ast.walk(definition):
+            for child in ast.iter_child_nodes(parent):
+                self._parents[child] = parent
+
+        self.visit(definition)
+        return self.paths if self.resolved else None
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if node.id != self.event_name or not isinstance(node.ctx, ast.Load):
+            return
+
+        path = self._access(node)
+        if path is None:
+            self.resolved = False
+        else:
+            self.paths.add(path)
+
+    def _access(self, node: ast.Name) -> typing.Optional[FieldPath]:
+        """Follow the accessors applied to the event name, longest resolvable path first"""
+
+        attribute = self._parents.get(node)
+        call = self._parents.get(attribute) if attribute is not None else None
+
+        if (
+            isinstance(attribute, ast.Attribute)
+            and isinstance(call, ast.Call)
+            and call.func is attribute
+        ):
+            keys = _constant_keys(call.args)
+            if attribute.attr == "udm" and len(keys) == 1 == len(call.args):
+                model_path = self.data_model.paths.get(keys[0])
+                return _jsonpath_keys(model_path) if model_path is not None else None
+            if attribute.attr == "get" and keys:
+                return self._extend((keys[0],), call)
+            if attribute.attr == "deep_get" and keys:
+                # a computed key part leaves everything below the constant prefix in use
+                return self._extend(keys, call) if len(keys) == len(call.args) else keys
+
+        if isinstance(attribute, ast.Subscript):
+            key = _subscript_key(attribute)
+            if key is not None:
+                return self._extend((key,), attribute)
+
+        return None
+
+    def _extend(self, path: FieldPath, node: ast.AST) -> FieldPath:
+        """Narrow a path through .get and subscripts chained onto the value it produced"""
+
+        while True:
+            parent = self._parents.get(node)
+            if isinstance(parent, ast.Subscript) and parent.value is node:
+                key = _subscript_key(parent)
+                if key is None:
+                    return path
+                path, node = path + (key,), parent
+                continue
+
+            call = self._parents.get(parent) if parent is not None else None
+            if (
+                isinstance(parent, ast.Attribute)
+                and parent.attr == "get"
+                and isinstance(call, ast.Call)
+                and call.args
+            ):
+                keys = _constant_keys(call.args[:1])
+                if not keys:
+                    return path
+                path, node = path + keys, call
+                continue
+
+            return path
+
+
+def _constant_keys(args: typing.Sequence[ast.expr]) -> FieldPath:
+    keys = []
+    for arg in args:
+        if not (isinstance(arg, ast.Constant) and isinstance(arg.value, str)):
+            break
+        keys.append(arg.value)
+    return tuple(keys)
+
+
+def _subscript_key(node: ast.Subscript) -> typing.Optional[str]:
+    index: typing.Any = node.slice
+    # Python 3.8 wraps subscripts in ast.Index
+    if isinstance(index, getattr(ast, "Index", ())):
+        index = index.value
+    if isinstance(index, ast.Constant) and isinstance(index.value, str):
+        return index.value
+    return None
@@ -0,0 +1,128 @@
+import os
+import json
+import mmap
+import typing
+
+from panther_sdk import detection
+
+from .dedup import DuplicateFilter
+from .evaluate import Match, RuleError, evaluate, to_event
+from .interning import StringInterner
+from .prefilter import EventTypePrefilter, event_type_literals, line_decoder
+
+__all__ = ["MappedJSONL", "replay_file"]
+
+
+class MappedJSONL:
+    """Memory-maps a JSONL file and hands out lines as zero-copy memoryview slices.
+
+    Every line comes with the byte offset it starts at, so results can point back to the
+    source. Views borrow the mapping: drop them before calling close().
+    """
+
+    def __init__(self, path: typing.Union[str, "os.PathLike[str]"]) -> None:
+        self.path = os.fspath(path)
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map: typing.Optional[mmap.mmap] = None
+        self._view = memoryview(b"")
+
+        # mmap refuses empty files
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def __enter__(self) -> "MappedJSONL":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def chunks(self, count: int) -> typing.List[typing.Tuple[int, int]]:
+        """Split the file into at most count (start, end) byte ranges that end on newlines"""
+
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        ranges = []
+        start = 0
+        for i in range(1, count + 1):
+            if start >= self.size:
+                break
+            end = self._line_end(max(start, self.size * i // count))
+            ranges.append((start, end))
+            start = end
+
+        return ranges
+
+    def lines(
+        self, start: int = 0, end: typing.Optional[int] = None
+    ) -> typing.Iterator[typing.Tuple[int, memoryview]]:
+        """Yield (offset, line) for each non-empty line starting within [start, end)"""
+
+        end = self.size if end is None else min(end, self.size)
+        pos = start
+
+        while pos < end:
+            stop = self._line_end(pos)
+            last = stop
+            if last > pos and self._view[last - 1] == ord("\n"):
+                last -= 1
+            if last > pos and self._view[last - 1] == ord("\r"):
+                last -= 1
+            if last > pos:
+                yield pos, self._view[pos:last]
+            pos = stop
+
+    def _line_end(self, pos: int) -> int:
+        """Offset just past the newline that terminates the line containing pos"""
+
+        if self._map is None or pos >= self.size:
+            return self.size
+        newline = self._map.find(b"\n", pos)
+        return self.size if newline == -1 else newline + 1
+
+
+def replay_file(
+    path: typing.Union[str, "os.PathLike[str]"],
+    rule_set: typing.Sequence[detection.Rule],
+    start: int = 0,
+    end: typing.Optional[int] = None,
+    prefilter: bool = True,
+    errors: typing.Optional[typing.List[RuleError]] = None,
+    project: bool = False,
+    interner: typing.Optional[StringInterner] = None,
+    duplicates: typing.Optional[DuplicateFilter] = None,
+) -> typing.Iterator[typing.Tuple[int, Match]]:
+    """Evaluate a byte range of a JSONL export, yielding (line offset, match) pairs.
+
+    project, interner and duplicates work as in replay_lines.
+    """
+
+    matcher = None
+    event_types = event_type_literals(rule_set) if prefilter else None
+    if event_types is not None:
+        matcher = EventTypePrefilter(event_types)
+
+    decoder = line_decoder(rule_set, project, interner)
+
+    with MappedJSONL(path) as source:
+        for offset, line in source.lines(start, end):
+            if matcher is not None and not matcher(line):
+                line.release()
+                continue
+
+            data = decoder(line.tobytes())
+            line.release()
+            if duplicates is not None and not duplicates(data):
+                continue
+            event = to_event(data)
+
+            for match in evaluate(rule_set, [event], errors=errors):
+                yield offset, match
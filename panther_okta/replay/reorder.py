@@ -0,0 +1,90 @@
+import heapq
+import typing
+
+from panther_core import PantherEvent
+
+from .clock import event_time
+
+__all__ = ["ReorderBuffer", "reordered"]
+
+
+class ReorderBuffer:
+    """Puts events that arrive out of order back into p_event_time order within a window.
+
+    push() holds events in a heap keyed by p_event_time and releases, in time order, those at or
+    before the watermark: window_seconds behind the latest event time seen. Events that arrive
+    behind the watermark, or without a usable p_event_time, can't be placed and are released
+    straight away, counted in late. At most max_events are held; past that the oldest are
+    released before the watermark reaches them, counted in forced.
+    """
+
+    def __init__(
+        self, window_seconds: float = 300.0, max_events: int = 100_000
+    ) -> None:
+        if window_seconds < 0:
+            raise ValueError("window_seconds must not be negative")
+        if max_events < 1:
+            raise ValueError("max_events must be at least 1")
+
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self.late = 0
+        self.forced = 0
+        # the latest time released; nothing older can be placed any more
+        self.released_until = float("-inf")
+        self._latest = float("-inf")
+        # (time, arrival, event), arrival keeps equal times in arrival order
+        self._heap: typing.List[typing.Tuple[float, int, PantherEvent]] = []
+        self._arrivals = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def watermark(self) -> float:
+        return self._latest - self.window_seconds
+
+    def push(self, event: PantherEvent) -> typing.List[PantherEvent]:
+        """Add an event, returning the events it releases in p_event_time order"""
+
+        timestamp = event_time(event)
+        if timestamp is None or timestamp < self.released_until:
+            self.late += 1
+            return [event]
+
+        heapq.heappush(self._heap, (timestamp, self._arrivals, event))
+        self._arrivals += 1
+        self._latest = max(self._latest, timestamp)
+
+        released = self._release(self.watermark)
+        while len(self._heap) > self.max_events:
+            released.append(self._pop())
+            self.forced += 1
+        return released
+
+    def flush(self) -> typing.List[PantherEvent]:
+        """Release every held event, in p_event_time order"""
+
+        return self._release(float("inf"))
+
+    def _release(self, until: float) -> typing.List[PantherEvent]:
+        released = []
+        while self._heap and self._heap[0][0] <= until:
+            released.append(self._pop())
+        return released
+
+    def _pop(self) -> PantherEvent:
+        timestamp, _, event = heapq.heappop(self._heap)
+        self.released_until = timestamp
+        return event
+
+
+def reordered(
+    events: typing.Iterable[PantherEvent], buffer: typing.Optional[ReorderBuffer] = None
+) -> typing.Iterator[PantherEvent]:
+    """Stream events through a ReorderBuffer, flushing it once events are exhausted"""
+
+    buffer = buffer if buffer is not None else ReorderBuffer()
+    for event in events:
+        yield from buffer.push(event)
+    yield from buffer.flush()
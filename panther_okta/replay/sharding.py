@@ -0,0 +1,102 @@
+import zlib
+import typing
+import inspect
+
+from panther_sdk import detection
+
+from .evaluate import rule_filters
+from .projection import rule_callables
+
+__all__ = [
+    "STATE_KEYS",
+    "StateKey",
+    "actor_key",
+    "global_key",
+    "session_key",
+    "shard_of",
+    "source_ip_key",
+    "state_key",
+    "stateful",
+]
+
+# Maps a decoded event to the value a rule keys its KV state by
+StateKey = typing.Callable[[typing.Mapping[str, typing.Any]], str]
+
+
+def _get(data: typing.Any, *path: str) -> typing.Any:
+    for part in path:
+        data = data.get(part) if isinstance(data, typing.Mapping) else None
+    return data
+
+
+def actor_key(data: typing.Mapping[str, typing.Any]) -> str:
+    """actor.alternateId, which per-user state is keyed by"""
+
+    return str(_get(data, "actor", "alternateId") or "")
+
+
+def source_ip_key(data: typing.Mapping[str, typing.Any]) -> str:
+    """The source IP, client.ipAddress or else the first of p_any_ip_addresses"""
+
+    # the same fallback password_spray uses
+    source_ip = _get(data, "client", "ipAddress")
+    if not source_ip:
+        source_ip = next(iter(data.get("p_any_ip_addresses") or []), None)
+    return str(source_ip or "")
+
+
+def session_key(data: typing.Mapping[str, typing.Any]) -> str:
+    """authenticationContext.externalSessionId"""
+
+    return str(_get(data, "authenticationContext", "externalSessionId") or "")
+
+
+def global_key(data: typing.Mapping[str, typing.Any]) -> str:
+    """One key for every event, for state shared across all of them"""
+
+    return ""
+
+
+# What the stateful filters key their state by, by filter function name. Events with equal keys
+# must be evaluated in order against one store; events with different keys never share state.
+STATE_KEYS: typing.Dict[str, StateKey] = {
+    # every actor's counts land in a few sketches shared with other actors
+    "_admin_activity_spike_filter": global_key,
+    "_geo_improbable_access_filter": actor_key,
+    "_password_spray_filter": source_ip_key,
+    "_session_hijack_filter": session_key,
+}
+
+
+def stateful(rule: detection.Rule) -> bool:
+    """Whether a rule's filters or alert fields use the KV store"""
+
+    for func in rule_callables(rule):
+        try:
+            if "panther_oss_helpers" in inspect.getsource(func):
+                return True
+        except (OSError, TypeError):
+            return True
+    return False
+
+
+def state_key(rule: detection.Rule) -> typing.Optional[StateKey]:
+    """What a rule's state is keyed by, or None for a stateless rule.
+
+    A stateful rule without a filter in STATE_KEYS gets global_key, which puts every event on
+    one shard.
+    """
+
+    if not stateful(rule):
+        return None
+    for f in rule_filters(rule):
+        key = STATE_KEYS.get(getattr(f.func, "__name__", ""))
+        if key is not None:
+            return key
+    return global_key
+
+
+def shard_of(key: str, shards: int) -> int:
+    """Stable shard for a state key"""
+
+    return zlib.crc32(key.encode("utf-8")) % shards
@@ -0,0 +1,243 @@
+import os
+import abc
+import json
+import time
+import typing
+import sqlite3
+import threading
+
+from .evaluate import Match
+
+__all__ = ["BatchedSink", "JSONLSink", "SQLiteSink", "alert_record"]
+
+
+def alert_record(match: Match) -> typing.Dict[str, typing.Any]:
+    """The fields of a match that are persisted for an alert"""
+
+    return {
+        "rule_id": match.rule_id,
+        "title": match.title,
+        "severity": match.severity,
+        "dedup": match.dedup,
+        "alert_context": match.alert_context,
+        "p_event_time": match.event.get("p_event_time"),
+        "p_row_id": match.event.get("p_row_id"),
+    }
+
+
+def _plain(value: typing.Any) -> typing.Any:
+    # PantherEvent wraps nested values in immutable mapping and list types
+    if isinstance(value, typing.Mapping):
+        return dict(value)
+    if isinstance(value, (typing.Sequence, typing.AbstractSet)) and not isinstance(
+        value, (str, bytes)
+    ):
+        return list(value)
+    return str(value)
+
+
+def _dumps(value: typing.Any) -> str:
+    return json.dumps(value, default=_plain, sort_keys=True)
+
+
+class BatchedSink(abc.ABC):
+    """Buffers alerts and writes them in group commits.
+
+    A batch is written once max_batch alerts are buffered or the oldest one has waited
+    max_latency seconds, whichever comes first; a background thread enforces the latency bound
+    when alerts stop arriving. Each batch is made durable with one sync, so an alert storm costs
+    one fsync per batch instead of one per alert. Instances are callable with a Match, so they
+    can be passed as the sink of run_rules. Subclasses implement _write.
+    """
+
+    def __init__(self, max_batch: int = 500, max_latency: float = 1.0) -> None:
+        if max_batch < 1 or max_latency <= 0:
+            raise ValueError("max_batch must be at least 1 and max_latency positive")
+
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.batches = 0
+        self.written = 0
+        self._buffer: typing.List[typing.Dict[str, typing.Any]] = []
+        self._oldest = 0.0
+        self._closed = False
+        self._error: typing.Optional[BaseException] = None
+        self._lock = threading.Condition()
+        self._flusher = threading.Thread(target=self._flush_on_latency, daemon=True)
+        self._flusher.start()
+
+    def __enter__(self) -> "BatchedSink":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def __call__(self, match: Match) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("sink is closed")
+
+            if not self._buffer:
+                self._oldest = time.monotonic()
+                self._lock.notify_all()
+            self._buffer.append(alert_record(match))
+            # buffered first, so the match is retried with the batch a background flush failed
+            self._raise_pending()
+
+            if len(self._buffer) >= self.max_batch:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._raise_pending()
+
+    def close(self) -> None:
+        """Write what is buffered, stop the flusher and release the output"""
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._lock.notify_all()
+        self._flusher.join()
+
+        with self._lock:
+            try:
+                self._flush_locked()
+                self._raise_pending()
+            finally:
+                self._release()
+
+    @abc.abstractmethod
+    def _write(self, records: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        """Durably write a batch, or raise leaving none of it written"""
+
+    def _release(self) -> None:
+        pass
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+
+        records, self._buffer = self._buffer, []
+        try:
+            self._write(records)
+        except BaseException:
+            # keep the batch so a later flush can retry it
+            self._buffer = records + self._buffer
+            raise
+        self.batches += 1
+        self.written += len(records)
+
+    def _raise_pending(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _flush_on_latency(self) -> None:
+        with self._lock:
+            while not self._closed:
+                if not self._buffer:
+                    self._lock.wait()
+                    continue
+
+                remaining = self._oldest + self.max_latency - time.monotonic()
+                if remaining > 0:
+                    self._lock.wait(remaining)
+                    continue
+
+                try:
+                    self._flush_locked()
+                except BaseException as err:
+                    # surfaced to the next caller; retried after another max_latency
+                    self._error = err
+                    self._oldest = time.monotonic()
+
+
+class JSONLSink(BatchedSink):
+    """Appends alerts to a JSONL file, one write and one fsync per batch.
+
+    A batch that fails part way is truncated off again before the error is raised, so retrying
+    it neither duplicates lines nor leaves a half-written one.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, "os.PathLike[str]"],
+        max_batch: int = 500,
+        max_latency: float = 1.0,
+    ) -> None:
+        # unbuffered, so nothing of a failed batch lingers in a buffer to be written later
+        self._file = open(path, "ab", buffering=0)
+        # end of the last batch that was written in full
+        self._end = os.fstat(self._file.fileno()).st_size
+        super().__init__(max_batch, max_latency)
+
+    def _write(self, records: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        data = "".join(_dumps(record) + "\n" for record in records).encode("utf-8")
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view) :]
+            os.fsync(self._file.fileno())
+        except BaseException:
+            os.ftruncate(self._file.fileno(), self._end)
+            raise
+        self._end += len(data)
+
+    def _release(self) -> None:
+        self._file.close()
+
+
+class SQLiteSink(BatchedSink):
+    """Inserts alerts into a SQLite table, one transaction per batch"""
+
+    def __init__(
+        self,
+        path: typing.Union[str, "os.PathLike[str]"],
+        table: str = "alerts",
+        max_batch: int = 500,
+        max_latency: float = 1.0,
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name {table!r}")
+
+        self.table = table
+        # written from the caller and the flusher thread, always under the sink's lock
+        self._db = sqlite3.connect(os.fspath(path), check_same_thread=False)
+        self._db.execute("PRAGMA synchronous = FULL")
+        self._db.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+  rule_id TEXT NOT NULL,
+  title TEXT NOT NULL,
+  severity TEXT,
+  dedup TEXT NOT NULL,
+  alert_context TEXT,
+  p_event_time TEXT,
+  p_row_id TEXT
+)"""
+        )
+        self._db.commit()
+        super().__init__(max_batch, max_latency)
+
+    def _write(self, records: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        with self._db:
+            self._db.executemany(
+                f"INSERT INTO {self.table} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        record["rule_id"],
+                        record["title"],
+                        record["severity"],
+                        record["dedup"],
+                        _dumps(record["alert_context"]),
+                        record["p_event_time"],
+                        record["p_row_id"],
+                    )
+                    for record in records
+                ],
+            )
+
+    def _release(self) -> None:
+        self._db.close()
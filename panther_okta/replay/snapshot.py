@@ -0,0 +1,240 @@
+import os
+import mmap
+import json
+import math
+import zlib
+import struct
+import typing
+
+from .state import MemoryKV
+
+__all__ = ["StateSnapshot", "write_atomic"]
+
+SNAPSHOT_MAGIC = b"OKTAKV1\n"
+
+# crc32 of the rest of the record, kind, key length, value length, expiration (NaN when none)
+_HEADER = struct.Struct("<IBIId")
+
+# a key's whole state: {"s": string set, "c": counter}
+_ENTRY = 0
+_DELETE = 1
+# ends a save; records after the last commit belong to a save that did not finish
+_COMMIT = 2
+# caller data committed with the state, such as the read offsets it was built from
+_META = 3
+
+
+def _record(kind: int, key: str, value: bytes, expiration: float) -> bytes:
+    encoded = key.encode("utf-8")
+    body = (
+        _HEADER.pack(0, kind, len(encoded), len(value), expiration)[4:]
+        + encoded
+        + value
+    )
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+_COMMIT_RECORD = _record(_COMMIT, "", b"", math.nan)
+
+
+def _key_record(store: MemoryKV, key: str) -> bytes:
+    entry: typing.Dict[str, typing.Any] = {}
+    if key in store.string_sets:
+        entry["s"] = sorted(store.string_sets[key])
+    if key in store.counters:
+        entry["c"] = store.counters[key]
+    if not entry:
+        return _record(_DELETE, key, b"", math.nan)
+
+    value = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+    return _record(_ENTRY, key, value, store.expirations.get(key, math.nan))
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Replace path with data so that readers see either the old or the new file, never a mix"""
+
+    directory = os.path.dirname(os.path.abspath(path))
+    temp = f"{path}.tmp"
+
+    with open(temp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+    # persist the rename itself
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class StateSnapshot:
+    """Persists a MemoryKV to an append-only file of checksummed records.
+
+    save() appends one record per key written, expired or evicted since the previous save,
+    then a commit record, with a single fsync; the store's changes are drained only once that
+    fsync succeeds, so a failed save is retried in full by the next one. restore() memory-maps
+    the file and replays it up to the last commit, so a save cut short by a crash is rolled back
+    as a whole and its torn tail is overwritten by the next save. Restoring checks every
+    committed record but only decodes the latest one of each key, so superseded records cost a
+    checksum and no parsing; it still reads the whole file rather than starting instantly. Once
+    the file holds compact_ratio times more records than live keys, it is atomically rewritten
+    with only the live state. save() can also commit meta, opaque bytes that restore() brings
+    back in meta, so that state and whatever it was built from are committed together.
+    """
+
+    def __init__(
+        self, path: typing.Union[str, "os.PathLike[str]"], compact_ratio: float = 4.0
+    ) -> None:
+        if compact_ratio <= 1:
+            raise ValueError("compact_ratio must be greater than 1")
+
+        self.path = os.fspath(path)
+        self.compact_ratio = compact_ratio
+        self.records = 0
+        # the meta bytes of the last commit
+        self.meta: typing.Optional[bytes] = None
+        self._restored = False
+        # offset just past the last commit, or None before the file is first written
+        self._end: typing.Optional[int] = None
+
+    def restore(self, store: MemoryKV) -> int:
+        """Replace the contents of store with the last committed state, returning its key count"""
+
+        data: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+            "string_sets": {},
+            "counters": {},
+            "expirations": {},
+        }
+        self.records = 0
+        self.meta = None
+        self._end = None
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                for key, (kind, start, end, expiration) in self._replay(mapped).items():
+                    if kind == _ENTRY:
+                        _apply(data, key, mapped[start:end], expiration)
+
+        self._restored = True
+        store.load(data)
+        store.drain_changes()
+        return len(store)
+
+    def save(self, store: MemoryKV, meta: typing.Optional[bytes] = None) -> int:
+        """Append the keys changed since the last save and any new meta, returning the key count"""
+
+        if not self._restored and os.path.exists(self.path):
+            raise RuntimeError(f"restore {self.path} before saving to it")
+
+        changed = store.changes()
+        if meta == self.meta:
+            meta = None
+        if not changed and meta is None:
+            return 0
+
+        written = len(changed) + (meta is not None)
+        if self._end is None or self.records + written > self.compact_ratio * max(
+            len(store), 1024
+        ):
+            self.compact(store, meta)
+            return len(changed)
+
+        payload = b"".join(_key_record(store, key) for key in sorted(changed))
+        if meta is not None:
+            payload += _record(_META, "", meta, math.nan)
+        payload += _COMMIT_RECORD
+        with open(self.path, "r+b") as f:
+            # overwrite anything after the last commit
+            f.seek(self._end)
+            f.write(payload)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        store.drain_changes(changed)
+        if meta is not None:
+            self.meta = meta
+        self._end += len(payload)
+        self.records += written
+        return len(changed)
+
+    def compact(self, store: MemoryKV, meta: typing.Optional[bytes] = None) -> None:
+        """Atomically replace the file with the live state of store, and meta or the last one"""
+
+        changed = store.changes()
+        meta = meta if meta is not None else self.meta
+        keys = {**dict.fromkeys(store.string_sets), **dict.fromkeys(store.counters)}
+        payload = SNAPSHOT_MAGIC + b"".join(_key_record(store, key) for key in keys)
+        if meta is not None:
+            payload += _record(_META, "", meta, math.nan)
+        payload += _COMMIT_RECORD
+
+        write_atomic(self.path, payload)
+        store.drain_changes(changed)
+        # the file now holds exactly what this snapshot knows of
+        self._restored = True
+        self.meta = meta
+        self._end = len(payload)
+        self.records = len(keys) + (meta is not None)
+
+    def _replay(
+        self, mapped: mmap.mmap
+    ) -> typing.Dict[str, typing.Tuple[int, int, int, float]]:
+        """The last committed record of each key: its kind, value offsets and expiration.
+
+        Keys are ordered by their last write, so load() rebuilds the store's LRU order.
+        """
+
+        if mapped[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise RuntimeError(f"{self.path} is not a state snapshot")
+
+        latest: typing.Dict[str, typing.Tuple[int, int, int, float]] = {}
+        pending: typing.List[typing.Tuple[str, typing.Tuple[int, int, int, float]]] = []
+        offset = self._end = len(SNAPSHOT_MAGIC)
+        while offset + _HEADER.size <= len(mapped):
+            crc, kind, key_length, value_length, expiration = _HEADER.unpack_from(
+                mapped, offset
+            )
+            end = offset + _HEADER.size + key_length + value_length
+            if end > len(mapped) or zlib.crc32(mapped[offset + 4 : end]) != crc:
+                # torn write
+                break
+
+            key_end = offset + _HEADER.size + key_length
+            key = mapped[offset + _HEADER.size : key_end].decode("utf-8")
+            offset = end
+
+            if kind != _COMMIT:
+                pending.append((key, (kind, key_end, end, expiration)))
+                continue
+            for key, record in pending:
+                if record[0] == _META:
+                    self.meta = bytes(mapped[record[1] : record[2]])
+                else:
+                    latest.pop(key, None)
+                    latest[key] = record
+            self.records += len(pending)
+            pending = []
+            self._end = offset
+
+        return latest
+
+
+def _apply(
+    data: typing.Dict[str, typing.Dict[str, typing.Any]],
+    key: str,
+    value: bytes,
+    expiration: float,
+) -> None:
+    entry = json.loads(value)
+    if "s" in entry:
+        data["string_sets"][key] = entry["s"]
+    if "c" in entry:
+        data["counters"][key] = entry["c"]
+    if not math.isnan(expiration):
+        data["expirations"][key] = expiration
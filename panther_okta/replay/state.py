@@ -0,0 +1,258 @@
+import sys
+import types
+import typing
+import contextlib
+import collections
+
+from .clock import Clock, EventClock
+
+__all__ = ["MemoryKV", "installed"]
+
+HELPERS_MODULE = "panther_oss_helpers"
+
+# stores entered with installed(), innermost last
+_installed: typing.List["MemoryKV"] = []
+
+
+class MemoryKV:
+    """In-process stand-in for the Panther KV store that panther_oss_helpers talks to.
+
+    Stateful filters import their helpers inside the function body, so installing an instance
+    with installed() lets them run unchanged outside of Panther.
+
+    Keys expire lazily once now() passes their expiration time. now defaults to an EventClock,
+    which replay advances to each event's p_event_time before the rules run, so state expires as
+    it would have live however fast the events are replayed. With max_keys or max_bytes set, the store is
+    also a bounded LRU: once either is exceeded, the least recently used keys are evicted.
+    size_bytes accounts for the keys and values held (their string lengths, and 8 bytes per
+    counter), not for Python object overhead.
+    """
+
+    def __init__(
+        self,
+        now: typing.Optional[typing.Callable[[], float]] = None,
+        max_keys: typing.Optional[int] = None,
+        max_bytes: typing.Optional[int] = None,
+    ) -> None:
+        if (max_keys is not None and max_keys < 1) or (
+            max_bytes is not None and max_bytes < 1
+        ):
+            raise ValueError("max_keys and max_bytes must be at least 1")
+
+        self.now: typing.Callable[[], float] = EventClock()
+        if now is not None:
+            self.now = now
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self.string_sets: typing.Dict[str, typing.Set[str]] = {}
+        self.counters: typing.Dict[str, int] = {}
+        self.expirations: typing.Dict[str, float] = {}
+        self.size_bytes = 0
+        self.evictions = 0
+        self._changed: typing.Set[str] = set()
+        # least recently used first
+        self._sizes: "collections.OrderedDict[str, int]" = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def observe(self, event: typing.Mapping[str, typing.Any]) -> None:
+        """Advance the store's clock to an event, if the clock follows events"""
+
+        if isinstance(self.now, Clock):
+            self.now.observe(event)
+
+    def _expired(self, key: str) -> bool:
+        expiration = self.expirations.get(key)
+        if expiration is None or expiration > self.now():
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+            return False
+
+        self._drop(key)
+        return True
+
+    def _drop(self, key: str) -> None:
+        self._changed.add(key)
+        self.string_sets.pop(key, None)
+        self.counters.pop(key, None)
+        self.expirations.pop(key, None)
+        self.size_bytes -= self._sizes.pop(key, 0)
+
+    def _account(self, key: str) -> None:
+        """Update the size of a key that was just written, evicting others if over budget"""
+
+        self._changed.add(key)
+        size = 0
+        if key in self.string_sets:
+            size += len(key) + sum(len(value) for value in self.string_sets[key])
+        if key in self.counters:
+            size += len(key) + 8
+
+        self.size_bytes += size - self._sizes.pop(key, 0)
+        if key in self.string_sets or key in self.counters:
+            self._sizes[key] = size
+
+        while self._sizes and (
+            (self.max_keys is not None and len(self._sizes) > self.max_keys)
+            or (self.max_bytes is not None and self.size_bytes > self.max_bytes)
+        ):
+            self._drop(next(iter(self._sizes)))
+            self.evictions += 1
+
+    def _expire_at(self, key: str, epoch_seconds: typing.Optional[int]) -> None:
+        if epoch_seconds is not None:
+            self.set_key_expiration(key, epoch_seconds)
+
+    def get_string_set(
+        self, key: str, force_ttl_check: bool = False
+    ) -> typing.Set[str]:
+        if self._expired(key):
+            return set()
+        return set(self.string_sets.get(key, ()))
+
+    def put_string_set(
+        self,
+        key: str,
+        val: typing.Sequence[str],
+        epoch_seconds: typing.Optional[int] = None,
+    ) -> None:
+        self.string_sets[key] = set(val)
+        self._expire_at(key, epoch_seconds)
+        self._account(key)
+
+    def add_to_string_set(
+        self,
+        key: str,
+        val: typing.Union[str, typing.Sequence[str]],
+        epoch_seconds: typing.Optional[int] = None,
+    ) -> typing.Set[str]:
+        values = [val] if isinstance(val, str) else list(val)
+        current = self.get_string_set(key)
+        current.update(values)
+        self.string_sets[key] = current
+        self._expire_at(key, epoch_seconds)
+        self._account(key)
+        return set(current)
+
+    def remove_from_string_set(
+        self, key: str, val: typing.Union[str, typing.Sequence[str]]
+    ) -> typing.Set[str]:
+        values = [val] if isinstance(val, str) else list(val)
+        current = self.get_string_set(key)
+        current.difference_update(values)
+        self.string_sets[key] = current
+        self._account(key)
+        return set(current)
+
+    def reset_string_set(self, key: str) -> None:
+        self.string_sets.pop(key, None)
+        self._account(key)
+
+    def get_counter(self, key: str, force_ttl_check: bool = False) -> int:
+        if self._expired(key):
+            return 0
+        return self.counters.get(key, 0)
+
+    def increment_counter(
+        self, key: str, val: int = 1, epoch_seconds: typing.Optional[int] = None
+    ) -> int:
+        count = self.counters[key] = self.get_counter(key) + val
+        self._expire_at(key, epoch_seconds)
+        self._account(key)
+        return count
+
+    def reset_counter(self, key: str) -> None:
+        self.counters.pop(key, None)
+        self._account(key)
+
+    def set_key_expiration(
+        self, key: str, epoch_seconds: typing.Union[int, float, str]
+    ) -> None:
+        self.expirations[key] = float(epoch_seconds)
+        self._changed.add(key)
+
+    def changes(self) -> typing.Set[str]:
+        """Keys written, expired or evicted since they were last drained"""
+
+        return set(self._changed)
+
+    def drain_changes(
+        self, keys: typing.Optional[typing.Iterable[str]] = None
+    ) -> typing.Set[str]:
+        """Forget the changes to keys, by default all of them, returning the keys drained"""
+
+        if keys is None:
+            changed, self._changed = self._changed, set()
+            return changed
+        changed = self._changed.intersection(keys)
+        self._changed -= changed
+        return changed
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """JSON-serializable copy of the store, for checkpoints"""
+
+        # keys are listed least recently used first, so load() keeps their order
+        return {
+            "string_sets": {
+                k: sorted(self.string_sets[k])
+                for k in self._sizes
+                if k in self.string_sets
+            },
+            "counters": dict(self.counters),
+            "expirations": dict(self.expirations),
+        }
+
+    def load(self, data: typing.Mapping[str, typing.Any]) -> None:
+        """Replace the contents of the store with a to_dict() copy"""
+
+        self.string_sets = {k: set(v) for k, v in data["string_sets"].items()}
+        self.counters = dict(data["counters"])
+        self.expirations = dict(data["expirations"])
+        self.size_bytes = 0
+        self._sizes.clear()
+        for key in [*self.string_sets, *self.counters]:
+            self._account(key)
+
+
+@contextlib.contextmanager
+def installed(store: MemoryKV) -> typing.Iterator[MemoryKV]:
+    """Expose a store as the panther_oss_helpers module for the duration of the block.
+
+    The module also carries now, the store's clock, which stateful rules set expirations from;
+    in Panther, where it is missing, they use the wall clock.
+    """
+
+    module = types.ModuleType(HELPERS_MODULE)
+    for name in (
+        "get_string_set",
+        "put_string_set",
+        "add_to_string_set",
+        "remove_from_string_set",
+        "reset_string_set",
+        "get_counter",
+        "increment_counter",
+        "reset_counter",
+        "set_key_expiration",
+    ):
+        setattr(module, name, getattr(store, name))
+    setattr(module, "now", store.now)
+
+    previous = sys.modules.get(HELPERS_MODULE)
+    sys.modules[HELPERS_MODULE] = module
+    _installed.append(store)
+    try:
+        yield store
+    finally:
+        _installed.pop()
+        if previous is None:
+            sys.modules.pop(HELPERS_MODULE, None)
+        else:
+            sys.modules[HELPERS_MODULE] = previous
+
+
+def observe(event: typing.Mapping[str, typing.Any]) -> None:
+    """Advance the clock of the installed store, if any, to an event"""
+
+    if _installed:
+        _installed[-1].observe(event)
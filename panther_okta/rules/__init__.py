@@ -3,3 +3,6 @@ from .admin_actions import *
 from .support_actions import *
 from .improbable_access import *
 from .brute_force_login import *
+from .password_spray import *
+from .admin_activity import *
+from .session_hijack import *
@@ -0,0 +1,270 @@
+import typing
+
+from panther_core import PantherEvent
+from panther_utils import match_filters
+from panther_sdk import detection
+
+from .. import sample_logs
+from .._shared import (
+    rule_tags,
+    SYSTEM_LOG_TYPE,
+    SHARED_SUMMARY_ATTRS,
+    PRIVILEGED_EVENTS,
+    pick_filters,
+)
+
+__all__ = ["admin_activity_spike", "admin_activity_spike_filter"]
+
+
+def admin_activity_spike_filter(
+    factor: float = 10.0,
+    min_events: float = 20.0,
+    recent_half_life_minutes: float = 60.0,
+    baseline_half_life_days: float = 7.0,
+    width: int = 64,
+    depth: int = 4,
+    top_k: int = 4,
+    shards: int = 8,
+) -> detection.PythonFilter:
+    """Returns True when an actor's recent rate of privileged events is factor times its baseline.
+
+    Rates come from two exponentially decayed count-min sketches of width x depth counters, one
+    with a short half-life for recent activity and one with a long half-life for the baseline.
+    Actors are hashed onto shards KV entries of fixed size, each holding its own sketches and a
+    small heap counting its top_k most active actors exactly, so memory stays the same however
+    many admins and service accounts there are, and concurrent events mostly update different
+    entries. The rates behind a match are kept under the actor's name for one recent half-life,
+    for the alert title and context. min_events (decayed over the recent half-life) keeps
+    occasional activity from alerting.
+    """
+
+    def _admin_activity_spike_filter(event: PantherEvent) -> bool:
+        from array import array
+        from base64 import b64decode, b64encode
+        from datetime import datetime
+        from hashlib import blake2b
+        from heapq import heapify, heappush, heapreplace
+        from json import dumps, loads
+        from math import exp, log
+
+        from panther_oss_helpers import get_string_set, put_string_set, set_key_expiration  # type: ignore
+
+        try:
+            # replay installs its clock next to the KV helpers
+            from panther_oss_helpers import now  # type: ignore
+        except ImportError:
+            # Panther's KV store expires keys by the wall clock
+            now = datetime.now().timestamp
+
+        actor = event.deep_get("actor", "alternateId")
+        if not actor:
+            return False
+
+        try:
+            event_time = datetime.strptime(
+                event.get("p_event_time")[:26], "%Y-%m-%d %H:%M:%S.%f"
+            )
+        except (TypeError, ValueError):
+            return False
+        seconds = (event_time - datetime(1970, 1, 1)).total_seconds()
+
+        recent_decay = log(2) / (recent_half_life_minutes * 60)
+        baseline_decay = log(2) / (baseline_half_life_days * 86400)
+        cells = width * depth
+
+        # One hash picks the actor's shard and its counter in each row of the shard's sketches
+        actor_name = str(actor)
+        digest = blake2b(
+            actor_name.lower().encode("utf-8"), digest_size=4 * depth + 4
+        ).digest()
+        shard = int.from_bytes(digest[4 * depth :], "big") % shards
+
+        sketch_key = f"Okta.AdminActivity.Sketch{shard}"
+        cached = get_string_set(sketch_key)
+        state = loads(cached.pop()) if cached else {"landmark": seconds, "top": []}
+        empty = bytes(4 * cells)
+        recent = array("f", b64decode(state["recent"]) if "recent" in state else empty)
+        baseline = array(
+            "f", b64decode(state["baseline"]) if "baseline" in state else empty
+        )
+        # [recent, baseline, actor] entries, a min-heap on recent
+        top = state["top"]
+
+        # Counts are forward decayed: an event adds exp(decay * (time - landmark)), so stored
+        # counters never need aging and are only rescaled when the landmark moves. An event that
+        # arrives late simply adds less.
+        landmark = state["landmark"]
+        if recent_decay * (seconds - landmark) > 8:
+            recent_scale = exp(recent_decay * (landmark - seconds))
+            baseline_scale = exp(baseline_decay * (landmark - seconds))
+            for cell in range(cells):
+                recent[cell] *= recent_scale
+                baseline[cell] *= baseline_scale
+            for entry in top:
+                entry[0] *= recent_scale
+                entry[1] *= baseline_scale
+            landmark = seconds
+        recent_weight = exp(recent_decay * (seconds - landmark))
+        baseline_weight = exp(baseline_decay * (seconds - landmark))
+
+        # Each row hashes the actor to one counter; the smallest counter is the estimate
+        recent_count = baseline_count = float("inf")
+        for row in range(depth):
+            column = int.from_bytes(digest[4 * row : 4 * row + 4], "big") % width
+            recent[row * width + column] += recent_weight
+            baseline[row * width + column] += baseline_weight
+            recent_count = min(recent_count, recent[row * width + column])
+            baseline_count = min(baseline_count, baseline[row * width + column])
+
+        # The most active actors are counted exactly from when they enter the heap, so the busiest
+        # admins and service accounts aren't inflated by sketch collisions
+        tracked = None
+        for entry in top:
+            if entry[2] == actor_name:
+                tracked = entry
+        if tracked is not None:
+            tracked[0] += recent_weight
+            tracked[1] += baseline_weight
+            recent_count, baseline_count = tracked[0], tracked[1]
+            heapify(top)
+        elif len(top) < top_k:
+            heappush(top, [recent_count, baseline_count, actor_name])
+        elif recent_count > top[0][0]:
+            heapreplace(top, [recent_count, baseline_count, actor_name])
+
+        put_string_set(
+            sketch_key,
+            [
+                dumps(
+                    {
+                        "landmark": landmark,
+                        "recent": b64encode(recent.tobytes()).decode("ascii"),
+                        "baseline": b64encode(baseline.tobytes()).decode("ascii"),
+                        "top": top,
+                    }
+                )
+            ],
+        )
+
+        # A decayed count divided by the decay's mean lifetime is a rate
+        recent_events = recent_count / recent_weight
+        recent_per_hour = recent_events * recent_decay * 3600
+        baseline_per_hour = baseline_count / baseline_weight * baseline_decay * 3600
+        if recent_events < min_events or recent_per_hour < factor * baseline_per_hour:
+            return False
+
+        # Keep what the alert reports under the actor, so it can't pick up another actor's rates
+        busiest = sorted(top, reverse=True)
+        top_actors = []
+        for entry in busiest:
+            top_actors.append(entry[2])
+        spike_key = f"Okta.AdminActivity.Spike{actor_name}"
+        put_string_set(
+            spike_key,
+            [
+                dumps(
+                    {
+                        "recent_per_hour": round(recent_per_hour, 2),
+                        "baseline_per_hour": round(baseline_per_hour, 2),
+                        "top_actors": top_actors,
+                    }
+                )
+            ],
+        )
+        set_key_expiration(spike_key, str(now() + recent_half_life_minutes * 60))
+        return True
+
+    return detection.PythonFilter(func=_admin_activity_spike_filter)
+
+
+def admin_activity_spike(
+    pre_filters: typing.List[detection.AnyFilter] = None,
+    overrides: detection.RuleOptions = detection.RuleOptions(),
+) -> detection.Rule:
+    """An actor's rate of privileged Okta activity is far above its baseline"""
+
+    def _title(event: PantherEvent) -> str:
+        from json import loads
+        from panther_oss_helpers import get_string_set  # type: ignore
+
+        # Retrieve the rates the filter stored for this actor's spike, if any
+        actor = event.deep_get("actor", "alternateId")
+        cached = get_string_set(f"Okta.AdminActivity.Spike{actor}")
+        rates = loads(cached.pop()) if cached else {}
+
+        return (
+            f"Spike in privileged Okta activity by [{actor}]: "
+            f"{rates.get('recent_per_hour', '<UNKNOWN>')} events/hour against a baseline "
+            f"of {rates.get('baseline_per_hour', '<UNKNOWN>')}"
+        )
+
+    def _alert_context(event: PantherEvent) -> typing.Dict[str, typing.Any]:
+        from json import loads
+        from panther_oss_helpers import get_string_set  # type: ignore
+
+        actor = event.deep_get("actor", "alternateId")
+        cached = get_string_set(f"Okta.AdminActivity.Spike{actor}")
+        rates = loads(cached.pop()) if cached else {}
+
+        return {
+            "ips": event.get("p_any_ip_addresses", []),
+            "actor": event.get("actor", ""),
+            "target": event.get("target", ""),
+            "client": event.get("client", ""),
+            "privileged_activity": {
+                "recent_per_hour": rates.get("recent_per_hour"),
+                "baseline_per_hour": rates.get("baseline_per_hour"),
+                # most active actors sharing the actor's shard, busiest first
+                "top_actors": rates.get("top_actors", []),
+            },
+        }
+
+    def _group_by(event: PantherEvent) -> str:
+        return typing.cast(str, event.deep_get("actor", "alternateId"))
+
+    return detection.Rule(
+        name=(overrides.name or "Okta Privileged Activity Spike"),
+        rule_id=(overrides.rule_id or "Okta.AdminActivitySpike"),
+        log_types=(overrides.log_types or [SYSTEM_LOG_TYPE]),
+        tags=(overrides.tags or rule_tags("Privilege Escalation:Valid Accounts")),
+        reports=(overrides.reports or {detection.ReportKeyMITRE: ["TA0004:T1078"]}),
+        severity=(overrides.severity or detection.SeverityMedium),
+        description=(
+            overrides.description
+            or "An actor's rate of privileged Okta activity is far above its baseline"
+        ),
+        reference=(
+            overrides.reference
+            or "https://developer.okta.com/docs/reference/api/event-types/"
+        ),
+        runbook=(
+            overrides.runbook
+            or "Confirm the activity with the actor, and revoke its sessions and API tokens if it "
+            "was not sanctioned"
+        ),
+        filters=pick_filters(
+            overrides=overrides,
+            pre_filters=pre_filters,
+            defaults=[
+                match_filters.deep_in("eventType", PRIVILEGED_EVENTS),
+                admin_activity_spike_filter(),
+            ],
+        ),
+        alert_title=(overrides.alert_title or _title),
+        alert_context=(overrides.alert_context or _alert_context),
+        summary_attrs=(overrides.summary_attrs or SHARED_SUMMARY_ATTRS),
+        alert_grouping=(
+            overrides.alert_grouping
+            or detection.AlertGrouping(group_by=_group_by, period_minutes=60)
+        ),
+        unit_tests=(
+            overrides.unit_tests
+            or [
+                detection.JSONUnitTest(
+                    name="Single Privilege Grant",
+                    expect_match=False,
+                    data=sample_logs.admin_access_assigned,
+                ),
+            ]
+        ),
+    )
@@ -16,14 +16,43 @@ from .._shared import (
 __all__ = ["geo_improbable_access", "geo_improbable_access_filter"]
 
 
-def geo_improbable_access_filter() -> detection.PythonFilter:
+def geo_improbable_access_filter(
+    max_speed_kmh: float = 900.0,
+    history: int = 8,
+    known_after: int = 3,
+    max_known: int = 8,
+    cell_degrees: float = 0.5,
+) -> detection.PythonFilter:
+    """Returns True when a user logs in farther from their previous login than max_speed_kmh allows.
+
+    Each user keeps their last history logins in a packed ring of 12-byte records, and up to
+    max_known locations (grid cells of cell_degrees) with a visit count in 6-byte records, so
+    state is a fixed size per user and each login updates it in constant time. Logins from a
+    cell that is in the ring, or that was visited known_after times before, don't alert. That
+    keeps VPN flapping between known places quiet, as well as a return home after a stray login.
+    """
+
+    if history < 1 or known_after < 1 or max_known < 1:
+        raise ValueError("history, known_after and max_known must be at least 1")
+    if not 0.01 <= cell_degrees <= 180:
+        raise ValueError("cell_degrees must be between 0.01 and 180")
+
     def _geo_improbable_access_filter(event: PantherEvent) -> bool:
+        from base64 import b64decode, b64encode
         from datetime import datetime, timedelta
         from json import loads, dumps
-        from math import asin, cos, radians, sin, sqrt
+        from math import asin, cos, floor, radians, sin, sqrt
+        from struct import calcsize, pack_into, unpack_from
 
         from panther_oss_helpers import get_string_set, put_string_set, set_key_expiration  # type: ignore
 
+        try:
+            # replay installs its clock next to the KV helpers
+            from panther_oss_helpers import now  # type: ignore
+        except ImportError:
+            # Panther's KV store expires keys by the wall clock
+            now = datetime.now().timestamp
+
         def haversine_distance(grid_one: typing.Any, grid_two: typing.Any) -> float:
             # approximate radius of earth in km
             radius = 6371.0
@@ -44,32 +73,24 @@ def geo_improbable_access_filter() -> detection.PythonFilter:
 
             return radius * distance_c
 
-        def store_login_info(key: str, old_city: str = "") -> None:
-            # Map the user to the lon/lat and time of the most recent login
-            put_string_set(
-                key,
-                [
-                    dumps(
-                        {
-                            "city": event.deep_get(
-                                "client", "geographicalContext", "city"
-                            ),
-                            "lon": event.deep_get(
-                                "client", "geographicalContext", "geolocation", "lon"
-                            ),
-                            "lat": event.deep_get(
-                                "client", "geographicalContext", "geolocation", "lat"
-                            ),
-                            "time": event.get("p_event_time"),
-                            "old_city": old_city,
-                        }
-                    )
-                ],
-            )
+        def store_login_info(key: str, packed: typing.Any, old_city: str = "") -> None:
+            # Map the user to the lon/lat and time of the most recent login, with the packed
+            # login ring and known locations
+            login = {
+                "city": event.deep_get("client", "geographicalContext", "city"),
+                "lon": event.deep_get(
+                    "client", "geographicalContext", "geolocation", "lon"
+                ),
+                "lat": event.deep_get(
+                    "client", "geographicalContext", "geolocation", "lat"
+                ),
+                "time": event.get("p_event_time"),
+                "old_city": old_city,
+            }
+            login.update(packed)
+            put_string_set(key, [dumps(login)])
             # Expire the entry after a week so the table doesn't fill up with past users
-            set_key_expiration(
-                key, str((datetime.now() + timedelta(days=7)).timestamp())
-            )
+            set_key_expiration(key, str(now() + timedelta(days=7).total_seconds()))
 
         panther_time_format = "%Y-%m-%d %H:%M:%S.%f"
         event_city_tracking = {}
@@ -86,23 +107,106 @@ def geo_improbable_access_filter() -> detection.PythonFilter:
         # Bail out if we have a None value in set as it causes false positives
         if None in new_login_stats.values():
             return False
+        new_time = datetime.strptime(
+            event.get("p_event_time")[:26], panther_time_format
+        )
 
         # Generate a unique cache key for each user
         login_key = f"Okta.Login.GeographicallyImprobable{event.deep_get('actor', 'alternateId')}"
         # Retrieve the prior login info from the cache, if any
         last_login = get_string_set(login_key)
+        old_login_stats = loads(last_login.pop()) if last_login else {}
+
+        # A ring slot is epoch seconds, then lat and lon in units of 1e-5 degrees; a known
+        # location is a grid cell's lat and lon index, then its visit count
+        login_format = "<Iii"
+        cell_format = "<hhH"
+        login_size = calcsize(login_format)
+        cell_size = calcsize(cell_format)
+
+        ring = bytearray(b64decode(old_login_stats.get("ring", "")))
+        known = bytearray(b64decode(old_login_stats.get("known", "")))
+        head = old_login_stats.get("head", 0) % history
+        if len(ring) != history * login_size:
+            # State without a ring (from bootstrap, or another history size) starts one from
+            # the last login
+            ring = bytearray(history * login_size)
+            head = 0
+            if old_login_stats:
+                old_seconds = datetime.strptime(
+                    old_login_stats["time"][:26], panther_time_format
+                ) - datetime(1970, 1, 1)
+                pack_into(
+                    login_format,
+                    ring,
+                    0,
+                    int(old_seconds.total_seconds()),
+                    round(old_login_stats["lat"] * 100000),
+                    round(old_login_stats["lon"] * 100000),
+                )
+                head = 1 % history
+        if len(known) != max_known * cell_size:
+            known = bytearray(max_known * cell_size)
+
+        new_lat = round(new_login_stats["lat"] * 100000)
+        new_lon = round(new_login_stats["lon"] * 100000)
+        cell_lat = floor(new_lat / 100000 / cell_degrees)
+        cell_lon = floor(new_lon / 100000 / cell_degrees)
+
+        # Returning to a place among the last logins isn't improbable, however far the last
+        # login was
+        recent = False
+        for slot in range(history):
+            seconds, lat, lon = unpack_from(login_format, ring, slot * login_size)
+            if (
+                seconds
+                and floor(lat / 100000 / cell_degrees) == cell_lat
+                and floor(lon / 100000 / cell_degrees) == cell_lon
+            ):
+                recent = True
+
+        # Count the visit to this cell, replacing the least visited cell when it is new
+        visits = 0
+        target = 0
+        fewest = None
+        for slot in range(max_known):
+            slot_lat, slot_lon, count = unpack_from(
+                cell_format, known, slot * cell_size
+            )
+            if count and slot_lat == cell_lat and slot_lon == cell_lon:
+                visits, target, fewest = count, slot, -1
+            elif fewest is None or (fewest >= 0 and count < fewest):
+                target, fewest = slot, count
+        pack_into(
+            cell_format,
+            known,
+            target * cell_size,
+            cell_lat,
+            cell_lon,
+            min(visits + 1, 65535),
+        )
+
+        new_seconds = (new_time - datetime(1970, 1, 1)).total_seconds()
+        pack_into(
+            login_format, ring, head * login_size, int(new_seconds), new_lat, new_lon
+        )
+        packed = {
+            "ring": b64encode(bytes(ring)).decode("ascii"),
+            "head": (head + 1) % history,
+            "known": b64encode(bytes(known)).decode("ascii"),
+        }
+
         # If we haven't seen this user login recently, store this login for future use and don't alert
-        if not last_login:
-            store_login_info(login_key)
+        if not old_login_stats:
+            store_login_info(login_key, packed)
             return False
-        # Load the last login from the cache into an object we can compare
-        old_login_stats = loads(last_login.pop())
 
         distance = haversine_distance(old_login_stats, new_login_stats)
         old_time = datetime.strptime(old_login_stats["time"][:26], panther_time_format)
-        new_time = datetime.strptime(
-            event.get("p_event_time")[:26], panther_time_format
-        )
+        # A login older than the stored one arrived late: the time between them would be
+        # negative, and storing it would replace the newer login with an older one
+        if new_time < old_time:
+            return False
         time_delta = (new_time - old_time).total_seconds() / 3600  # seconds in an hour
 
         # Don't let time_delta be 0 (divide by zero error below)
@@ -111,13 +215,14 @@ def geo_improbable_access_filter() -> detection.PythonFilter:
         speed = distance / time_delta
 
         # Calculation is complete, so store the most recent login for the next check
-        store_login_info(login_key, old_city=last_login.get("city", ""))
+        store_login_info(login_key, packed, old_city=old_login_stats.get("city", ""))
         event_city_tracking[event.get("p_row_id")] = {
             "new_city": new_login_stats.get("city", "<UNKNOWN_NEW_CITY>"),
             "old_city": old_login_stats.get("city", "<UNKNOWN_OLD_CITY>"),
         }
 
-        return speed > 900  # Boeing 747 cruising speed
+        # 900 km/h is a Boeing 747's cruising speed
+        return speed > max_speed_kmh and not recent and visits < known_after
 
     return detection.PythonFilter(func=_geo_improbable_access_filter)
 
@@ -129,16 +234,18 @@ def geo_improbable_access(
     """A user has subsequent logins from two geographic locations that are very far apart"""
 
     def _title(event: PantherEvent) -> str:
+        from json import loads
         from panther_oss_helpers import get_string_set  # type: ignore
 
         login_key = f"Okta.Login.GeographicallyImprobable{event.deep_get('actor', 'alternateId')}"
 
         # Retrieve the info from the cache, if any
         last_login = get_string_set(login_key)
+        login_stats = loads(last_login.pop()) if last_login else {}
 
         # (Optional) Return a string which will be shown as the alert title.
-        old_city = last_login.get("old_city", "<NOT_STORED>")
-        new_city = last_login.get("city", "<UNKNOWN_NEW_CITY>")
+        old_city = login_stats.get("old_city", "<NOT_STORED>")
+        new_city = login_stats.get("city", "<UNKNOWN_NEW_CITY>")
 
         return (
             f"Geographically improbable login for user [{event.deep_get('actor', 'alternateId')}] "
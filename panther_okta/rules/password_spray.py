@@ -0,0 +1,200 @@
+import typing
+
+from panther_core import PantherEvent
+from panther_utils import match_filters
+from panther_sdk import detection
+
+from .. import sample_logs
+from .._shared import (
+    rule_tags,
+    SYSTEM_LOG_TYPE,
+    create_alert_context,
+    SHARED_SUMMARY_ATTRS,
+    pick_filters,
+)
+
+__all__ = ["password_spray", "password_spray_filter"]
+
+
+def password_spray_filter(
+    threshold: int = 10, window_minutes: int = 60, precision: int = 10
+) -> detection.PythonFilter:
+    """Returns True once an IP has failed logins to about threshold distinct users in a window.
+
+    Distinct users are counted per IP with a HyperLogLog sketch of 2**precision one-byte
+    registers (1 KB at the default precision, about 3% error) that is kept in the KV store for
+    the current and the previous window, so state stays bounded however many usernames are
+    sprayed.
+    """
+
+    def _password_spray_filter(event: PantherEvent) -> bool:
+        from base64 import b64decode, b64encode
+        from datetime import datetime
+        from hashlib import blake2b
+        from json import dumps, loads
+        from math import log
+
+        from panther_oss_helpers import get_string_set, put_string_set, set_key_expiration  # type: ignore
+
+        try:
+            # replay installs its clock next to the KV helpers
+            from panther_oss_helpers import now  # type: ignore
+        except ImportError:
+            # Panther's KV store expires keys by the wall clock
+            now = datetime.now().timestamp
+
+        user = event.deep_get("actor", "alternateId")
+        source_ip = event.deep_get("client", "ipAddress")
+        if not source_ip:
+            source_ip = next(iter(event.get("p_any_ip_addresses") or []), None)
+        if not user or not source_ip:
+            return False
+
+        try:
+            event_time = datetime.strptime(
+                event.get("p_event_time")[:26], "%Y-%m-%d %H:%M:%S.%f"
+            )
+        except (TypeError, ValueError):
+            return False
+
+        registers = 1 << precision
+        window = (event_time - datetime(1970, 1, 1)).total_seconds() // (
+            window_minutes * 60
+        )
+
+        # Generate a unique cache key for each source IP
+        spray_key = f"Okta.Login.PasswordSpray{source_ip}"
+        cached = get_string_set(spray_key)
+        state = loads(cached.pop()) if cached else {"window": window}
+
+        empty = bytes(registers)
+        current = b64decode(state["current"]) if "current" in state else empty
+        previous = b64decode(state["previous"]) if "previous" in state else empty
+        if window == state["window"] + 1:
+            current, previous = empty, current
+        elif window > state["window"] + 1:
+            current, previous = empty, empty
+        else:
+            # late events count towards the newest window
+            window = max(window, state["window"])
+
+        # The first precision bits of the hash pick a register, which keeps the longest run
+        # of leading zeros seen in the remaining bits
+        user_name = str(user)
+        digest = blake2b(user_name.lower().encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        rest_bits = 64 - precision
+        index = hashed >> rest_bits
+        rank = rest_bits - (hashed & ((1 << rest_bits) - 1)).bit_length() + 1
+        updated = bytearray(current)
+        updated[index] = max(updated[index], rank)
+
+        # Estimate the distinct users across both windows from the merged registers
+        harmonic = 0.0
+        zeros = 0
+        for register in range(registers):
+            merged = max(updated[register], previous[register])
+            harmonic += 2.0**-merged
+            zeros += merged == 0
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        estimate = alpha * registers**2 / harmonic
+        if estimate <= 2.5 * registers and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = registers * log(registers / zeros)
+
+        put_string_set(
+            spray_key,
+            [
+                dumps(
+                    {
+                        "window": window,
+                        "current": b64encode(bytes(updated)).decode("ascii"),
+                        "previous": b64encode(previous).decode("ascii"),
+                        "estimate": round(estimate),
+                    }
+                )
+            ],
+        )
+        # Expire the entry once both windows it holds have passed
+        set_key_expiration(spray_key, str(now() + 2 * window_minutes * 60))
+
+        return estimate >= threshold
+
+    return detection.PythonFilter(func=_password_spray_filter)
+
+
+def password_spray(
+    pre_filters: typing.List[detection.AnyFilter] = None,
+    overrides: detection.RuleOptions = detection.RuleOptions(),
+) -> detection.Rule:
+    """An IP address has failed to login to many distinct accounts within an hour"""
+
+    def _source_ip(event: PantherEvent) -> str:
+        source_ip = event.deep_get("client", "ipAddress")
+        if not source_ip:
+            source_ip = next(iter(event.get("p_any_ip_addresses") or []), None)
+        return str(source_ip or "<UNKNOWN_IP>")
+
+    def _title(event: PantherEvent) -> str:
+        from json import loads
+        from panther_oss_helpers import get_string_set  # type: ignore
+
+        source_ip = event.deep_get("client", "ipAddress")
+        if not source_ip:
+            source_ip = next(iter(event.get("p_any_ip_addresses") or []), None)
+
+        # Retrieve the estimate stored by the filter, if any
+        cached = get_string_set(f"Okta.Login.PasswordSpray{source_ip}")
+        estimate = loads(cached.pop()).get("estimate") if cached else "<UNKNOWN>"
+
+        return (
+            f"Suspected password spray from [{source_ip}] against "
+            f"about {estimate} distinct Okta accounts"
+        )
+
+    return detection.Rule(
+        name=(overrides.name or "Okta Password Spray"),
+        rule_id=(overrides.rule_id or "Okta.PasswordSpray"),
+        log_types=(overrides.log_types or [SYSTEM_LOG_TYPE]),
+        tags=(overrides.tags or rule_tags("Credential Access:Password Spraying")),
+        reports=(overrides.reports or {detection.ReportKeyMITRE: ["TA0006:T1110.003"]}),
+        severity=(overrides.severity or detection.SeverityHigh),
+        description=(
+            overrides.description
+            or "An IP address has failed to login to many distinct accounts within an hour"
+        ),
+        reference=(
+            overrides.reference
+            or "https://developer.okta.com/docs/reference/api/system-log/#user-events"
+        ),
+        runbook=(
+            overrides.runbook
+            or "Block the IP, then check the targeted accounts for a later successful login"
+        ),
+        filters=pick_filters(
+            overrides=overrides,
+            pre_filters=pre_filters,
+            defaults=[
+                match_filters.deep_equal("eventType", "user.session.start"),
+                match_filters.deep_equal("outcome.result", "FAILURE"),
+                password_spray_filter(),
+            ],
+        ),
+        alert_title=(overrides.alert_title or _title),
+        alert_context=(overrides.alert_context or create_alert_context),
+        summary_attrs=(overrides.summary_attrs or SHARED_SUMMARY_ATTRS),
+        alert_grouping=(
+            overrides.alert_grouping
+            or detection.AlertGrouping(group_by=_source_ip, period_minutes=60)
+        ),
+        unit_tests=(
+            overrides.unit_tests
+            or [
+                detection.JSONUnitTest(
+                    name="Single Failed Login",
+                    expect_match=False,
+                    data=sample_logs.failed_login,
+                ),
+            ]
+        ),
+    )
@@ -0,0 +1,181 @@
+import typing
+
+from panther_core import PantherEvent
+from panther_utils import match_filters
+from panther_sdk import detection
+
+from .. import sample_logs
+from .._shared import (
+    rule_tags,
+    SYSTEM_LOG_TYPE,
+    SHARED_SUMMARY_ATTRS,
+    SESSION_EVENTS,
+    pick_filters,
+)
+
+__all__ = ["session_hijack", "session_hijack_filter"]
+
+
+def session_hijack_filter(
+    max_ips: int = 1,
+    max_as_orgs: int = 1,
+    max_user_agents: int = 1,
+    session_lifetime_hours: float = 12.0,
+    max_values: int = 10,
+) -> detection.PythonFilter:
+    """Returns True when a session is used from a new IP, ASN or user agent beyond the limits.
+
+    Each externalSessionId keeps the distinct client IPs, securityContext.asOrg values and raw
+    user agents it was used from (up to max_values of each) in the KV store, until
+    session_lifetime_hours after it was last used.
+    """
+
+    def _session_hijack_filter(event: PantherEvent) -> bool:
+        from datetime import datetime
+        from json import dumps, loads
+
+        from panther_oss_helpers import get_string_set, put_string_set, set_key_expiration  # type: ignore
+
+        try:
+            # replay installs its clock next to the KV helpers
+            from panther_oss_helpers import now  # type: ignore
+        except ImportError:
+            # Panther's KV store expires keys by the wall clock
+            now = datetime.now().timestamp
+
+        session_id = event.deep_get("authenticationContext", "externalSessionId")
+        if not session_id or session_id == "unknown":
+            return False
+
+        observed = {
+            "ips": event.deep_get("client", "ipAddress"),
+            "as_orgs": event.deep_get("securityContext", "asOrg"),
+            "user_agents": event.deep_get("client", "userAgent", "rawUserAgent"),
+        }
+
+        # Generate a unique cache key for each session
+        session_key = f"Okta.Session{session_id}"
+        cached = get_string_set(session_key)
+        known = bool(cached)
+        session = loads(cached.pop()) if known else {}
+
+        added = False
+        for name, value in observed.items():
+            seen = session.get(name, [])
+            if value and value not in seen and len(seen) < max_values:
+                seen.append(value)
+                added = True
+            session[name] = seen
+
+        if added:
+            put_string_set(session_key, [dumps(session)])
+        if known or added:
+            # Keep the session until it has been idle for its lifetime
+            expires = now() + session_lifetime_hours * 3600
+            set_key_expiration(session_key, str(expires))
+
+        return added and (
+            len(session["ips"]) > max_ips
+            or len(session["as_orgs"]) > max_as_orgs
+            or len(session["user_agents"]) > max_user_agents
+        )
+
+    return detection.PythonFilter(func=_session_hijack_filter)
+
+
+def session_hijack(
+    pre_filters: typing.List[detection.AnyFilter] = None,
+    overrides: detection.RuleOptions = detection.RuleOptions(),
+) -> detection.Rule:
+    """An Okta session was used from several IPs, networks or user agents"""
+
+    def _title(event: PantherEvent) -> str:
+        from json import loads
+        from panther_oss_helpers import get_string_set  # type: ignore
+
+        session_id = event.deep_get("authenticationContext", "externalSessionId")
+
+        # Retrieve the session info from the cache, if any
+        cached = get_string_set(f"Okta.Session{session_id}")
+        session = loads(cached.pop()) if cached else {}
+
+        return (
+            f"Okta session [{session_id}] of [{event.deep_get('actor', 'alternateId')}] "
+            f"used from {len(session.get('ips', []))} IPs, "
+            f"{len(session.get('as_orgs', []))} networks and "
+            f"{len(session.get('user_agents', []))} user agents"
+        )
+
+    def _alert_context(event: PantherEvent) -> typing.Dict[str, typing.Any]:
+        from json import loads
+        from panther_oss_helpers import get_string_set  # type: ignore
+
+        session_id = event.deep_get("authenticationContext", "externalSessionId")
+        cached = get_string_set(f"Okta.Session{session_id}")
+        session = loads(cached.pop()) if cached else {}
+
+        return {
+            "ips": event.get("p_any_ip_addresses", []),
+            "actor": event.get("actor", ""),
+            "target": event.get("target", ""),
+            "client": event.get("client", ""),
+            "session": {
+                "id": session_id,
+                "ips": session.get("ips", []),
+                "as_orgs": session.get("as_orgs", []),
+                "user_agents": session.get("user_agents", []),
+            },
+        }
+
+    def _group_by(event: PantherEvent) -> str:
+        return str(event.deep_get("authenticationContext", "externalSessionId"))
+
+    return detection.Rule(
+        name=(overrides.name or "Okta Session Hijacking"),
+        rule_id=(overrides.rule_id or "Okta.SessionHijack"),
+        log_types=(overrides.log_types or [SYSTEM_LOG_TYPE]),
+        tags=(
+            overrides.tags
+            or rule_tags("Defense Evasion:Use Alternate Authentication Material")
+        ),
+        reports=(overrides.reports or {detection.ReportKeyMITRE: ["TA0005:T1550.004"]}),
+        severity=(overrides.severity or detection.SeverityHigh),
+        description=(
+            overrides.description
+            or "An Okta session was used from several IPs, networks or user agents"
+        ),
+        reference=(
+            overrides.reference
+            or "https://developer.okta.com/docs/reference/api/system-log/#authenticationcontext-object"
+        ),
+        runbook=(
+            overrides.runbook
+            or "Review the session's activity with the session_id_audit query, then clear the "
+            "user's sessions if it was not the user"
+        ),
+        filters=pick_filters(
+            overrides=overrides,
+            pre_filters=pre_filters,
+            defaults=[
+                match_filters.deep_in("eventType", SESSION_EVENTS),
+                session_hijack_filter(),
+            ],
+        ),
+        alert_title=(overrides.alert_title or _title),
+        alert_context=(overrides.alert_context or _alert_context),
+        summary_attrs=(overrides.summary_attrs or SHARED_SUMMARY_ATTRS),
+        alert_grouping=(
+            overrides.alert_grouping
+            or detection.AlertGrouping(group_by=_group_by, period_minutes=60)
+        ),
+        unit_tests=(
+            overrides.unit_tests
+            or [
+                detection.JSONUnitTest(
+                    name="First Use of a Session",
+                    expect_match=False,
+                    data=sample_logs.first_login,
+                ),
+            ]
+        ),
+    )
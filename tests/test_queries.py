@@ -1,3 +1,4 @@
+import re
 import typing
 import unittest
 
@@ -28,3 +29,84 @@ class TestQueries(unittest.TestCase):
             self.assertIsInstance(
                 okta.queries.support_access(datalake=datalake), query.Query
             )
+
+    def test_investigation_filters(self) -> None:
+        q = okta.queries.session_id_audit(
+            datalake="snowflake",
+            session_id="102abc",
+            actor_email="o'brien@acme.io",
+            event_types=[
+                "user.session.start",
+                "user.session.end",
+                "user.session.start",
+            ],
+        )
+
+        self.assertIn("AND authenticationContext:externalSessionId = '102abc'", q.sql)
+        self.assertIn("AND actor:alternateId = 'o''brien@acme.io'", q.sql)
+        self.assertIn(
+            "AND eventType IN ('user.session.end', 'user.session.start')", q.sql
+        )
+
+        q = okta.queries.activity_audit(datalake="athena", actor_email="alice@acme.io")
+        self.assertIn("AND actor.alternateId = 'alice@acme.io'", q.sql)
+        self.assertNotIn("eventType IN", q.sql)
+
+    def test_investigation_filters_are_stable(self) -> None:
+        first = okta.queries.session_id_audit(
+            datalake="athena",
+            session_id="102abc",
+            event_types=["b", "a"],
+        )
+        second = okta.queries.session_id_audit(
+            datalake="athena",
+            session_id="102abc",
+            event_types=["a", "b", "a"],
+        )
+
+        self.assertEqual(first.sql, second.sql)
+
+    def test_investigation_filters_defaults(self) -> None:
+        q = okta.queries.mfa_password_reset_audit(datalake="snowflake")
+
+        self.assertNotIn("actor:alternateId =", q.sql)
+        self.assertNotIn("--", q.sql)
+
+    def test_combined_audit(self) -> None:
+        for datalake in ["snowflake", "athena"]:
+            q = okta.queries.combined_audit(datalake=datalake)  # type: ignore
+            self.assertIsInstance(q, query.Query)
+            self.assertEqual(q.sql.count("FROM panther_logs."), 1)
+
+            for category in okta.queries.COMBINED_AUDIT_CATEGORIES:
+                self.assertIn(f"THEN '{category}'", q.sql)
+
+    def test_combined_audit_categories(self) -> None:
+        q = okta.queries.combined_audit(
+            datalake="snowflake", categories=["support_access"]
+        )
+
+        self.assertIn("THEN 'support_access'", q.sql)
+        self.assertNotIn("privilege.grant", q.sql)
+
+        with self.assertRaises(ValueError):
+            okta.queries.combined_audit(datalake="snowflake", categories=["nope"])
+
+    def test_combined_audit_windows(self) -> None:
+        # each category keeps the time range of its standalone query
+        datalakes: typing.List[typing.Literal["snowflake", "athena"]] = [
+            "snowflake",
+            "athena",
+        ]
+        standalones: typing.List[typing.Callable[..., query.Query]] = [
+            okta.queries.admin_access_granted,
+            okta.queries.mfa_password_reset_audit,
+            okta.queries.support_access,
+        ]
+        for datalake in datalakes:
+            combined = okta.queries.combined_audit(datalake=datalake)
+            for standalone in standalones:
+                sql = standalone(datalake=datalake).sql
+                window = re.search(r"p_occurs_\w+\([^)]*\)", sql)
+                assert window is not None
+                self.assertIn(window.group(), combined.sql)
@@ -0,0 +1,115 @@
+import typing
+import unittest
+from datetime import datetime
+
+import panther_okta as okta
+from panther_okta.queries.testing import QueryHarness, generate_event
+
+NOW = datetime(2022, 3, 22)
+
+EVENTS = [
+    generate_event(
+        "user.session.start",
+        p_event_time="2022-03-20 10:00:00.000000",
+        authenticationContext={"externalSessionId": "102abc"},
+    ),
+    generate_event(
+        "user.account.privilege.grant",
+        actor_email="jack@acme.io",
+        p_event_time="2022-03-18 10:00:00.000000",
+        target=[{"alternateId": "alice@acme.io"}],
+        debugContext={"debugData": {"privilegeGranted": "Super Admin"}},
+    ),
+    generate_event(
+        "user.account.reset_password",
+        p_event_time="2022-03-21 10:00:00.000000",
+        target=[{"alternateId": "bart@springfield.gov"}],
+    ),
+    generate_event(
+        "user.session.impersonation.grant",
+        p_event_time="2022-03-19 10:00:00.000000",
+    ),
+    generate_event(
+        "user.session.start",
+        p_event_time="2021-01-01 10:00:00.000000",
+    ),
+]
+
+DATALAKES: typing.List[typing.Literal["snowflake", "athena"]] = ["snowflake", "athena"]
+
+
+class TestQueryHarness(unittest.TestCase):
+    def test_session_id_audit(self) -> None:
+        for datalake in DATALAKES:
+            harness = QueryHarness(EVENTS, datalake=datalake, now=NOW)
+            run = harness.run(
+                okta.queries.session_id_audit(datalake=datalake, session_id="102abc")
+            )
+
+            self.assertEqual(
+                run.project("event_time", "actor_email"),
+                [("2022-03-20 10:00:00.000000", "homer@springfield.gov")],
+            )
+            # the 2021 login is outside the 7 day window
+            self.assertEqual(run.rows_scanned, 4)
+
+    def test_mfa_password_reset_audit(self) -> None:
+        for datalake in DATALAKES:
+            harness = QueryHarness(EVENTS, datalake=datalake, now=NOW)
+            run = harness.run(okta.queries.mfa_password_reset_audit(datalake=datalake))
+
+            # athena arrays are 1-indexed, snowflake arrays are 0-indexed
+            self.assertEqual(
+                run.project("actor_user", "target_user"),
+                [("homer@springfield.gov", "bart@springfield.gov")],
+            )
+
+    def test_activity_audit(self) -> None:
+        harness = QueryHarness(EVENTS, now=NOW)
+        run = harness.run(
+            okta.queries.activity_audit(
+                datalake="snowflake", event_types=["user.session.start"]
+            )
+        )
+
+        self.assertEqual(
+            run.project("actor_email", "eventType", "activity_count"),
+            [("homer@springfield.gov", "user.session.start", 1)],
+        )
+
+    def test_combined_audit(self) -> None:
+        for datalake in DATALAKES:
+            harness = QueryHarness(EVENTS, datalake=datalake, now=NOW)
+            run = harness.run(okta.queries.combined_audit(datalake=datalake))
+
+            self.assertEqual(
+                run.project("category", "actor_email"),
+                [
+                    ("admin_access_granted", "jack@acme.io"),
+                    ("mfa_password_reset", "homer@springfield.gov"),
+                    ("support_access", "homer@springfield.gov"),
+                ],
+            )
+
+    def test_rows_scanned_without_time_predicate(self) -> None:
+        harness = QueryHarness(EVENTS, now=NOW)
+        run = harness.run("SELECT eventType FROM panther_logs.public.okta_systemlog")
+
+        self.assertEqual(run.rows_scanned, len(EVENTS))
+        self.assertEqual(len(harness.history), 1)
+        self.assertGreaterEqual(run.elapsed_seconds, 0)
+
+    def test_translate(self) -> None:
+        harness = QueryHarness([], now=NOW)
+
+        self.assertEqual(
+            harness.translate(
+                "SELECT target[0]:alternateId FROM panther_logs.public.okta_systemlog "
+                "WHERE p_occurs_since('1 day') AND displayMessage = 'a:b'"
+            ),
+            "SELECT json_extract(target, '$[0].alternateId') FROM okta_systemlog "
+            "WHERE p_event_time >= '2022-03-21 00:00:00.000000' AND displayMessage = 'a:b'",
+        )
+
+        with self.assertRaises(ValueError):
+            harness.translate("SELECT 1 WHERE p_occurs_since('a fortnight')")
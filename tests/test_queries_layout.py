@@ -0,0 +1,60 @@
+import unittest
+
+from panther_sdk import query
+from panther_okta.queries import layout
+
+
+class TestQueryLayout(unittest.TestCase):
+    def test_field_usage(self) -> None:
+        usage = {
+            u.path: u for u in layout.field_usage(layout.pack_queries("snowflake"))
+        }
+
+        self.assertTrue(usage["p_event_time"].range)
+        self.assertTrue(usage["eventType"].equality)
+        self.assertTrue(usage["actor.alternateId"].equality)
+        self.assertTrue(usage["debugContext.debugData.privilegeGranted"].substring)
+        self.assertEqual(
+            usage["eventType"].queries, len(layout.pack_queries("snowflake"))
+        )
+
+    def test_field_usage_athena_spelling(self) -> None:
+        paths = [u.path for u in layout.field_usage(layout.pack_queries("athena"))]
+
+        self.assertIn("actor.alternateId", paths)
+        self.assertIn("authenticationContext.externalSessionId", paths)
+
+    def test_snowflake_layout(self) -> None:
+        statements = layout.snowflake_layout()
+
+        self.assertEqual(
+            statements[0],
+            "ALTER TABLE panther_logs.public.okta_systemlog CLUSTER BY (TO_DATE(p_event_time), eventType);",
+        )
+        self.assertIn("EQUALITY(actor:alternateId)", statements[1])
+        self.assertIn(
+            "SUBSTRING(debugContext:debugData:privilegeGranted)", statements[1]
+        )
+
+    def test_snowflake_layout_from_queries(self) -> None:
+        q = query.Query(
+            name="Okta Layout Test",
+            sql="SELECT 1 FROM panther_logs.public.okta_systemlog WHERE p_occurs_since('1 day')",
+        )
+
+        self.assertEqual(
+            layout.snowflake_layout([q]),
+            [
+                "ALTER TABLE panther_logs.public.okta_systemlog CLUSTER BY (TO_DATE(p_event_time));"
+            ],
+        )
+
+    def test_athena_layout(self) -> None:
+        (statement,) = layout.athena_layout(location="s3://bucket/logs/okta_systemlog/")
+
+        self.assertIn("'projection.enabled' = 'true'", statement)
+        self.assertIn("'projection.hour.range' = '0,23'", statement)
+        self.assertIn(
+            "'storage.location.template' = 's3://bucket/logs/okta_systemlog/year=${year}/month=${month}/day=${day}/hour=${hour}'",
+            statement,
+        )
@@ -0,0 +1,87 @@
+import typing
+import unittest
+
+from panther_sdk import query
+import panther_okta as okta
+from panther_okta.queries import lint
+
+
+def codes(findings: typing.List[lint.LintFinding]) -> typing.List[str]:
+    return [f.code for f in findings]
+
+
+class TestQueryLint(unittest.TestCase):
+    def test_query_pack_has_no_errors(self) -> None:
+        datalakes: typing.List[typing.Literal["snowflake", "athena"]] = [
+            "snowflake",
+            "athena",
+        ]
+        factories = [
+            okta.queries.activity_audit,
+            okta.queries.admin_access_granted,
+            okta.queries.combined_audit,
+            okta.queries.mfa_password_reset_audit,
+            okta.queries.session_id_audit,
+            okta.queries.support_access,
+        ]
+
+        for datalake in datalakes:
+            for factory in factories:
+                findings = lint.lint_query(factory(datalake=datalake))  # type: ignore
+                errors = [f for f in findings if f.severity == lint.SeverityError]
+                self.assertEqual(errors, [], f"{factory.__name__} ({datalake})")
+
+    def test_override_sql(self) -> None:
+        q = okta.queries.support_access(
+            datalake="snowflake",
+            overrides=query.QueryOptions(
+                sql="SELECT * FROM panther_logs.public.okta_systemlog -- p_occurs_since('1 day')"
+            ),
+        )
+
+        self.assertEqual(
+            codes(lint.lint_query(q)), ["missing-time-predicate", "select-star"]
+        )
+
+    def test_partial_time_predicate(self) -> None:
+        findings = lint.lint_sql(
+            """
+            SELECT eventType FROM panther_logs.public.okta_systemlog
+            WHERE eventType = 'a' OR eventType = 'b' AND p_occurs_since('1 day')
+            """
+        )
+
+        self.assertEqual(codes(findings), ["partial-time-predicate"])
+
+    def test_whole_object_projection(self) -> None:
+        findings = lint.lint_sql(
+            """
+            SELECT target as target_name, actor:alternateId as actor_email, eventType
+            FROM panther_logs.public.okta_systemlog
+            WHERE p_occurs_since('1 day')
+            """
+        )
+
+        self.assertEqual(codes(findings), ["whole-object-projection"])
+
+    def test_json_before_cheap_predicate(self) -> None:
+        findings = lint.lint_sql(
+            """
+            SELECT eventType FROM panther_logs.okta_systemlog
+            WHERE json_extract(debugcontext.debugdata, '$.privilegeGranted') IS NOT NULL
+            AND eventType = 'user.account.privilege.grant'
+            AND p_occurs_since('1 day')
+            """
+        )
+
+        self.assertEqual(codes(findings), ["json-before-cheap-predicate"])
+
+    def test_unbounded_order_by(self) -> None:
+        sql = """
+            SELECT eventType FROM panther_logs.public.okta_systemlog
+            WHERE p_occurs_since('1 day')
+            ORDER BY p_event_time DESC
+        """
+
+        self.assertEqual(codes(lint.lint_sql(sql)), ["unbounded-order-by"])
+        self.assertEqual(lint.lint_sql(sql + " LIMIT 100"), [])
@@ -0,0 +1,103 @@
+import os
+import gzip
+import json
+import shutil
+import datetime
+import tempfile
+import unittest
+
+import panther_okta as okta
+
+NOW = datetime.datetime(2022, 10, 2, tzinfo=datetime.timezone.utc).timestamp()
+
+
+class TestBootstrapGeoState(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        self.store = okta.replay.MemoryKV(now=lambda: NOW)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+
+    def test_csv_export(self) -> None:
+        path = os.path.join(self.dir, "logins.csv")
+        with open(path, "w") as f:
+            f.write("actor_email,city,lat,lon,event_time\n")
+            f.write("a@example.com,Paris,48.85,2.35,2022-10-01 09:00:00.000\n")
+            f.write("a@example.com,Lyon,45.76,4.83,2022-10-01 11:00:00.000\n")
+            f.write("a@example.com,Nice,43.70,7.26,2022-10-01 10:00:00.000\n")
+            f.write("b@example.com,,,,2022-10-01 10:00:00.000\n")
+
+        logins = list(okta.replay.read_logins(path))
+        self.assertEqual(len(logins), 3)
+
+        latest = okta.replay.latest_logins(logins)
+        self.assertEqual(latest["a@example.com"].city, "Lyon")
+        self.assertEqual(latest["a@example.com"].time, "2022-10-01 11:00:00.000000")
+
+    def test_uppercase_headers(self) -> None:
+        # Snowflake exports column names in upper case
+        path = os.path.join(self.dir, "logins.csv")
+        with open(path, "w") as f:
+            f.write("ACTOR,CITY,LAT,LON,P_EVENT_TIME\n")
+            f.write("a@example.com,Paris,48.85,2.35,2022-10-01 09:00:00.000\n")
+
+        (login,) = okta.replay.read_logins(path)
+
+        self.assertEqual((login.actor, login.city), ("a@example.com", "Paris"))
+        self.assertEqual((login.lat, login.lon), (48.85, 2.35))
+
+    def test_jsonl_events(self) -> None:
+        event = json.loads(okta.sample_logs.first_login)
+        event["p_event_time"] = "2022-10-01T12:00:00Z"
+        path = os.path.join(self.dir, "logins.jsonl.gz")
+        with gzip.open(path, "wb") as f:
+            f.write(json.dumps(event).encode() + b"\n\n")
+
+        (login,) = okta.replay.read_logins(path)
+
+        self.assertEqual(login.actor, event["actor"]["alternateId"])
+        self.assertEqual(login.city, event["client"]["geographicalContext"]["city"])
+        self.assertEqual(login.time, "2022-10-01 12:00:00.000000")
+
+    def test_bootstrap(self) -> None:
+        logins = [
+            okta.replay.GeoLogin(
+                "a", "Paris", 48.85, 2.35, "2022-10-01 09:00:00.000000"
+            ),
+            okta.replay.GeoLogin(
+                "b", "Lyon", 45.76, 4.83, "2022-10-01 09:00:00.000000"
+            ),
+        ]
+        self.store.put_string_set(
+            okta.replay.geo_login_key("b"),
+            [json.dumps({"city": "Nice", "time": "2022-10-01 10:00:00.000000"})],
+        )
+        snapshot = okta.replay.StateSnapshot(os.path.join(self.dir, "state.kv"))
+        snapshot.restore(okta.replay.MemoryKV())
+
+        written = okta.replay.bootstrap_geo_state(
+            logins, self.store, snapshot, batch_size=1
+        )
+
+        self.assertEqual(written, 1)
+        self.assertEqual(
+            self.store.expirations[okta.replay.geo_login_key("a")],
+            datetime.datetime(2022, 10, 8, 9, tzinfo=datetime.timezone.utc).timestamp(),
+        )
+        restored = okta.replay.MemoryKV(now=lambda: NOW)
+        okta.replay.StateSnapshot(os.path.join(self.dir, "state.kv")).restore(restored)
+        self.assertEqual(len(restored), 2)
+
+        # the first login seen live is now compared with the bootstrapped one
+        event = json.loads(okta.sample_logs.failed_login)
+        event["actor"]["alternateId"] = "a"
+        event["p_event_time"] = "2022-10-01 10:00:00.000000"
+        with okta.replay.installed(self.store):
+            matches = list(
+                okta.replay.evaluate(
+                    [okta.rules.geo_improbable_access()], [okta.replay.to_event(event)]
+                )
+            )
+        self.assertEqual(len(matches), 1)
+        self.assertIn("from [Paris]", matches[0].title)
@@ -0,0 +1,89 @@
+import sys
+import json
+import time
+import typing
+import datetime
+import unittest
+
+import panther_okta as okta
+
+
+def session_event(session_id: str, ip: str, time: str) -> typing.Any:
+    event = json.loads(okta.sample_logs.first_login)
+    event["authenticationContext"]["externalSessionId"] = session_id
+    event["client"]["ipAddress"] = ip
+    event["p_event_time"] = time
+    return okta.replay.to_event(event)
+
+
+def epoch(time: str) -> float:
+    parsed = datetime.datetime.fromisoformat(time)
+    return parsed.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class TestClocks(unittest.TestCase):
+    def test_event_clock(self) -> None:
+        clock = okta.replay.EventClock()
+        clock.observe({"p_event_time": "2022-10-01 10:00:00.000000"})
+        clock.observe({"p_event_time": "2022-10-01 09:00:00.000000"})
+        clock.observe({"p_event_time": "redacted"})
+
+        self.assertEqual(clock(), epoch("2022-10-01 10:00:00"))
+
+    def test_wall_clock(self) -> None:
+        clock = okta.replay.WallClock()
+        clock.observe({"p_event_time": "2000-01-01 00:00:00.000000"})
+
+        self.assertGreater(clock(), 1_600_000_000)
+
+    def test_clock_is_abstract(self) -> None:
+        with self.assertRaises(TypeError):
+            okta.replay.Clock()  # type: ignore
+
+
+class TestEventTimeExpiry(unittest.TestCase):
+    def replay(
+        self, store: okta.replay.MemoryKV, events: typing.List[typing.Any]
+    ) -> typing.List[okta.replay.Match]:
+        with okta.replay.installed(store):
+            return list(okta.replay.evaluate([okta.rules.session_hijack()], events))
+
+    def test_replay_expires_state(self) -> None:
+        store = okta.replay.MemoryKV()
+        matches = self.replay(
+            store,
+            [
+                session_event("s1", "10.0.0.1", "2022-10-01 00:00:00.000000"),
+                session_event("s2", "10.0.0.1", "2022-10-01 06:00:00.000000"),
+                # s1 was idle for longer than its 12 hour lifetime
+                session_event("s1", "10.0.0.2", "2022-10-01 13:00:00.000000"),
+                session_event("s2", "10.0.0.2", "2022-10-01 14:00:00.000000"),
+            ],
+        )
+
+        self.assertEqual([match.dedup for match in matches], ["s2"])
+        self.assertEqual(store.now(), epoch("2022-10-01 14:00:00"))
+
+    def test_expiry_follows_the_store_clock(self) -> None:
+        store = okta.replay.MemoryKV(now=lambda: epoch("2022-10-01 12:00:00"))
+        self.replay(
+            store, [session_event("s1", "10.0.0.1", "2022-10-01 00:00:00.000000")]
+        )
+
+        self.assertEqual(
+            store.expirations["Okta.Sessions1"], epoch("2022-10-02 00:00:00")
+        )
+
+    def test_wall_clock_without_an_installed_clock(self) -> None:
+        # Panther's helpers have no clock, so the rules fall back to the wall clock
+        store = okta.replay.MemoryKV()
+        rule = okta.rules.session_hijack()
+        with okta.replay.installed(store):
+            delattr(sys.modules["panther_oss_helpers"], "now")
+            okta.replay.rule_matches(
+                rule, session_event("s1", "10.0.0.1", "2022-10-01 00:00:00.000000")
+            )
+
+        self.assertAlmostEqual(
+            store.expirations["Okta.Sessions1"], time.time() + 12 * 3600, delta=60
+        )
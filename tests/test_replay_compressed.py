@@ -0,0 +1,81 @@
+import os
+import gzip
+import types
+import typing
+import shutil
+import tempfile
+import importlib
+import unittest
+
+import panther_okta as okta
+
+zstandard: typing.Optional[types.ModuleType]
+try:
+    zstandard = importlib.import_module("zstandard")
+except ImportError:
+    zstandard = None
+
+
+class TestReplayCompressed(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        self.lines = [
+            okta.sample_logs.system_api_token_create.encode(),
+            okta.sample_logs.user_session_start.encode(),
+            okta.sample_logs.system_api_token_revoke.encode(),
+        ]
+        self.data = b"\n".join(self.lines[:2]) + b"\r\n\n" + self.lines[2]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_lines(self) -> None:
+        paths = [
+            self.write("plain.jsonl", self.data),
+            self.write("events.jsonl.gz", gzip.compress(self.data)),
+        ]
+
+        # tiny blocks so lines straddle block boundaries
+        lines = list(okta.replay.compressed_lines(paths, block_size=7, depth=2))
+
+        self.assertEqual(lines, self.lines * 2)
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self) -> None:
+        assert zstandard is not None
+        path = self.write(
+            "events.jsonl.zst", zstandard.ZstdCompressor().compress(self.data)
+        )
+
+        self.assertEqual(list(okta.replay.compressed_lines([path])), self.lines)
+
+    def test_errors_reach_the_consumer(self) -> None:
+        path = self.write("broken.jsonl.gz", gzip.compress(self.data)[:-20])
+
+        with self.assertRaises(EOFError):
+            list(okta.replay.compressed_lines([path]))
+
+    def test_early_close(self) -> None:
+        path = self.write("events.jsonl.gz", gzip.compress(self.data * 100))
+        reader = okta.replay.ReadAhead(okta.replay.open_compressed(path), 16, 1)
+
+        next(iter(reader))
+        reader.close()
+
+        self.assertFalse(reader._thread.is_alive())
+
+    def test_replay_compressed(self) -> None:
+        path = self.write("events.jsonl.gz", gzip.compress(self.data))
+        rule_set = [okta.rules.api_key_created(), okta.rules.api_key_revoked()]
+
+        matches = list(okta.replay.replay_compressed([path], rule_set))
+
+        self.assertEqual(
+            [m.rule_id for m in matches], ["Okta.APIKeyCreated", "Okta.APIKeyRevoked"]
+        )
@@ -0,0 +1,86 @@
+import json
+import unittest
+
+import panther_okta as okta
+
+
+def line(uuid: str, minute: int) -> bytes:
+    event = json.loads(okta.sample_logs.system_api_token_create)
+    event["uuid"] = uuid
+    event["p_event_time"] = f"2022-10-01 10:{minute:02d}:00.000000"
+    return json.dumps(event).encode()
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_sizing_and_error_rate(self) -> None:
+        bloom = okta.replay.BloomFilter(10_000, 0.01)
+        for i in range(10_000):
+            bloom.add(f"seen-{i}")
+
+        self.assertTrue(all(f"seen-{i}" in bloom for i in range(10_000)))
+        false_positives = sum(f"new-{i}" in bloom for i in range(10_000))
+        self.assertLess(false_positives, 300)
+        self.assertEqual(bloom.hashes, 7)
+
+    def test_memory_cap(self) -> None:
+        bloom = okta.replay.BloomFilter(10_000, 0.001, max_bytes=1024)
+
+        self.assertEqual(bloom.bits, 8192)
+        self.assertGreater(bloom.expected_error_rate, 0.001)
+
+        with self.assertRaises(ValueError):
+            okta.replay.BloomFilter(10, 1.0)
+
+
+class TestDuplicateFilter(unittest.TestCase):
+    def test_rotation_by_event_time(self) -> None:
+        bloom = okta.replay.RotatingBloomFilter(window_seconds=600, capacity=100)
+        bloom.add("a", 0.0)
+        bloom.add("b", 599.0)
+        bloom.add("c", 600.0)
+
+        self.assertEqual(bloom.rotations, 1)
+        self.assertTrue(all(item in bloom for item in "abc"))
+
+        bloom.add("d", 1200.0)
+        self.assertNotIn("a", bloom)
+        self.assertIn("c", bloom)
+
+    def test_rotation_by_capacity(self) -> None:
+        bloom = okta.replay.RotatingBloomFilter(capacity=10)
+        for i in range(25):
+            bloom.add(str(i))
+
+        self.assertEqual(bloom.rotations, 2)
+        self.assertIn("24", bloom)
+        self.assertNotIn("0", bloom)
+
+    def test_replay_lines(self) -> None:
+        lines = [line("1", 0), line("2", 1), line("1", 2), line("2", 3)]
+        lines.append(okta.sample_logs.system_api_token_create.encode())
+        duplicates = okta.replay.DuplicateFilter()
+
+        matches = list(
+            okta.replay.replay_lines(
+                lines, [okta.rules.api_key_created()], duplicates=duplicates
+            )
+        )
+
+        self.assertEqual([m.event.get("uuid") for m in matches[:2]], ["1", "2"])
+        self.assertEqual((duplicates.kept, duplicates.dropped), (3, 2))
+
+    def test_pipeline(self) -> None:
+        lines = [line(str(i % 5), i) for i in range(20)]
+        duplicates = okta.replay.DuplicateFilter()
+        matches: list = []
+
+        okta.replay.run_rules(
+            lines,
+            [okta.rules.api_key_created()],
+            matches.append,
+            filter_workers=2,
+            duplicates=duplicates,
+        )
+
+        self.assertEqual(len(matches), 5)
+        self.assertEqual(duplicates.dropped, 15)
@@ -0,0 +1,65 @@
+import json
+import unittest
+
+from panther_sdk import detection
+import panther_okta as okta
+
+
+class TestReplayEvaluate(unittest.TestCase):
+    def test_render_match(self) -> None:
+        rule = okta.rules.admin_role_assigned()
+        event = okta.replay.to_event(json.loads(okta.sample_logs.admin_access_assigned))
+
+        self.assertTrue(okta.replay.rule_matches(rule, event))
+
+        match = okta.replay.render_match(rule, event)
+        self.assertEqual(match.rule_id, "Okta.AdminRoleAssigned")
+        self.assertEqual(match.severity, "INFO")
+        self.assertEqual(match.dedup, match.title)
+        self.assertEqual(
+            match.alert_context["ips"], event.get("p_any_ip_addresses", [])
+        )
+
+    def test_udm_titles(self) -> None:
+        rule = okta.rules.admin_disabled_mfa()
+        event = okta.replay.to_event(
+            json.loads(okta.sample_logs.system_mfa_factor_deactivate)
+        )
+
+        match = okta.replay.render_match(rule, event)
+        self.assertEqual(
+            match.title,
+            "Okta System-wide MFA Disabled by Admin User homer@springfield.gov",
+        )
+
+    def test_evaluate(self) -> None:
+        events = [
+            okta.replay.to_event(json.loads(okta.sample_logs.system_api_token_create)),
+            okta.replay.to_event(json.loads(okta.sample_logs.user_session_start)),
+            okta.replay.to_event(json.loads(okta.sample_logs.system_api_token_revoke)),
+        ]
+        rules = [okta.rules.api_key_created(), okta.rules.api_key_revoked()]
+
+        matches = list(okta.replay.evaluate(rules, events))
+
+        self.assertEqual(
+            [m.rule_id for m in matches], ["Okta.APIKeyCreated", "Okta.APIKeyRevoked"]
+        )
+
+    def test_evaluate_errors(self) -> None:
+        def _explode(event: okta.replay.Match) -> bool:
+            raise ValueError("boom")
+
+        rule = okta.rules.api_key_created(
+            overrides=detection.RuleOptions(
+                filters=[detection.PythonFilter(func=_explode)]  # type: ignore
+            )
+        )
+        event = okta.replay.to_event(json.loads(okta.sample_logs.user_session_start))
+
+        with self.assertRaises(ValueError):
+            list(okta.replay.evaluate([rule], [event]))
+
+        errors: list = []
+        self.assertEqual(list(okta.replay.evaluate([rule], [event], errors=errors)), [])
+        self.assertEqual(errors[0].rule_id, "Okta.APIKeyCreated")
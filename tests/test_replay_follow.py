@@ -0,0 +1,187 @@
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import typing
+import unittest
+
+from panther_sdk import detection
+import panther_okta as okta
+
+
+def login(actor: str, time: str, city: str, lat: float, lon: float) -> bytes:
+    event = {
+        "eventType": "user.session.start",
+        "outcome": {"result": "FAILURE"},
+        "actor": {"alternateId": actor},
+        "client": {
+            "geographicalContext": {
+                "city": city,
+                "geolocation": {"lat": lat, "lon": lon},
+            }
+        },
+        "p_event_time": f"2022-10-01 {time}.000000",
+    }
+    return json.dumps(event).encode() + b"\n"
+
+
+class TestFollower(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        self.log = os.path.join(self.dir, "okta.jsonl")
+        self.checkpoint = os.path.join(self.dir, "checkpoint.json")
+        self.rule_set: typing.List[detection.Rule] = [
+            okta.rules.api_key_created(),
+            okta.rules.geo_improbable_access(),
+        ]
+        self.created = okta.sample_logs.system_api_token_create.encode() + b"\n"
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+
+    def append(self, path: str, data: bytes) -> None:
+        with open(path, "ab") as f:
+            f.write(data)
+
+    def follower(self) -> okta.replay.Follower:
+        return okta.replay.Follower(self.dir, self.rule_set, self.checkpoint)
+
+    def test_complete_lines_only(self) -> None:
+        follower = self.follower()
+        self.append(self.log, self.created + self.created[:40])
+
+        self.assertEqual(len(follower.poll()), 1)
+        self.assertEqual(follower.poll(), [])
+
+        self.append(self.log, self.created[40:])
+        self.assertEqual(len(follower.poll()), 1)
+        self.assertEqual(list(follower.offsets().values()), [len(self.created) * 2])
+
+    def test_batch_budget(self) -> None:
+        follower = okta.replay.Follower(
+            self.dir, self.rule_set, self.checkpoint, max_batch_bytes=10
+        )
+        self.append(self.log, self.created * 2)
+
+        # a line longer than the budget is still read whole
+        self.assertEqual(len(follower.poll()), 1)
+        self.assertEqual(len(follower.poll()), 1)
+        self.assertEqual(follower.poll(), [])
+
+    def test_rotation(self) -> None:
+        follower = self.follower()
+        self.append(self.log, self.created)
+        self.assertEqual(len(follower.poll()), 1)
+
+        # unread lines in the rotated file are still evaluated, once
+        self.append(self.log, self.created)
+        os.rename(self.log, self.log + ".1")
+        self.append(self.log, self.created * 2)
+        self.append(os.path.join(self.dir, "old.jsonl.gz"), gzip.compress(self.created))
+
+        self.assertEqual(len(follower.poll()), 3)
+        self.assertEqual(follower.poll(), [])
+
+        os.remove(self.log + ".1")
+        follower.poll()
+        self.assertEqual(len(follower.positions), 1)
+
+    def test_truncation(self) -> None:
+        follower = self.follower()
+        self.append(self.log, self.created * 3)
+        self.assertEqual(len(follower.poll()), 3)
+
+        with open(self.log, "wb") as f:
+            f.write(self.created)
+        self.assertEqual(len(follower.poll()), 1)
+
+    def test_resume(self) -> None:
+        follower = self.follower()
+        self.append(self.log, self.created)
+        self.append(
+            self.log, login("a@b.c", "10:00:00", "San Francisco", 37.77, -122.42)
+        )
+        self.assertEqual(len(follower.poll()), 1)
+        follower.commit()
+
+        # polled after the commit, so redone after the restart
+        self.append(self.log, self.created)
+        self.assertEqual(len(follower.poll()), 1)
+
+        resumed = self.follower()
+        self.append(self.log, login("a@b.c", "10:30:00", "Sydney", -33.87, 151.21))
+        matches = resumed.poll()
+
+        self.assertEqual(
+            [m.rule_id for m in matches],
+            ["Okta.APIKeyCreated", "Okta.GeographicallyImprobableAccess"],
+        )
+        self.assertIn("from [San Francisco]  to [Sydney]", matches[1].title)
+
+        resumed.commit()
+        self.assertEqual(self.follower().poll(), [])
+        self.assertFalse(os.path.exists(self.checkpoint + ".tmp"))
+
+    def test_commit_appends_changes(self) -> None:
+        store = okta.replay.MemoryKV()
+        for i in range(200):
+            store.put_string_set(f"key{i}", ["x" * 100])
+        follower = okta.replay.Follower(
+            self.dir, self.rule_set, self.checkpoint, store=store
+        )
+        follower.commit()
+        size = os.path.getsize(self.checkpoint)
+
+        self.append(self.log, self.created)
+        follower.poll()
+        follower.commit()
+
+        # the new offsets, not another copy of the 200 keys
+        self.assertLess(os.path.getsize(self.checkpoint) - size, 1000)
+        resumed = self.follower()
+        self.assertEqual(len(resumed.store), 200)
+        self.assertEqual(resumed.offsets(), follower.offsets())
+
+    def test_follow(self) -> None:
+        follower = self.follower()
+        self.append(self.log, self.created * 2)
+        stop = threading.Event()
+
+        batches = []
+        for batch in okta.replay.follow(follower, interval=0.01, stop=stop):
+            batches.append(batch)
+            stop.set()
+
+        self.assertEqual([len(batch) for batch in batches], [2])
+        self.assertEqual(self.follower().poll(), [])
+
+    def test_follow_commits_before_yielding(self) -> None:
+        follower = self.follower()
+        self.append(self.log, self.created * 2)
+        batches = okta.replay.follow(follower, interval=0.01)
+        self.assertEqual(len(next(batches)), 2)
+
+        # stopped while handling the batch: its lines are not read again, but the batch is
+        # handed out again under the same sequence
+        resumed = self.follower()
+        self.assertEqual(resumed.offsets(), follower.offsets())
+        self.assertEqual(resumed.sequence, follower.sequence)
+        self.assertEqual(
+            [(m.rule_id, m.title, m.event.get("uuid")) for m in resumed.pending],
+            [(m.rule_id, m.title, m.event.get("uuid")) for m in follower.pending],
+        )
+        self.assertEqual(resumed.poll(), [])
+
+        stop = threading.Event()
+        redelivered = []
+        for batch in okta.replay.follow(resumed, interval=0.01, stop=stop):
+            redelivered.append((resumed.sequence, len(batch)))
+            stop.set()
+        self.assertEqual(redelivered, [(follower.sequence, 2)])
+
+        # asking for more acknowledged the batch
+        acknowledged = self.follower()
+        self.assertEqual(acknowledged.pending, [])
+        self.assertEqual(list(okta.replay.follow(acknowledged, stop=stop)), [])
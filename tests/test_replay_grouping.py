@@ -0,0 +1,85 @@
+import typing
+import unittest
+
+import panther_okta as okta
+
+
+def match(
+    rule_id: str, dedup: str, minute: int, title: str = "title"
+) -> okta.replay.Match:
+    hour, minute = divmod(minute, 60)
+    event = okta.replay.to_event(
+        {"p_event_time": f"2022-10-01 {10 + hour:02d}:{minute:02d}:00.000000"}
+    )
+    return okta.replay.Match(rule_id, title, "HIGH", dedup, {}, event)
+
+
+class TestAlertGrouper(unittest.TestCase):
+    def setUp(self) -> None:
+        # geo_improbable_access groups by actor for 15 minutes; api_key_created has no grouping
+        self.rule_set = [
+            okta.rules.geo_improbable_access(),
+            okta.rules.api_key_created(),
+        ]
+        self.geo = "Okta.GeographicallyImprobableAccess"
+        self.api = "Okta.APIKeyCreated"
+
+    def test_group_by_and_period(self) -> None:
+        matches = [
+            match(self.geo, "a", 0),
+            match(self.geo, "b", 1),
+            match(self.geo, "a", 14),
+            match(self.geo, "a", 15),
+            match(self.geo, "a", 40),
+        ]
+
+        alerts = list(okta.replay.group_alerts(matches, self.rule_set))
+
+        self.assertEqual(
+            [(a.dedup, a.matches) for a in alerts],
+            [("a", 2), ("b", 1), ("a", 1), ("a", 1)],
+        )
+        self.assertEqual(alerts[0].last_seen - alerts[0].first_seen, 14 * 60)
+        self.assertIs(alerts[0].first_match, matches[0])
+
+    def test_default_grouping(self) -> None:
+        grouper = okta.replay.AlertGrouper(self.rule_set)
+        alerts = []
+        # without group_by, Panther dedups by title, which Match.dedup already holds
+        for minute, title in ((0, "a"), (1, "b"), (30, "a"), (59, "a"), (60, "a")):
+            alerts += grouper.add(match(self.api, title, minute, title))
+        alerts += grouper.flush()
+
+        self.assertEqual(
+            [(a.dedup, a.matches) for a in alerts], [("a", 3), ("b", 1), ("a", 1)]
+        )
+        self.assertEqual(grouper.alert_counts, {self.api: 3})
+        self.assertEqual(grouper.match_counts, {self.api: 5})
+
+    def test_eviction(self) -> None:
+        grouper = okta.replay.AlertGrouper(self.rule_set)
+        for actor in range(100):
+            self.assertEqual(grouper.add(match(self.geo, str(actor), 0)), [])
+        self.assertEqual(grouper.open_alerts, 100)
+
+        closed = grouper.add(match(self.geo, "late", 17))
+
+        self.assertEqual(len(closed), 100)
+        self.assertEqual(grouper.open_alerts, 1)
+        self.assertEqual(len(grouper._buckets), 1)
+
+    def test_missing_event_time(self) -> None:
+        grouper = okta.replay.AlertGrouper(self.rule_set)
+        grouper.add(match(self.geo, "a", 20))
+        untimed = okta.replay.Match(
+            self.geo,
+            "t",
+            "HIGH",
+            "a",
+            {},
+            okta.replay.to_event({"p_event_time": "redacted"}),
+        )
+        grouper.add(untimed)
+
+        alerts = grouper.flush()
+        self.assertEqual([a.matches for a in alerts], [2])
@@ -0,0 +1,57 @@
+import json
+import unittest
+
+import panther_okta as okta
+
+
+class TestStringInterner(unittest.TestCase):
+    def test_interns_configured_paths(self) -> None:
+        interner = okta.replay.StringInterner(
+            [
+                "eventType",
+                "outcome.result",
+                "request.ipChain.version",
+                "p_any_domain_names",
+            ]
+        )
+        first = interner(json.loads(okta.sample_logs.failed_login))
+        second = interner(json.loads(okta.sample_logs.failed_login))
+
+        self.assertIs(first["eventType"], second["eventType"])
+        self.assertIs(first["outcome"]["result"], second["outcome"]["result"])
+        self.assertIs(
+            first["request"]["ipChain"][0]["version"],
+            second["request"]["ipChain"][0]["version"],
+        )
+        self.assertIs(first["p_any_domain_names"][0], second["p_any_domain_names"][0])
+        self.assertIsNot(first["displayMessage"], second["displayMessage"])
+        self.assertEqual(first, json.loads(okta.sample_logs.failed_login))
+
+        self.assertEqual(interner.hits, interner.misses)
+        self.assertEqual(interner.hit_rate, 0.5)
+
+    def test_bounded_table(self) -> None:
+        interner = okta.replay.StringInterner(["eventType"], max_size=2)
+        for event_type in ["a", "b", "c", "c", "a"]:
+            interner({"eventType": event_type})
+
+        self.assertEqual(set(interner.table), {"a", "b"})
+        self.assertEqual(
+            (interner.hits, interner.misses, interner.overflows), (1, 4, 2)
+        )
+
+        with self.assertRaises(ValueError):
+            okta.replay.StringInterner(max_size=0)
+
+    def test_replay_lines(self) -> None:
+        lines = [okta.sample_logs.system_api_token_create.encode()] * 3
+        rule_set = [okta.rules.api_key_created()]
+        interner = okta.replay.StringInterner()
+
+        matches = list(okta.replay.replay_lines(lines, rule_set, interner=interner))
+
+        self.assertEqual(len(matches), 3)
+        self.assertIs(
+            matches[0].event.get("eventType"), matches[2].event.get("eventType")
+        )
+        self.assertGreater(interner.hit_rate, 0.5)
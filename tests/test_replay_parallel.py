@@ -0,0 +1,116 @@
+import typing
+import unittest
+
+import panther_okta as okta
+
+from panther_sdk import detection
+
+
+def geo_rules() -> typing.List[detection.Rule]:
+    return [okta.rules.geo_improbable_access(), okta.rules.admin_disabled_mfa()]
+
+
+def login(
+    actor: str, time: str, city: str, lat: float, lon: float
+) -> typing.Dict[str, typing.Any]:
+    return {
+        "eventType": "user.session.start",
+        "outcome": {"result": "FAILURE", "reason": "INVALID_CREDENTIALS"},
+        "actor": {"alternateId": actor, "type": "User"},
+        "client": {
+            "geographicalContext": {
+                "city": city,
+                "geolocation": {"lat": lat, "lon": lon},
+            }
+        },
+        "p_event_time": f"2022-10-01 {time}.000000",
+        "p_row_id": f"{actor}-{time}",
+    }
+
+
+class TestParallelReplay(unittest.TestCase):
+    def setUp(self) -> None:
+        self.events = []
+        for i in range(6):
+            actor = f"user{i}@example.com"
+            # listed newest first, so the shards have to restore per-actor order
+            self.events += [
+                login(actor, f"1{i}:30:00", "Sydney", -33.87, 151.21),
+                login(actor, f"1{i}:00:00", "San Francisco", 37.77, -122.42),
+            ]
+
+    def test_actor_shard(self) -> None:
+        for shards in (1, 2, 7):
+            for event in self.events:
+                shard = okta.replay.actor_shard(event, shards)
+                self.assertIn(shard, range(shards))
+                same_actor = dict(event, p_event_time="2023-01-01 00:00:00.000000")
+                self.assertEqual(okta.replay.actor_shard(same_actor, shards), shard)
+
+        self.assertEqual(okta.replay.actor_shard({}, 3), okta.replay.actor_shard({}, 3))
+
+    def test_per_actor_order(self) -> None:
+        matches = okta.replay.parallel_replay(self.events, geo_rules, workers=1)
+
+        self.assertEqual(len(matches), 6)
+        for match in matches:
+            self.assertEqual(match.rule_id, "Okta.GeographicallyImprobableAccess")
+            self.assertEqual(
+                match.event.get("client")["geographicalContext"]["city"], "Sydney"
+            )
+            self.assertIn("from [San Francisco]  to [Sydney]", match.title)
+            self.assertEqual(match.dedup, match.event.deep_get("actor", "alternateId"))
+
+        times = [match.event.get("p_event_time") for match in matches]
+        self.assertEqual(times, sorted(times))
+
+    def test_worker_count_does_not_change_output(self) -> None:
+        def summary(matches: typing.List[okta.replay.Match]) -> typing.List[typing.Any]:
+            return [
+                (m.rule_id, m.title, m.dedup, m.event.get("p_row_id")) for m in matches
+            ]
+
+        expected = summary(
+            okta.replay.parallel_replay(self.events, geo_rules, workers=1)
+        )
+        for workers in (2, 3):
+            matches = okta.replay.parallel_replay(
+                self.events, geo_rules, workers=workers
+            )
+            self.assertEqual(summary(matches), expected)
+
+    def test_rules_keyed_by_source_ip(self) -> None:
+        # one IP spraying many users: password_spray keeps its state per IP, not per actor
+        events = []
+        for i in range(30):
+            event = login(f"user{i}@example.com", f"10:{i:02}:00", "Paris", 48.85, 2.35)
+            event["client"]["ipAddress"] = "203.0.113.9"
+            events.append(event)
+
+        expected = okta.replay.parallel_replay(
+            events, okta.replay.default_rules, workers=1
+        )
+        self.assertIn("Okta.PasswordSpray", {match.rule_id for match in expected})
+        for workers in (2, 4):
+            matches = okta.replay.parallel_replay(
+                events, okta.replay.default_rules, workers=workers
+            )
+            self.assertEqual(
+                [(m.rule_id, m.event.get("p_row_id")) for m in matches],
+                [(m.rule_id, m.event.get("p_row_id")) for m in expected],
+            )
+
+    def test_errors(self) -> None:
+        broken = login("user0@example.com", "12:00:00", "Sydney", -33.87, 151.21)
+        broken["p_event_time"] = "redacted"
+        events = [self.events[1], broken]
+
+        errors: typing.List[okta.replay.RuleError] = []
+        matches = okta.replay.parallel_replay(
+            events, geo_rules, workers=1, errors=errors
+        )
+
+        self.assertEqual(matches, [])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].rule_id, "Okta.GeographicallyImprobableAccess")
+        self.assertIsInstance(errors[0].error, ValueError)
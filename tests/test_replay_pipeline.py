@@ -0,0 +1,255 @@
+import json
+import time
+import typing
+import threading
+import unittest
+
+import panther_okta as okta
+
+
+def login(actor: str, time: str, city: str, lat: float, lon: float) -> bytes:
+    event = {
+        "eventType": "user.session.start",
+        "outcome": {"result": "FAILURE"},
+        "actor": {"alternateId": actor},
+        "client": {
+            "geographicalContext": {
+                "city": city,
+                "geolocation": {"lat": lat, "lon": lon},
+            }
+        },
+        "p_event_time": f"2022-10-01 {time}.000000",
+    }
+    return json.dumps(event).encode()
+
+
+def _double(item: int) -> typing.List[int]:
+    return [item, item]
+
+
+def _jitter(item: int) -> typing.List[int]:
+    # later items often finish first
+    time.sleep(0.001 * (item % 3))
+    return [item]
+
+
+class TestPipeline(unittest.TestCase):
+    def test_stages(self) -> None:
+        seen: typing.List[typing.Tuple[int, int]] = []
+        lock = threading.Lock()
+
+        def _collect(item: typing.Tuple[int, int]) -> typing.List[typing.Any]:
+            with lock:
+                seen.append(item)
+            return []
+
+        pipeline = okta.replay.Pipeline(
+            [
+                okta.replay.Stage("double", _double, workers=2, processes=True),
+                okta.replay.Stage(
+                    "tag", lambda i: [(i % 3, i)], workers=3, key=lambda i: i % 3
+                ),
+                okta.replay.Stage("collect", _collect),
+            ],
+            queue_size=4,
+        )
+        metrics = pipeline.run(range(30))
+
+        self.assertEqual(sorted(i for _, i in seen), sorted(list(range(30)) * 2))
+        self.assertEqual(
+            [(m.name, m.processed) for m in metrics],
+            [("read", 30), ("double", 30), ("tag", 60), ("collect", 60)],
+        )
+        for m in metrics:
+            self.assertEqual(m.depth, 0)
+            # a keyed stage has one bounded queue per worker
+            self.assertLessEqual(m.max_depth, 4 * (m.workers if m.name == "tag" else 1))
+
+    def test_keyed_stage_keeps_order(self) -> None:
+        seen: typing.Dict[int, typing.List[int]] = {}
+
+        def _collect(item: int) -> typing.List[typing.Any]:
+            seen.setdefault(item % 4, []).append(item)
+            return []
+
+        okta.replay.Pipeline(
+            [okta.replay.Stage("collect", _collect, workers=4, key=lambda i: i % 4)],
+        ).run(range(100))
+
+        for key, items in seen.items():
+            self.assertEqual(items, list(range(key, 100, 4)))
+
+    def test_ordered_stage(self) -> None:
+        seen: typing.List[int] = []
+
+        def _collect(item: int) -> typing.List[typing.Any]:
+            seen.append(item)
+            return []
+
+        for processes in (False, True):
+            seen.clear()
+            okta.replay.Pipeline(
+                [
+                    okta.replay.Stage(
+                        "jitter",
+                        _jitter,
+                        workers=4,
+                        processes=processes,
+                        ordered=True,
+                        batch_size=8,
+                    ),
+                    okta.replay.Stage("collect", _collect),
+                ],
+                queue_size=4,
+            ).run(range(200))
+
+            self.assertEqual(seen, list(range(200)))
+
+    def test_backpressure(self) -> None:
+        def _slow(item: int) -> typing.List[typing.Any]:
+            time.sleep(0.005)
+            return []
+
+        pipeline = okta.replay.Pipeline(
+            [
+                okta.replay.Stage("pass", lambda i: [i]),
+                okta.replay.Stage("slow", _slow),
+            ],
+            queue_size=2,
+        )
+        read, passed, slow = pipeline.run(range(40))
+
+        self.assertGreater(read.blocked_seconds, 0.05)
+        self.assertGreater(passed.blocked_seconds, 0.05)
+        self.assertLessEqual(slow.max_depth, 2)
+
+    def test_errors(self) -> None:
+        def _fail(item: int) -> typing.List[int]:
+            if item == 50:
+                raise ValueError("bad item")
+            return [item]
+
+        pipeline = okta.replay.Pipeline(
+            [
+                okta.replay.Stage("fail", _fail, workers=2),
+                okta.replay.Stage("sink", lambda i: []),
+            ],
+            queue_size=2,
+        )
+
+        with self.assertRaisesRegex(ValueError, "bad item"):
+            pipeline.run(range(1000))
+
+
+class TestRulePipeline(unittest.TestCase):
+    def test_run_rules(self) -> None:
+        lines = [
+            getattr(okta.sample_logs, name).encode()
+            for name in (
+                "admin_access_assigned",
+                "system_api_token_create",
+                "system_api_token_revoke",
+                "system_mfa_factor_deactivate",
+                "user_session_impersonation_grant",
+                "support_password_reset",
+                "user_session_start",
+            )
+        ]
+        rule_set = okta.replay.default_rules()[:7]
+
+        def summary(
+            matches: typing.Iterable[okta.replay.Match],
+        ) -> typing.List[typing.Any]:
+            return sorted((m.rule_id, m.title, m.dedup) for m in matches)
+
+        expected = summary(okta.replay.replay_lines(lines, rule_set))
+        for processes in (False, True):
+            matches: typing.List[okta.replay.Match] = []
+            metrics = okta.replay.run_rules(
+                lines,
+                rule_set,
+                matches.append,
+                decode_processes=processes,
+                interner=okta.replay.StringInterner(),
+            )
+            self.assertEqual(summary(matches), expected)
+            self.assertEqual(metrics[-1].processed, len(expected))
+
+    def test_rules_keyed_by_source_ip(self) -> None:
+        # one IP spraying many users, decoded and filtered on several threads
+        lines = []
+        for i in range(30):
+            event = json.loads(
+                login(f"user{i}@example.com", f"10:{i:02}:00", "Paris", 0, 0)
+            )
+            event["client"]["ipAddress"] = "203.0.113.9"
+            lines.append(json.dumps(event).encode())
+        rule_set = okta.replay.default_rules()
+
+        with okta.replay.installed(okta.replay.MemoryKV()):
+            expected = sorted(
+                (m.rule_id, m.title) for m in okta.replay.replay_lines(lines, rule_set)
+            )
+        matches: typing.List[okta.replay.Match] = []
+        okta.replay.run_rules(
+            lines, rule_set, matches.append, decode_workers=4, filter_workers=4
+        )
+
+        self.assertIn("Okta.PasswordSpray", {rule_id for rule_id, _ in expected})
+        self.assertEqual(sorted((m.rule_id, m.title) for m in matches), expected)
+
+    def test_stateful_rules_render_in_order(self) -> None:
+        lines = []
+        for i in range(4):
+            actor = f"user{i}@example.com"
+            lines += [
+                login(actor, "10:00:00", "San Francisco", 37.77, -122.42),
+                login(actor, "10:30:00", "Sydney", -33.87, 151.21),
+                login(actor, "11:00:00", "London", 51.51, -0.13),
+            ]
+
+        matches: typing.List[okta.replay.Match] = []
+        okta.replay.run_rules(
+            lines,
+            [okta.rules.geo_improbable_access()],
+            matches.append,
+            filter_workers=2,
+            alert_workers=2,
+        )
+
+        titles = sorted(m.title for m in matches)
+        self.assertEqual(len(titles), 8)
+        for i in range(4):
+            self.assertIn(
+                f"Geographically improbable login for user [user{i}@example.com] "
+                "from [San Francisco]  to [Sydney]",
+                titles,
+            )
+            self.assertIn(
+                f"Geographically improbable login for user [user{i}@example.com] "
+                "from [Sydney]  to [London]",
+                titles,
+            )
+
+    def test_filter_workers_share_store(self) -> None:
+        lines = []
+        for i in range(200):
+            actor = f"user{i}@example.com"
+            lines += [
+                login(actor, "10:00:00", "San Francisco", 37.77, -122.42),
+                login(actor, "10:30:00", "Sydney", -33.87, 151.21),
+            ]
+        rule_set = [okta.rules.geo_improbable_access()]
+
+        single = okta.replay.MemoryKV()
+        okta.replay.run_rules(lines, rule_set, lambda m: None, store=single)
+        shared = okta.replay.MemoryKV()
+        matches: typing.List[okta.replay.Match] = []
+        okta.replay.run_rules(
+            lines, rule_set, matches.append, store=shared, filter_workers=4
+        )
+
+        self.assertEqual(len(matches), 200)
+        self.assertEqual(shared.to_dict(), single.to_dict())
+        self.assertEqual(shared.size_bytes, single.size_bytes)
+        self.assertEqual(shared.now(), single.now())
@@ -0,0 +1,246 @@
+import json
+import time
+import asyncio
+import threading
+import typing
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import panther_okta as okta
+
+
+def token_created(uuid: str) -> typing.Dict[str, typing.Any]:
+    event: typing.Dict[str, typing.Any] = json.loads(
+        okta.sample_logs.system_api_token_create
+    )
+    for field in ("p_event_time", "p_row_id", "p_log_type"):
+        event.pop(field, None)
+    event["uuid"] = uuid
+    event["published"] = "2022-10-01T10:00:00.123Z"
+    return event
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Serves /<org>/api/v1/logs from per-org lists of events, two per page"""
+
+    events: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]] = {}
+    throttle: typing.Set[str] = set()
+    # fail pages that start at or after this offset
+    fail_after: typing.Dict[str, int] = {}
+    requests: typing.List[str] = []
+    # X-Rate-Limit-Remaining of successful pages, and how long each takes
+    remaining = "100"
+    delay = 0.0
+    # requests in flight as each one arrived, counting itself
+    in_flight: typing.List[int] = []
+    _active = 0
+    _lock = threading.Lock()
+
+    def do_GET(self) -> None:
+        with self._lock:
+            _StandIn._active += 1
+            self.in_flight.append(_StandIn._active)
+        try:
+            time.sleep(self.delay)
+            self._respond()
+        finally:
+            with self._lock:
+                _StandIn._active -= 1
+
+    def _respond(self) -> None:
+        url = urllib.parse.urlparse(self.path)
+        org = url.path.split("/")[1]
+        self.requests.append(self.path)
+
+        if self.headers["Authorization"] != f"SSWS token-{org}":
+            self.send_response(401)
+            self.end_headers()
+            return
+
+        if org in self.throttle:
+            self.throttle.discard(org)
+            self.send_response(429)
+            self.send_header("X-Rate-Limit-Remaining", "0")
+            self.send_header("X-Rate-Limit-Reset", "0")
+            self.end_headers()
+            return
+
+        query = urllib.parse.parse_qs(url.query)
+        start = int(query.get("after", ["0"])[0])
+        if start >= self.fail_after.get(org, len(self.events[org]) + 1):
+            self.send_response(403)
+            self.end_headers()
+            return
+
+        limit = int(query["limit"][0])
+        page = self.events[org][start : start + limit]
+
+        next_url = f"http://{self.headers['Host']}/{org}/api/v1/logs?limit={limit}&after={start + len(page)}"
+        body = json.dumps(page).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Link", f'<{next_url}>; rel="next"')
+        self.send_header("X-Rate-Limit-Remaining", self.remaining)
+        self.send_header("X-Rate-Limit-Reset", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+class TestSystemLogPoller(unittest.TestCase):
+    def setUp(self) -> None:
+        _StandIn.events = {
+            "one": [token_created(f"one-{i}") for i in range(5)],
+            "two": [token_created("two-0")],
+        }
+        _StandIn.throttle = {"two"}
+        _StandIn.fail_after = {}
+        _StandIn.requests = []
+        _StandIn.remaining = "100"
+        _StandIn.delay = 0.0
+        _StandIn.in_flight = []
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = base = f"http://127.0.0.1:{self.server.server_port}"
+
+        self.orgs = [
+            okta.replay.Org(
+                name, f"{base}/{name}", f"token-{name}", since="2022-10-01", limit=2
+            )
+            for name in ("one", "two")
+        ]
+        self.poller = okta.replay.SystemLogPoller(
+            self.orgs,
+            [okta.rules.api_key_created(), okta.rules.api_key_revoked()],
+            max_concurrency=2,
+        )
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_poll(self) -> None:
+        matches = asyncio.run(self.poller.poll_once())
+
+        self.assertEqual(
+            sorted(m.event.get("p_row_id") for m in matches),
+            ["one-0", "one-1", "one-2", "one-3", "one-4", "two-0"],
+        )
+        self.assertEqual(matches[0].event.get("p_log_type"), "Okta.SystemLog")
+        self.assertEqual(
+            matches[0].event.get("p_event_time"), "2022-10-01 10:00:00.123000"
+        )
+
+        # three pages for "one", a 429 and a retry for "two"
+        self.assertEqual(len(_StandIn.requests), 5)
+        self.assertIn("since=2022-10-01", _StandIn.requests[0])
+        # the 429 halved the shared limit, and the pages after it grew it back
+        self.assertEqual(self.poller.concurrency, 2)
+
+        # the cursor picks up where the last page ended
+        self.assertEqual(asyncio.run(self.poller.poll_once()), [])
+        _StandIn.events["one"].append(token_created("one-5"))
+        matches = asyncio.run(self.poller.poll_once())
+        self.assertEqual([m.event.get("p_row_id") for m in matches], ["one-5"])
+
+    def test_errors(self) -> None:
+        self.orgs[1].token = "wrong"
+
+        matches = asyncio.run(self.poller.poll_once())
+
+        # the other org is unaffected
+        self.assertEqual(len(matches), 5)
+        self.assertEqual(list(self.poller.failures), ["two"])
+        self.assertRegex(str(self.poller.failures["two"]), "HTTP 401")
+
+        self.orgs[1].token = "token-two"
+        matches = asyncio.run(self.poller.poll_once())
+        self.assertEqual([m.event.get("p_row_id") for m in matches], ["two-0"])
+        self.assertEqual(self.poller.failures, {})
+
+    def test_failed_page_keeps_earlier_matches(self) -> None:
+        # the second page of "one" fails after the first was evaluated
+        _StandIn.fail_after = {"one": 2}
+
+        matches = asyncio.run(self.poller.poll_once())
+
+        self.assertEqual(
+            sorted(m.event.get("p_row_id") for m in matches),
+            ["one-0", "one-1", "two-0"],
+        )
+        self.assertIn("one", self.poller.failures)
+
+        # the next poll resumes after the last page evaluated
+        _StandIn.fail_after = {}
+        matches = asyncio.run(self.poller.poll_once())
+        self.assertEqual(
+            [m.event.get("p_row_id") for m in matches], ["one-2", "one-3", "one-4"]
+        )
+
+    def test_rate_limits_throttle_requests_in_flight(self) -> None:
+        names = ["a", "b", "c", "d"]
+        _StandIn.events = {
+            name: [token_created(f"{name}-{i}") for i in range(8)] for name in names
+        }
+        _StandIn.throttle = set()
+        # every page leaves the org at its reserve
+        _StandIn.remaining = "1"
+        _StandIn.delay = 0.05
+        poller = okta.replay.SystemLogPoller(
+            [
+                okta.replay.Org(name, f"{self.base}/{name}", f"token-{name}", limit=2)
+                for name in names
+            ],
+            [okta.rules.api_key_created()],
+            max_concurrency=4,
+            reserve=1,
+        )
+
+        matches = asyncio.run(poller.poll_once())
+
+        self.assertEqual(len(matches), 32)
+        # four pages and an empty one per org
+        self.assertEqual(len(_StandIn.in_flight), 20)
+        # the first page of every org was in flight at once, then the limit fell to one
+        self.assertEqual(max(_StandIn.in_flight[:4]), 4)
+        self.assertEqual(max(_StandIn.in_flight[4:]), 1)
+        self.assertEqual(poller.concurrency, 1)
+
+    def test_run(self) -> None:
+        async def first_batch() -> typing.List[okta.replay.Match]:
+            stop = asyncio.Event()
+            async for matches in self.poller.run(interval=0.01, stop=stop):
+                stop.set()
+                return matches
+            return []
+
+        self.assertEqual(len(asyncio.run(first_batch())), 6)
+
+
+class TestPollerHelpers(unittest.TestCase):
+    def test_next_link(self) -> None:
+        header = '<https://x/api/v1/logs?after=1>; rel="self", <https://x/api/v1/logs?after=2>; rel="next"'
+
+        self.assertEqual(okta.replay.next_link(header), "https://x/api/v1/logs?after=2")
+        self.assertIsNone(okta.replay.next_link('<https://x>; rel="self"'))
+        self.assertIsNone(okta.replay.next_link(None))
+
+    def test_adaptive_limit(self) -> None:
+        async def adjust() -> typing.List[int]:
+            limit = okta.replay.AdaptiveLimit(4)
+            seen = []
+            for change in (
+                limit.decrease,
+                limit.decrease,
+                limit.decrease,
+                limit.increase,
+            ):
+                await change()
+                seen.append(limit.limit)
+            return seen
+
+        self.assertEqual(asyncio.run(adjust()), [2, 1, 1, 2])
@@ -0,0 +1,47 @@
+import unittest
+
+from panther_sdk import detection
+from panther_utils import match_filters
+import panther_okta as okta
+
+
+class TestReplayPrefilter(unittest.TestCase):
+    def test_event_type_literals(self) -> None:
+        literals = okta.replay.event_type_literals(okta.replay.default_rules())
+
+        self.assertIsNotNone(literals)
+        self.assertIn("system.mfa.factor.deactivate", literals)  # type: ignore
+        self.assertIn("user.session.impersonation.grant", literals)  # type: ignore
+        self.assertTrue(set(okta.SUPPORT_RESET_EVENTS) <= literals)  # type: ignore
+
+    def test_event_type_literals_unbounded_rule(self) -> None:
+        rule = okta.rules.api_key_created(
+            overrides=detection.RuleOptions(
+                filters=match_filters.deep_equal("outcome.result", "SUCCESS")
+            )
+        )
+
+        self.assertIsNone(okta.replay.event_type_literals([rule]))
+
+    def test_prefilter(self) -> None:
+        prefilter = okta.replay.EventTypePrefilter(["user.session.start"])
+
+        self.assertTrue(prefilter(b'{"eventType": "user.session.start"}'))
+        self.assertFalse(prefilter(b'{"eventType":"user.session.start.other"}'))
+        self.assertFalse(prefilter(b'{"eventType":"user.session.end"}'))
+        self.assertEqual((prefilter.seen, prefilter.passed), (3, 1))
+
+    def test_replay_lines(self) -> None:
+        lines = [
+            okta.sample_logs.system_api_token_create.encode(),
+            okta.sample_logs.user_session_start.encode(),
+            b"",
+            okta.sample_logs.system_api_token_revoke.encode(),
+        ]
+        rules = [okta.rules.api_key_created(), okta.rules.api_key_revoked()]
+
+        matches = list(okta.replay.replay_lines(lines, rules))
+
+        self.assertEqual(
+            [m.rule_id for m in matches], ["Okta.APIKeyCreated", "Okta.APIKeyRevoked"]
+        )
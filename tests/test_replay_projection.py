@@ -0,0 +1,105 @@
+import json
+import typing
+import unittest
+
+from panther_sdk import PantherEvent, detection
+from panther_utils import match_filters
+import panther_okta as okta
+
+
+def _title(event: PantherEvent) -> str:
+    target = event.get("target", [{}])
+    return (
+        f"{event.udm('actor_user')} {event.get('outcome', {}).get('reason')} "
+        f"{event['client']['ipAddress']} {target[0].get('id')} "
+        f"{event.deep_get('debugContext', 'debugData', 'requestUri')}"
+    )
+
+
+def _context(event: PantherEvent) -> typing.Dict[str, typing.Any]:
+    return {"event": dict(event)}
+
+
+class TestReplayProjection(unittest.TestCase):
+    def test_callable_paths(self) -> None:
+        self.assertEqual(
+            okta.replay.callable_paths(_title),
+            {
+                ("actor", "alternateId"),
+                ("outcome", "reason"),
+                ("client", "ipAddress"),
+                ("target",),
+                ("debugContext", "debugData", "requestUri"),
+            },
+        )
+        self.assertEqual(
+            okta.replay.callable_paths(
+                match_filters.deep_in("outcome.result", ["X"]).func
+            ),
+            {("outcome", "result")},
+        )
+
+    def test_callable_paths_unresolved(self) -> None:
+        self.assertIsNone(okta.replay.callable_paths(_context))
+        self.assertIsNone(okta.replay.callable_paths(lambda event: event.get("x")))
+
+    def test_rule_paths(self) -> None:
+        paths = okta.replay.rule_paths(okta.replay.default_rules())
+
+        self.assertIsNotNone(paths)
+        self.assertTrue(okta.replay.REPLAY_PATHS <= paths)  # type: ignore
+        self.assertIn(("outcome", "result"), paths)  # type: ignore
+        self.assertIn(("debugContext", "debugData", "privilegeGranted"), paths)  # type: ignore
+        self.assertNotIn(("request",), paths)  # type: ignore
+
+        rule = okta.rules.api_key_created(
+            overrides=detection.RuleOptions(alert_context=_context)
+        )
+        self.assertIsNone(okta.replay.rule_paths([rule]))
+
+    def test_decoder(self) -> None:
+        decoder = okta.replay.ProjectedDecoder(
+            [
+                ("eventtype",),
+                ("client", "geographicalContext"),
+                ("client",),
+                ("outcome", "result"),
+            ]
+        )
+        event = decoder(memoryview(okta.sample_logs.failed_login.encode()))
+        full = json.loads(okta.sample_logs.failed_login)
+
+        self.assertEqual(
+            event,
+            {
+                "client": full["client"],
+                "eventType": "user.session.start",
+                "outcome": {"result": "FAILURE"},
+            },
+        )
+
+    def test_replay_lines(self) -> None:
+        lines = [
+            getattr(okta.sample_logs, name).encode()
+            for name in (
+                "admin_access_assigned",
+                "system_api_token_create",
+                "system_api_token_revoke",
+                "system_mfa_factor_deactivate",
+                "user_session_impersonation_grant",
+                "support_password_reset",
+                "failed_login",
+            )
+        ]
+        rule_set = okta.replay.default_rules()[:7]
+
+        def summary(project: bool) -> typing.List[typing.Any]:
+            matches = okta.replay.replay_lines(lines, rule_set, project=project)
+            return [
+                (m.rule_id, m.title, m.severity, m.dedup, m.alert_context)
+                for m in matches
+            ]
+
+        expected = summary(project=False)
+        self.assertEqual(len(expected), 7)
+        self.assertEqual(summary(project=True), expected)
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import panther_okta as okta
+
+
+class TestMappedJSONL(unittest.TestCase):
+    def setUp(self) -> None:
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl")
+        self.lines = [
+            okta.sample_logs.system_api_token_create.encode(),
+            okta.sample_logs.user_session_start.encode(),
+            b"",
+            okta.sample_logs.system_api_token_revoke.encode(),
+        ]
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\n".join(self.lines) + b"\r\n")
+
+    def tearDown(self) -> None:
+        os.remove(self.path)
+
+    def test_lines(self) -> None:
+        with okta.replay.MappedJSONL(self.path) as source:
+            lines = [(offset, line.tobytes()) for offset, line in source.lines()]
+
+        expected = []
+        offset = 0
+        for line in self.lines:
+            if line:
+                expected.append((offset, line))
+            offset += len(line) + 1
+
+        self.assertEqual(lines, expected)
+
+    def test_chunks(self) -> None:
+        with okta.replay.MappedJSONL(self.path) as source:
+            for count in range(1, 6):
+                chunks = source.chunks(count)
+                self.assertLessEqual(len(chunks), count)
+                self.assertEqual(chunks[0][0], 0)
+                self.assertEqual(chunks[-1][1], source.size)
+
+                offsets = []
+                for start, end in chunks:
+                    offsets += [offset for offset, _ in source.lines(start, end)]
+                self.assertEqual(offsets, [offset for offset, _ in source.lines()])
+
+    def test_empty_file(self) -> None:
+        with open(self.path, "wb"):
+            pass
+
+        with okta.replay.MappedJSONL(self.path) as source:
+            self.assertEqual(list(source.lines()), [])
+            self.assertEqual(source.chunks(4), [])
+
+    def test_replay_file(self) -> None:
+        rules = [okta.rules.api_key_created(), okta.rules.api_key_revoked()]
+
+        matches = list(okta.replay.replay_file(self.path, rules))
+
+        self.assertEqual(
+            [(offset, m.rule_id) for offset, m in matches],
+            [
+                (0, "Okta.APIKeyCreated"),
+                (
+                    len(self.lines[0]) + len(self.lines[1]) + 3,
+                    "Okta.APIKeyRevoked",
+                ),
+            ],
+        )
@@ -0,0 +1,85 @@
+import json
+import typing
+import unittest
+
+import panther_okta as okta
+
+
+def at(time: str, **fields: typing.Any) -> typing.Any:
+    return okta.replay.to_event({"p_event_time": f"2022-10-01 {time}.000000", **fields})
+
+
+def login(time: str, city: str, lat: float, lon: float) -> bytes:
+    event = {
+        "eventType": "user.session.start",
+        "outcome": {"result": "FAILURE"},
+        "actor": {"alternateId": "user@example.com"},
+        "client": {
+            "geographicalContext": {
+                "city": city,
+                "geolocation": {"lat": lat, "lon": lon},
+            }
+        },
+        "p_event_time": f"2022-10-01 {time}.000000",
+    }
+    return json.dumps(event).encode()
+
+
+def times(events: typing.List[typing.Any]) -> typing.List[str]:
+    return [event.get("p_event_time")[11:19] for event in events]
+
+
+class TestReorderBuffer(unittest.TestCase):
+    def test_watermark(self) -> None:
+        buffer = okta.replay.ReorderBuffer(window_seconds=60)
+
+        self.assertEqual(buffer.push(at("10:00:30")), [])
+        self.assertEqual(buffer.push(at("10:00:00")), [])
+        # 10:01:10 moves the watermark to 10:00:10
+        self.assertEqual(times(buffer.push(at("10:01:10"))), ["10:00:00"])
+        self.assertEqual(len(buffer), 2)
+
+        # behind what was already released, so it can't be placed any more
+        self.assertEqual(times(buffer.push(at("09:59:00"))), ["09:59:00"])
+        self.assertEqual(buffer.late, 1)
+
+        self.assertEqual(times(buffer.flush()), ["10:00:30", "10:01:10"])
+        self.assertEqual(len(buffer), 0)
+
+    def test_memory_cap(self) -> None:
+        buffer = okta.replay.ReorderBuffer(window_seconds=3600, max_events=2)
+        released = []
+        for time in ("10:00:03", "10:00:01", "10:00:02", "10:00:00"):
+            released += buffer.push(at(time))
+
+        # 10:00:00 arrived after 10:00:01 had been forced out
+        self.assertEqual(times(released), ["10:00:01", "10:00:00"])
+        self.assertEqual((buffer.forced, buffer.late), (1, 1))
+        self.assertEqual(times(buffer.flush()), ["10:00:02", "10:00:03"])
+
+    def test_missing_event_time(self) -> None:
+        buffer = okta.replay.ReorderBuffer()
+        event = okta.replay.to_event({"p_event_time": "redacted"})
+
+        self.assertEqual(buffer.push(event), [event])
+
+    def test_replay_lines(self) -> None:
+        # collectors delivered the later login first
+        lines = [
+            login("10:30:00", "Sydney", -33.87, 151.21),
+            login("10:00:00", "San Francisco", 37.77, -122.42),
+        ]
+        rule_set = [okta.rules.geo_improbable_access()]
+
+        with okta.replay.installed(okta.replay.MemoryKV()):
+            unordered = list(okta.replay.replay_lines(lines, rule_set))
+        with okta.replay.installed(okta.replay.MemoryKV()):
+            ordered = list(
+                okta.replay.replay_lines(
+                    lines, rule_set, reorder=okta.replay.ReorderBuffer()
+                )
+            )
+
+        self.assertEqual(unordered, [])
+        self.assertEqual(len(ordered), 1)
+        self.assertIn("from [San Francisco]  to [Sydney]", ordered[0].title)
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import tempfile
+import typing
+import unittest
+
+import panther_okta as okta
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        lines = [okta.sample_logs.admin_access_assigned.encode()] * 5
+        self.matches = list(
+            okta.replay.replay_lines(lines, [okta.rules.admin_role_assigned()])
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+
+    def test_alert_record(self) -> None:
+        record = okta.replay.alert_record(self.matches[0])
+
+        self.assertEqual(record["rule_id"], "Okta.AdminRoleAssigned")
+        self.assertEqual(record["dedup"], self.matches[0].dedup)
+        self.assertIn("actor", record["alert_context"])
+
+    def test_jsonl(self) -> None:
+        path = os.path.join(self.dir, "alerts.jsonl")
+
+        with okta.replay.JSONLSink(path, max_batch=2, max_latency=60) as sink:
+            for match in self.matches:
+                sink(match)
+            self.assertEqual((sink.batches, sink.written), (2, 4))
+
+        self.assertEqual((sink.batches, sink.written), (3, 5))
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0]["title"], self.matches[0].title)
+        self.assertEqual(
+            records[0]["alert_context"]["actor"]["alternateId"],
+            self.matches[0].event.deep_get("actor", "alternateId"),
+        )
+
+    def test_latency_flush(self) -> None:
+        path = os.path.join(self.dir, "alerts.jsonl")
+
+        with okta.replay.JSONLSink(path, max_batch=100, max_latency=0.05) as sink:
+            sink(self.matches[0])
+            deadline = time.monotonic() + 5
+            while sink.written == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(sink.batches, 1)
+
+    def test_sqlite(self) -> None:
+        path = os.path.join(self.dir, "alerts.db")
+
+        with okta.replay.SQLiteSink(path, max_batch=3, max_latency=60) as sink:
+            for match in self.matches:
+                sink(match)
+
+        self.assertEqual(sink.batches, 2)
+        with sqlite3.connect(path) as db:
+            rows = db.execute(
+                "SELECT rule_id, dedup, alert_context FROM alerts"
+            ).fetchall()
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0][:2], ("Okta.AdminRoleAssigned", self.matches[0].dedup))
+        self.assertIn("actor", json.loads(rows[0][2]))
+
+        with self.assertRaises(ValueError):
+            okta.replay.SQLiteSink(path, table="alerts; DROP TABLE alerts")
+
+    def test_failed_batches_are_kept(self) -> None:
+        written: typing.List[typing.Any] = []
+        failures = [OSError("disk full")]
+
+        class Flaky(okta.replay.BatchedSink):
+            def _write(
+                self, records: typing.List[typing.Dict[str, typing.Any]]
+            ) -> None:
+                if failures:
+                    raise failures.pop()
+                written.extend(records)
+
+        sink = Flaky(max_batch=2, max_latency=60)
+        sink(self.matches[0])
+        with self.assertRaises(OSError):
+            sink(self.matches[1])
+        sink.close()
+
+        self.assertEqual(len(written), 2)
+        with self.assertRaises(RuntimeError):
+            sink(self.matches[2])
+
+    def test_match_after_failed_background_flush_is_kept(self) -> None:
+        written: typing.List[typing.Any] = []
+        failures = [OSError("disk full")]
+
+        class Flaky(okta.replay.BatchedSink):
+            def _write(
+                self, records: typing.List[typing.Dict[str, typing.Any]]
+            ) -> None:
+                if failures:
+                    raise failures.pop()
+                written.extend(records)
+
+        sink = Flaky(max_batch=100, max_latency=0.05)
+        sink(self.matches[0])
+        deadline = time.monotonic() + 5
+        while failures and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # the background flush failed; the match that surfaces the error is still buffered
+        with self.assertRaises(OSError):
+            sink(self.matches[1])
+        sink.close()
+
+        self.assertEqual(len(written), 2)
+
+    def test_jsonl_partial_write_is_retried_cleanly(self) -> None:
+        path = os.path.join(self.dir, "alerts.jsonl")
+        sink = okta.replay.JSONLSink(path, max_batch=2, max_latency=60)
+        real = sink._file
+        failures = [OSError("disk full")]
+
+        class Torn:
+            def fileno(self) -> int:
+                return real.fileno()
+
+            def write(self, data: memoryview) -> int:
+                if failures:
+                    # half of the batch reaches the file before the write fails
+                    real.write(data[: len(data) // 2])
+                    raise failures.pop()
+                return typing.cast(int, real.write(data))
+
+            def close(self) -> None:
+                real.close()
+
+        sink._file = Torn()  # type: ignore
+        sink(self.matches[0])
+        with self.assertRaises(OSError):
+            sink(self.matches[1])
+        self.assertEqual(os.path.getsize(path), 0)
+        sink.close()
+
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+
+    def test_write_is_abstract(self) -> None:
+        with self.assertRaises(TypeError):
+            okta.replay.BatchedSink()  # type: ignore
+
+    def test_run_rules_sink(self) -> None:
+        path = os.path.join(self.dir, "alerts.jsonl")
+        lines = [okta.sample_logs.system_api_token_create.encode()] * 10
+
+        with okta.replay.JSONLSink(path, max_batch=4) as sink:
+            okta.replay.run_rules(lines, [okta.rules.api_key_created()], sink)
+
+        self.assertEqual((sink.batches, sink.written), (3, 10))
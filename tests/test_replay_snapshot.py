@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import panther_okta as okta
+
+
+class TestStateSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "state.kv")
+        self.clock = [1000.0]
+        self.store = okta.replay.MemoryKV(now=lambda: self.clock[0])
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+
+    def restored(self) -> okta.replay.MemoryKV:
+        store = okta.replay.MemoryKV(now=self.store.now)
+        okta.replay.StateSnapshot(self.path).restore(store)
+        return store
+
+    def test_incremental_saves(self) -> None:
+        snapshot = okta.replay.StateSnapshot(self.path)
+        snapshot.restore(self.store)
+
+        self.store.put_string_set("geo:a", ['{"city": "Paris"}'], epoch_seconds=2000)
+        self.store.increment_counter("count", 2)
+        self.assertEqual(snapshot.save(self.store), 2)
+        size = os.path.getsize(self.path)
+
+        self.store.put_string_set("geo:a", ['{"city": "Tokyo"}'], epoch_seconds=3000)
+        self.store.reset_counter("count")
+        self.assertEqual(snapshot.save(self.store), 2)
+        self.assertEqual(snapshot.save(self.store), 0)
+        self.assertGreater(os.path.getsize(self.path), size)
+
+        restored = self.restored()
+        self.assertEqual(restored.get_string_set("geo:a"), {'{"city": "Tokyo"}'})
+        self.assertEqual(restored.expirations, {"geo:a": 3000.0})
+        self.assertEqual(len(restored), 1)
+
+    def test_torn_save(self) -> None:
+        snapshot = okta.replay.StateSnapshot(self.path)
+        snapshot.restore(self.store)
+        self.store.put_string_set("a", ["1"])
+        snapshot.save(self.store)
+        committed = os.path.getsize(self.path)
+
+        self.store.put_string_set("a", ["2"])
+        self.store.put_string_set("b", ["2"])
+        snapshot.save(self.store)
+        # lose the end of the second save, as a crash mid-write would
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+
+        restored = okta.replay.MemoryKV()
+        resumed = okta.replay.StateSnapshot(self.path)
+        resumed.restore(restored)
+        self.assertEqual(restored.to_dict()["string_sets"], {"a": ["1"]})
+
+        restored.put_string_set("c", ["3"])
+        resumed.save(restored)
+        self.assertEqual(
+            self.restored().to_dict()["string_sets"], {"a": ["1"], "c": ["3"]}
+        )
+        self.assertGreater(os.path.getsize(self.path), committed)
+
+    def test_failed_save_is_retried(self) -> None:
+        snapshot = okta.replay.StateSnapshot(self.path)
+        snapshot.restore(self.store)
+        self.store.put_string_set("a", ["1"])
+        snapshot.save(self.store)
+
+        self.store.put_string_set("b", ["2"])
+        with mock.patch("os.fsync", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                snapshot.save(self.store)
+        self.assertEqual(self.store.changes(), {"b"})
+
+        self.assertEqual(snapshot.save(self.store), 1)
+        self.assertEqual(
+            self.restored().to_dict()["string_sets"], {"a": ["1"], "b": ["2"]}
+        )
+
+    def test_meta(self) -> None:
+        snapshot = okta.replay.StateSnapshot(self.path, compact_ratio=2)
+        snapshot.restore(self.store)
+        self.store.put_string_set("a", ["1"])
+        snapshot.save(self.store, b"offset 1")
+        # unchanged meta and state append nothing
+        self.assertEqual(snapshot.save(self.store, b"offset 1"), 0)
+        size = os.path.getsize(self.path)
+        snapshot.save(self.store, b"offset 2")
+        self.assertGreater(os.path.getsize(self.path), size)
+        snapshot.compact(self.store)
+
+        resumed = okta.replay.StateSnapshot(self.path)
+        resumed.restore(okta.replay.MemoryKV())
+        self.assertEqual(resumed.meta, b"offset 2")
+
+    def test_compaction(self) -> None:
+        snapshot = okta.replay.StateSnapshot(self.path, compact_ratio=2)
+        snapshot.restore(self.store)
+        for i in range(3000):
+            self.store.put_string_set("hot", [str(i)])
+            snapshot.save(self.store)
+
+        self.assertLessEqual(snapshot.records, 2048)
+        self.assertEqual(self.restored().get_string_set("hot"), {"2999"})
+
+    def test_restore_decodes_latest_records(self) -> None:
+        snapshot = okta.replay.StateSnapshot(self.path, compact_ratio=1000)
+        snapshot.restore(self.store)
+        for i in range(50):
+            self.store.put_string_set("hot", [str(i)])
+            self.store.increment_counter("count")
+            snapshot.save(self.store)
+        self.store.reset_counter("count")
+        snapshot.save(self.store)
+
+        resumed = okta.replay.StateSnapshot(self.path)
+        store = okta.replay.MemoryKV(now=self.store.now)
+        with mock.patch.object(
+            okta.replay.snapshot.json, "loads", wraps=okta.replay.snapshot.json.loads
+        ) as loads:
+            self.assertEqual(resumed.restore(store), 1)
+
+        self.assertEqual(loads.call_count, 1)
+        self.assertEqual(resumed.records, 101)
+        self.assertEqual(store.get_string_set("hot"), {"49"})
+        self.assertEqual(store.get_counter("count"), 0)
+
+    def test_restore_required(self) -> None:
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot")
+
+        with self.assertRaises(RuntimeError):
+            okta.replay.StateSnapshot(self.path).save(self.store)
+        with self.assertRaises(RuntimeError):
+            okta.replay.StateSnapshot(self.path).restore(self.store)
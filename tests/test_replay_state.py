@@ -0,0 +1,99 @@
+import sys
+import unittest
+
+import panther_okta as okta
+
+
+class TestMemoryKV(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = [1000.0]
+        self.store = okta.replay.MemoryKV(now=lambda: self.clock[0])
+
+    def test_string_sets(self) -> None:
+        self.store.put_string_set("k", ["a", "b"])
+        self.assertEqual(self.store.add_to_string_set("k", "c"), {"a", "b", "c"})
+        self.assertEqual(self.store.remove_from_string_set("k", ["a"]), {"b", "c"})
+
+        # callers get a copy, like a real round trip to the store
+        self.store.get_string_set("k").clear()
+        self.assertEqual(self.store.get_string_set("k"), {"b", "c"})
+
+        self.store.reset_string_set("k")
+        self.assertEqual(self.store.get_string_set("k"), set())
+
+    def test_counters(self) -> None:
+        self.assertEqual(self.store.increment_counter("c"), 1)
+        self.assertEqual(self.store.increment_counter("c", 4), 5)
+        self.store.reset_counter("c")
+        self.assertEqual(self.store.get_counter("c"), 0)
+
+    def test_expiration(self) -> None:
+        self.store.put_string_set("k", ["a"], epoch_seconds=1010)
+        self.store.increment_counter("c")
+        self.store.set_key_expiration("c", "1005.5")
+
+        self.clock[0] = 1005.0
+        self.assertEqual(self.store.get_string_set("k"), {"a"})
+        self.assertEqual(self.store.get_counter("c"), 1)
+
+        self.clock[0] = 1010.0
+        self.assertEqual(self.store.get_string_set("k"), set())
+        self.assertEqual(self.store.get_counter("c"), 0)
+        self.assertEqual(self.store.expirations, {})
+
+    def test_installed(self) -> None:
+        previous = sys.modules.get("panther_oss_helpers")
+
+        with okta.replay.installed(self.store):
+            from panther_oss_helpers import put_string_set  # type: ignore
+
+            put_string_set("k", ["a"])
+
+        self.assertEqual(self.store.get_string_set("k"), {"a"})
+        self.assertIs(sys.modules.get("panther_oss_helpers"), previous)
+
+    def test_to_dict(self) -> None:
+        self.store.put_string_set("k", ["b", "a"], epoch_seconds=2000)
+        self.store.increment_counter("c", 3)
+
+        restored = okta.replay.MemoryKV(now=self.store.now)
+        restored.load(self.store.to_dict())
+
+        self.assertEqual(self.store.to_dict()["string_sets"], {"k": ["a", "b"]})
+        self.assertEqual(restored.get_string_set("k"), {"a", "b"})
+        self.assertEqual(restored.get_counter("c"), 3)
+        self.assertEqual(restored.expirations, {"k": 2000.0})
+
+    def test_size_accounting(self) -> None:
+        self.store.put_string_set("key", ["ab", "cd"])
+        self.store.increment_counter("c")
+        self.assertEqual(self.store.size_bytes, 7 + 9)
+        self.assertEqual(len(self.store), 2)
+
+        self.store.remove_from_string_set("key", "ab")
+        self.store.reset_counter("c")
+        self.assertEqual(self.store.size_bytes, 5)
+
+        self.store.set_key_expiration("key", 1000)
+        self.assertEqual(self.store.get_string_set("key"), set())
+        self.assertEqual((self.store.size_bytes, len(self.store)), (0, 0))
+
+    def test_lru_eviction(self) -> None:
+        store = okta.replay.MemoryKV(max_keys=2, max_bytes=10)
+        store.put_string_set("a", ["1"])
+        store.put_string_set("b", ["2"])
+        store.get_string_set("a")
+        store.put_string_set("c", ["3"])
+
+        self.assertEqual(store.to_dict()["string_sets"], {"a": ["1"], "c": ["3"]})
+
+        store.put_string_set("d", ["12345678"])
+        self.assertEqual(store.to_dict()["string_sets"], {"d": ["12345678"]})
+        self.assertEqual((store.evictions, store.size_bytes), (3, 9))
+
+        restored = okta.replay.MemoryKV(max_keys=2)
+        restored.load(store.to_dict())
+        self.assertEqual(restored.size_bytes, 9)
+
+        with self.assertRaises(ValueError):
+            okta.replay.MemoryKV(max_keys=0)
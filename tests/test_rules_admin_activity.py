@@ -0,0 +1,97 @@
+import json
+import typing
+import datetime
+import unittest
+
+import panther_okta as okta
+
+from panther_sdk import testing, detection
+from panther_okta.rules.admin_activity import admin_activity_spike_filter
+
+START = datetime.datetime(2022, 10, 1)
+
+
+def privilege_grant(actor: str, seconds: float) -> typing.Any:
+    event = json.loads(okta.sample_logs.admin_access_assigned)
+    event["actor"]["alternateId"] = actor
+    event_time = START + datetime.timedelta(seconds=seconds)
+    event["p_event_time"] = event_time.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return okta.replay.to_event(event)
+
+
+class TestAdminActivityFilters(testing.PantherPythonFilterTestCase):
+    def test_admin_activity_spike_filter_valid(self) -> None:
+        self.assertFilterIsValid(admin_activity_spike_filter())
+
+
+class TestRulesAdminActivity(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rule_set = [okta.rules.admin_activity_spike()]
+        self.store = okta.replay.MemoryKV()
+
+    def replay(self, events: typing.List[typing.Any]) -> typing.List[okta.replay.Match]:
+        with okta.replay.installed(self.store):
+            return list(okta.replay.evaluate(self.rule_set, events))
+
+    def test_admin_activity_spike(self) -> None:
+        name_override = "Override Name"
+        rule = okta.rules.admin_activity_spike(
+            overrides=detection.RuleOptions(name=name_override)
+        )
+
+        self.assertIsInstance(rule, detection.Rule)
+        self.assertEqual(rule.name, name_override)
+
+    def test_spike_above_baseline(self) -> None:
+        # a service account granting 30 privileges an hour for three days, then ten times that for an hour
+        steady = [privilege_grant("svc@example.com", i * 120) for i in range(3 * 720)]
+        self.replay(steady[:-720])
+        self.assertEqual(self.replay(steady[-720:]), [])
+
+        spike_start = 3 * 86400
+        matches = self.replay(
+            [
+                privilege_grant("svc@example.com", spike_start + i * 12)
+                for i in range(300)
+            ]
+        )
+
+        self.assertTrue(matches)
+        self.assertIn("[svc@example.com]", matches[0].title)
+        context = matches[0].alert_context["privileged_activity"]
+        self.assertGreater(
+            context["recent_per_hour"], 10 * context["baseline_per_hour"]
+        )
+
+        self.assertIn("svc@example.com", context["top_actors"])
+
+        # other actors' activity doesn't change what the alert reports, and their own alerts
+        # never pick up the spike of another actor
+        admin = privilege_grant("admin@example.com", spike_start + 3600)
+        self.replay([admin])
+        with okta.replay.installed(self.store):
+            rendered = okta.replay.render_match(self.rule_set[0], matches[-1].event)
+            other = okta.replay.render_match(self.rule_set[0], admin)
+        self.assertEqual(rendered.title, matches[-1].title)
+        self.assertIn("<UNKNOWN> events/hour", other.title)
+
+    def test_occasional_activity(self) -> None:
+        events = [privilege_grant("admin@example.com", i * 60) for i in range(10)]
+
+        self.assertEqual(self.replay(events), [])
+
+    def test_fixed_size_state(self) -> None:
+        self.replay([privilege_grant(f"admin{i}@example.com", i) for i in range(200)])
+        size = self.store.size_bytes
+
+        self.replay(
+            [privilege_grant(f"admin{i}@example.com", i) for i in range(200, 5000)]
+        )
+        state = self.store.to_dict()["string_sets"]
+
+        self.assertEqual(
+            sorted(state), sorted(f"Okta.AdminActivity.Sketch{n}" for n in range(8))
+        )
+        self.assertLess(self.store.size_bytes, size + 1000)
+        for sketch in state.values():
+            self.assertEqual(len(json.loads(sketch[0])["top"]), 4)
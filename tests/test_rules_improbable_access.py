@@ -1,3 +1,5 @@
+import json
+import typing
 import unittest
 import panther_okta as okta
 
@@ -5,13 +7,57 @@ from panther_sdk import testing, detection, PantherEvent
 from panther_okta.rules.improbable_access import geo_improbable_access_filter
 
 
+SAN_FRANCISCO = ("San Francisco", 37.77, -122.42)
+SYDNEY = ("Sydney", -33.87, 151.21)
+LOS_ANGELES = ("Los Angeles", 34.05, -118.24)
+
+
+def login(minutes: int, place: typing.Tuple[str, float, float]) -> PantherEvent:
+    city, lat, lon = place
+    return okta.replay.to_event(
+        {
+            "eventType": "user.session.start",
+            "outcome": {"result": "FAILURE"},
+            "actor": {"alternateId": "alt-id"},
+            "client": {
+                "geographicalContext": {
+                    "city": city,
+                    "geolocation": {"lat": lat, "lon": lon},
+                }
+            },
+            "p_event_time": f"2022-10-01 {10 + minutes // 60:02d}:{minutes % 60:02d}:00.000000",
+        }
+    )
+
+
 class TestGIAFilters(testing.PantherPythonFilterTestCase):
     def test_geo_improbable_access_filter_valid(self) -> None:
         f = geo_improbable_access_filter()
         self.assertFilterIsValid(f)
+        self.assertFilterIsValid(geo_improbable_access_filter(history=2, known_after=1))
 
 
 class TestRulesImprobableAccess(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = okta.replay.MemoryKV()
+
+    def replay(
+        self, events: typing.List[PantherEvent], **options: typing.Any
+    ) -> typing.List[okta.replay.Match]:
+        rule = okta.rules.geo_improbable_access(
+            overrides=detection.RuleOptions(
+                filters=[geo_improbable_access_filter(**options)]
+            )
+        )
+        with okta.replay.installed(self.store):
+            return list(okta.replay.evaluate([rule], events))
+
+    def stored(self) -> typing.Dict[str, typing.Any]:
+        (login_info,) = self.store.get_string_set(
+            "Okta.Login.GeographicallyImprobablealt-id"
+        )
+        return typing.cast(typing.Dict[str, typing.Any], json.loads(login_info))
+
     def test_improbable_access(self) -> None:
         name_override = "Override Name"
         rule = okta.rules.geo_improbable_access(
@@ -31,3 +77,46 @@ class TestRulesImprobableAccess(unittest.TestCase):
         key = rule.alert_grouping.group_by(test_evt)  # type: ignore
 
         self.assertEqual(key, "alt-id")
+
+    def test_late_login_keeps_newer_state(self) -> None:
+        matches = self.replay(
+            [
+                login(0, SAN_FRANCISCO),
+                # arrives after the 10:00 login, but happened a minute before it
+                login(-1, SYDNEY),
+                login(120, LOS_ANGELES),
+            ]
+        )
+
+        self.assertEqual(matches, [])
+        self.assertEqual(self.stored()["old_city"], "San Francisco")
+
+    def test_vpn_flapping(self) -> None:
+        places = [SAN_FRANCISCO, SYDNEY] * 10
+        events = [login(15 * i, place) for i, place in enumerate(places)]
+
+        matches = self.replay(events)
+
+        # only the first jump alerts; after it, both places are among the recent logins
+        self.assertEqual(len(matches), 1)
+        self.assertIn("from [San Francisco]  to [Sydney]", matches[0].title)
+
+    def test_known_locations(self) -> None:
+        places = [SAN_FRANCISCO, SYDNEY] * 4
+        events = [login(15 * i, place) for i, place in enumerate(places)]
+
+        # a one-login ring only remembers the place just left, so alerts stop once each place
+        # has been visited twice
+        matches = self.replay(events, history=1, known_after=2)
+
+        self.assertEqual(len(matches), 3)
+
+    def test_bounded_state(self) -> None:
+        self.replay([login(0, SAN_FRANCISCO)])
+        size = len(self.stored()["ring"]) + len(self.stored()["known"])
+
+        places = [SAN_FRANCISCO, SYDNEY, LOS_ANGELES]
+        self.replay([login(i, places[i % 3]) for i in range(1, 100)])
+
+        self.assertEqual(len(self.stored()["ring"]) + len(self.stored()["known"]), size)
+        self.assertEqual(self.stored()["head"], 100 % 8)
@@ -0,0 +1,76 @@
+import json
+import typing
+import unittest
+
+import panther_okta as okta
+
+from panther_sdk import testing, detection
+from panther_okta.rules.password_spray import password_spray_filter
+
+
+def failed_login(user: str, minute: int, ip: str = "1.2.3.4") -> typing.Any:
+    event = json.loads(okta.sample_logs.failed_login)
+    event["actor"]["alternateId"] = user
+    event["client"]["ipAddress"] = ip
+    hour, minute = divmod(minute, 60)
+    event["p_event_time"] = f"2022-10-01 {10 + hour:02d}:{minute:02d}:00.000000"
+    return okta.replay.to_event(event)
+
+
+class TestPasswordSprayFilters(testing.PantherPythonFilterTestCase):
+    def test_password_spray_filter_valid(self) -> None:
+        self.assertFilterIsValid(password_spray_filter())
+
+
+class TestRulesPasswordSpray(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rule_set = [okta.rules.password_spray()]
+
+    def replay(self, events: typing.List[typing.Any]) -> typing.List[okta.replay.Match]:
+        with okta.replay.installed(okta.replay.MemoryKV()):
+            return list(okta.replay.evaluate(self.rule_set, events))
+
+    def test_password_spray(self) -> None:
+        name_override = "Override Name"
+        rule = okta.rules.password_spray(
+            overrides=detection.RuleOptions(name=name_override)
+        )
+
+        self.assertIsInstance(rule, detection.Rule)
+        self.assertEqual(rule.name, name_override)
+
+    def test_distinct_users(self) -> None:
+        events = [failed_login(f"user{i}@example.com", i) for i in range(12)]
+        events.append(failed_login("other@example.com", 12, ip="5.6.7.8"))
+
+        matches = self.replay(events)
+
+        self.assertEqual(
+            [m.event.deep_get("actor", "alternateId") for m in matches],
+            ["user9@example.com", "user10@example.com", "user11@example.com"],
+        )
+        self.assertEqual(
+            matches[0].title,
+            "Suspected password spray from [1.2.3.4] against about 10 distinct Okta accounts",
+        )
+        self.assertEqual(matches[0].dedup, "1.2.3.4")
+
+    def test_repeated_user(self) -> None:
+        events = [failed_login("user@example.com", i) for i in range(50)]
+
+        self.assertEqual(self.replay(events), [])
+
+    def test_window(self) -> None:
+        # five users an hour: adjacent windows are counted together, older ones are dropped
+        events = [
+            failed_login(f"user{i}@example.com", 60 * (i // 5) + i % 5)
+            for i in range(10)
+        ]
+        events += [failed_login(f"user{i}@example.com", 180 + i) for i in range(10, 15)]
+
+        matches = self.replay(events)
+
+        self.assertEqual(
+            [m.event.deep_get("actor", "alternateId") for m in matches],
+            ["user9@example.com"],
+        )
@@ -0,0 +1,77 @@
+import json
+import typing
+import unittest
+
+import panther_okta as okta
+
+from panther_sdk import testing, detection
+from panther_okta.rules.session_hijack import session_hijack_filter
+
+
+def session_event(
+    session_id: str,
+    ip: str = "192.168.0.9",
+    as_org: str = "comcast",
+    user_agent: str = "Mozilla/5.0",
+) -> typing.Any:
+    event = json.loads(okta.sample_logs.first_login)
+    event["authenticationContext"]["externalSessionId"] = session_id
+    event["client"]["ipAddress"] = ip
+    event["securityContext"]["asOrg"] = as_org
+    event["client"]["userAgent"]["rawUserAgent"] = user_agent
+    return okta.replay.to_event(event)
+
+
+class TestSessionHijackFilters(testing.PantherPythonFilterTestCase):
+    def test_session_hijack_filter_valid(self) -> None:
+        self.assertFilterIsValid(session_hijack_filter())
+
+
+class TestRulesSessionHijack(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rule_set = [okta.rules.session_hijack()]
+        self.store = okta.replay.MemoryKV()
+
+    def replay(self, events: typing.List[typing.Any]) -> typing.List[okta.replay.Match]:
+        with okta.replay.installed(self.store):
+            return list(okta.replay.evaluate(self.rule_set, events))
+
+    def test_session_hijack(self) -> None:
+        name_override = "Override Name"
+        rule = okta.rules.session_hijack(
+            overrides=detection.RuleOptions(name=name_override)
+        )
+
+        self.assertIsInstance(rule, detection.Rule)
+        self.assertEqual(rule.name, name_override)
+
+    def test_new_network(self) -> None:
+        matches = self.replay(
+            [
+                session_event("s1"),
+                session_event("s1"),
+                session_event("s2", ip="10.0.0.1"),
+                session_event("s1", ip="203.0.113.7", as_org="hosting inc"),
+                session_event("s1", ip="203.0.113.7", as_org="hosting inc"),
+            ]
+        )
+
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].dedup, "s1")
+        self.assertIn("used from 2 IPs, 2 networks and 1 user agents", matches[0].title)
+        self.assertEqual(
+            matches[0].alert_context["session"]["ips"], ["192.168.0.9", "203.0.113.7"]
+        )
+
+    def test_unknown_session(self) -> None:
+        events = [session_event("unknown", ip=f"10.0.0.{i}") for i in range(3)]
+
+        self.assertEqual(self.replay(events), [])
+        self.assertEqual(len(self.store), 0)
+
+    def test_bounded_store(self) -> None:
+        self.store = okta.replay.MemoryKV(max_keys=100)
+        self.replay([session_event(f"s{i}") for i in range(1000)])
+
+        self.assertEqual(len(self.store), 100)
+        self.assertEqual(self.store.evictions, 900)